@@ -9,7 +9,9 @@ from .models import (
     Usuario, Rol, Area, TipoContrato, Solicitud,
     LicenciaMedica, Actividad, InscripcionActividad,
     Anuncio, AdjuntoAnuncio, Documento, CategoriaDocumento,
-    Notificacion, LogAuditoria
+    Notificacion, LogAuditoria, ContadorSecuencia,
+    MovimientoSaldo, SaldoAnual, Feriado, TrabajoPDF, ExportacionPDF, SubidaDocumento,
+    ContadorDocumentoHora
 )
 
 # ======================================================
@@ -86,6 +88,18 @@ class UsuarioAdmin(BaseUserAdmin):
     )
     
     readonly_fields = ['creado_en', 'actualizado_en', 'ultimo_acceso']
+
+    def save_model(self, request, obj, form, change):
+        # Los cambios de saldo se registran como movimientos en vez de sobrescribir la columna
+        campos_saldo = [c for c in Usuario.CAMPOS_SALDO.values() if c in form.changed_data]
+        if not change or not campos_saldo:
+            return super().save_model(request, obj, form, change)
+
+        nuevos_saldos = {campo: getattr(obj, campo) for campo in campos_saldo}
+        for campo in campos_saldo:
+            setattr(obj, campo, form.initial[campo])
+        super().save_model(request, obj, form, change)
+        obj.ajustar_saldos(nuevos_saldos, descripcion=f'Ajuste manual en administración ({request.user.rut})')
     
     def get_nombre_completo(self, obj):
         return obj.get_nombre_completo()
@@ -305,6 +319,64 @@ class LogAuditoriaAdmin(admin.ModelAdmin):
     list_display = ['usuario', 'accion', 'modelo', 'timestamp', 'ip_address']
     readonly_fields = ['timestamp']
 
+@admin.register(ContadorSecuencia)
+class ContadorSecuenciaAdmin(admin.ModelAdmin):
+    list_display = ['prefijo', 'anio', 'ultimo_valor', 'actualizado_en']
+    list_filter = ['prefijo']
+    readonly_fields = ['actualizado_en']
+
+@admin.register(MovimientoSaldo)
+class MovimientoSaldoAdmin(admin.ModelAdmin):
+    list_display = ['usuario', 'bolsa', 'delta', 'saldo_resultante', 'solicitud', 'creado_en']
+    list_filter = ['bolsa', 'creado_en']
+    search_fields = ['usuario__rut', 'usuario__nombre', 'descripcion']
+    date_hierarchy = 'creado_en'
+
+    # El libro es de solo escritura por código: no se edita ni elimina desde el panel
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+@admin.register(SaldoAnual)
+class SaldoAnualAdmin(admin.ModelAdmin):
+    list_display = ['usuario', 'bolsa', 'anio', 'saldo_inicial', 'calculado_en']
+    list_filter = ['anio', 'bolsa']
+
+@admin.register(Feriado)
+class FeriadoAdmin(admin.ModelAdmin):
+    list_display = ['fecha', 'nombre', 'irrenunciable']
+    list_filter = ['irrenunciable']
+    date_hierarchy = 'fecha'
+
+@admin.register(TrabajoPDF)
+class TrabajoPDFAdmin(admin.ModelAdmin):
+    list_display = ['solicitud', 'estado', 'intentos', 'creado_en', 'terminado_en']
+    list_filter = ['estado']
+    readonly_fields = ['creado_en', 'iniciado_en', 'terminado_en']
+
+@admin.register(ExportacionPDF)
+class ExportacionPDFAdmin(admin.ModelAdmin):
+    list_display = ['usuario', 'desde', 'hasta', 'total', 'estado', 'intentos', 'creado_en', 'terminado_en']
+    list_filter = ['estado']
+    readonly_fields = ['solicitudes', 'creado_en', 'iniciado_en', 'terminado_en']
+
+@admin.register(SubidaDocumento)
+class SubidaDocumentoAdmin(admin.ModelAdmin):
+    list_display = ['nombre_archivo', 'usuario', 'recibido', 'tamano_total', 'estado', 'actualizada_en']
+    list_filter = ['estado']
+    readonly_fields = ['recibido', 'documento', 'creada_en', 'actualizada_en']
+
+@admin.register(ContadorDocumentoHora)
+class ContadorDocumentoHoraAdmin(admin.ModelAdmin):
+    list_display = ['documento', 'hora', 'descargas', 'visualizaciones']
+    date_hierarchy = 'hora'
+    readonly_fields = ['documento', 'hora', 'descargas', 'visualizaciones']
+
 # Configuración Global del Panel
 admin.site.site_header = "Administración CESFAM Santa Rosa"
 admin.site.site_title = "CESFAM Admin"
@@ -0,0 +1,11 @@
+# ======================================================
+# BENCHMARKS - Mediciones reproducibles de los caminos críticos
+# Ubicación: api_intranet/benchmarks/__init__.py
+# ======================================================
+#
+# medicion.py: latencia por percentiles, memoria pico y consultas de una función.
+# casos.py:    datos sembrados con semilla fija y los casos medidos.
+# Se ejecuta con `manage.py benchmark` (ver el comando para la línea base JSON).
+
+from .medicion import medir, comparar
+from .casos import CASOS, Entorno, ejecutar
@@ -0,0 +1,245 @@
+# ======================================================
+# CASOS - Datos sembrados y casos del benchmark
+# Ubicación: api_intranet/benchmarks/casos.py
+# ======================================================
+
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from ..models import Anuncio, Area, EnvioNotificacion, Rol, Solicitud, TipoContrato, Usuario
+from ..pdf_generator import SolicitudPDFGenerator
+from ..serializers import SolicitudCreateSerializer
+from .medicion import medir
+
+
+SEMILLA = 20250101
+
+# Tamaños de los listados (chico, grande)
+TAMANOS_LISTADO = (1_000, 10_000)
+
+# Funcionarios que reciben el aviso de un anuncio para todo el CESFAM
+DESTINATARIOS_NOTIFICACION = 5_000
+
+PALABRAS = (
+    'paciente control turno vacuna consulta sector ronda farmacia atención familia '
+    'comunidad programa salud visita domicilio registro clínica urgencia equipo'
+).split()
+
+
+def texto(azar, palabras):
+    return ' '.join(azar.choice(PALABRAS) for _ in range(palabras))
+
+
+def solicitud_de_ejemplo(motivo='Descanso', comentarios='Sin observaciones'):
+    """Solicitud aprobada en memoria (no toca la base de datos)"""
+    area = Area(nombre='Área Benchmark', codigo='BENCH')
+    usuario = Usuario(
+        rut='12.345.678-9', nombre='Ana', apellido_paterno='Pérez', apellido_materno='Soto',
+        email='ana@cesfam.cl', cargo='Enfermera', area=area,
+    )
+    jefe = Usuario(nombre='Marta', apellido_paterno='Vega', apellido_materno='Lagos')
+    director = Usuario(nombre='Luis', apellido_paterno='Rojas', apellido_materno='Díaz')
+    ahora = timezone.now()
+    return Solicitud(
+        numero_solicitud='SOL-2025-0001', usuario=usuario, tipo='vacaciones',
+        fecha_inicio=date(2025, 2, 3), fecha_termino=date(2025, 2, 7), cantidad_dias=Decimal('5'),
+        motivo=motivo, telefono_contacto='+56900000000', estado='aprobada',
+        jefatura_aprobador=jefe, fecha_aprobacion_jefatura=ahora,
+        direccion_aprobador=director, fecha_aprobacion_direccion=ahora,
+        comentarios_administracion=comentarios, creada_en=ahora,
+    )
+
+
+class Entorno:
+    """
+    Datos comunes a todos los casos, sembrados con semilla fija: un área con
+    `tamanos[0]` solicitudes y otra con el resto hasta `tamanos[1]`.
+    """
+
+    def __init__(self, tamanos=TAMANOS_LISTADO):
+        self.tamanos = tuple(tamanos)
+        self.azar = random.Random(SEMILLA)
+        self.contrato = TipoContrato.objects.create(nombre='Benchmark')
+        self.roles = {
+            nivel: Rol.objects.create(nombre=f'Benchmark {nombre}', nivel=nivel)
+            for nivel, nombre in Rol.NIVEL_CHOICES
+        }
+        self.area_chica = Area.objects.create(nombre='Benchmark Chica', codigo='BCH')
+        self.area_grande = Area.objects.create(nombre='Benchmark Grande', codigo='BGR')
+        self._correlativo = 0
+
+        self.director = self.usuario(self.area_chica, 4)
+        self.funcionario = self.usuario(self.area_chica, 1, dias_vacaciones_disponibles=100_000)
+        self.validador = self.usuario(self.area_chica, 1)
+        self._sembrar_listados()
+
+    def usuario(self, area, nivel, **extra):
+        self._correlativo += 1
+        n = self._correlativo
+        return Usuario.objects.create(
+            rut=f'{n:08d}-B', email=f'benchmark{n}@cesfam.cl',
+            nombre=f'Nombre{n}', apellido_paterno='Benchmark', apellido_materno='Prueba',
+            cargo='Funcionario', area=area, rol=self.roles[nivel], tipo_contrato=self.contrato,
+            fecha_ingreso=date(2020, 1, 1), **extra
+        )
+
+    def _sembrar_listados(self):
+        chico, grande = self.tamanos
+        solicitantes = {
+            self.area_chica: [self.usuario(self.area_chica, 1) for _ in range(10)],
+            self.area_grande: [self.usuario(self.area_grande, 1) for _ in range(40)],
+        }
+        jefe = self.usuario(self.area_chica, 2)
+        estados = [estado for estado, _ in Solicitud.ESTADO_CHOICES]
+        ahora = timezone.now()
+
+        filas = []
+        for i in range(grande):
+            area = self.area_chica if i < chico else self.area_grande
+            inicio = date(2025, 1, 1) + timedelta(days=self.azar.randrange(365))
+            dias = self.azar.randint(1, 10)
+            estado = self.azar.choice(estados)
+            aprobada = estado == 'aprobada'
+            filas.append(Solicitud(
+                numero_solicitud=f'BEN-{i:06d}', usuario=self.azar.choice(solicitantes[area]),
+                tipo=self.azar.choice(['vacaciones', 'dia_administrativo', 'otro_permiso']),
+                fecha_inicio=inicio, fecha_termino=inicio + timedelta(days=dias - 1), cantidad_dias=dias,
+                motivo=texto(self.azar, 12), telefono_contacto='+56900000000', estado=estado,
+                jefatura_aprobador=jefe if aprobada else None,
+                fecha_aprobacion_jefatura=ahora if aprobada else None,
+                direccion_aprobador=self.director if aprobada else None,
+                fecha_aprobacion_direccion=ahora if aprobada else None,
+            ))
+        Solicitud.objects.bulk_create(filas, batch_size=1000)
+
+
+# ======================================================
+# CASOS
+# ======================================================
+
+CASOS = {}
+
+
+def caso(nombre):
+    def registrar(funcion):
+        CASOS[nombre] = funcion
+        return funcion
+    return registrar
+
+
+@caso('pdf_motivo_corto')
+def pdf_motivo_corto(entorno, repeticiones):
+    generador, solicitud = SolicitudPDFGenerator(), solicitud_de_ejemplo()
+    return medir(lambda: generador.generate_solicitud_pdf(solicitud), repeticiones)
+
+
+@caso('pdf_motivo_largo')
+def pdf_motivo_largo(entorno, repeticiones):
+    azar = random.Random(SEMILLA)
+    generador = SolicitudPDFGenerator()
+    solicitud = solicitud_de_ejemplo(motivo=texto(azar, 3_000), comentarios=texto(azar, 1_500))
+    return medir(lambda: generador.generate_solicitud_pdf(solicitud), repeticiones)
+
+
+@caso('aprobar')
+def aprobar(entorno, repeticiones):
+    """Aprobación final por Dirección de una solicitud de funcionario (descuenta días)"""
+    def preparar():
+        solicitud = Solicitud.objects.create(
+            usuario=entorno.funcionario, tipo='vacaciones',
+            fecha_inicio=date(2025, 2, 3), fecha_termino=date(2025, 2, 3), cantidad_dias=1,
+            motivo='Benchmark', telefono_contacto='+56900000000',
+        )
+        return (Solicitud.objects.select_related('usuario__rol').get(pk=solicitud.pk),)
+
+    def aprobar_solicitud(solicitud):
+        if not solicitud.aprobar(entorno.director):
+            raise AssertionError('La aprobación del benchmark no se aplicó')
+
+    return medir(aprobar_solicitud, repeticiones, preparar=preparar)
+
+
+@caso('validar_creacion')
+def validar_creacion(entorno, repeticiones):
+    """SolicitudCreateSerializer.validate para cinco días hábiles de vacaciones"""
+    request = SimpleNamespace(user=entorno.validador)
+    datos = {
+        'tipo': 'vacaciones', 'fecha_inicio': '2025-03-03', 'fecha_termino': '2025-03-07',
+        'cantidad_dias': '5', 'motivo': 'Benchmark', 'telefono_contacto': '+56900000000',
+    }
+
+    def validar():
+        serializer = SolicitudCreateSerializer(data=datos, context={'request': request})
+        serializer.is_valid(raise_exception=True)
+
+    return medir(validar, repeticiones)
+
+
+def _listar(entorno, repeticiones, filtros):
+    from ..views import SolicitudViewSet
+
+    vista = SolicitudViewSet.as_view({'get': 'list'})
+    fabrica = APIRequestFactory()
+
+    def listar():
+        request = fabrica.get('/api/solicitudes/', filtros)
+        force_authenticate(request, user=entorno.director)
+        response = vista(request)
+        response.render()
+
+    # Los listados grandes son lentos: pocas repeticiones bastan para p50
+    return medir(listar, max(3, repeticiones // 10))
+
+
+@caso('listar_solicitudes_1k')
+def listar_solicitudes_chico(entorno, repeticiones):
+    return _listar(entorno, repeticiones, {'usuario__area': str(entorno.area_chica.pk)})
+
+
+@caso('listar_solicitudes_10k')
+def listar_solicitudes_grande(entorno, repeticiones):
+    return _listar(entorno, repeticiones, {})
+
+
+@caso('notificar_anuncio_5k')
+def notificar_anuncio(entorno, repeticiones):
+    """Notificaciones de un anuncio para todas las áreas a DESTINATARIOS_NOTIFICACION usuarios"""
+    faltan = DESTINATARIOS_NOTIFICACION - Usuario.objects.filter(is_active=True).count()
+    inicio = entorno._correlativo
+    entorno._correlativo += max(faltan, 0)
+    Usuario.objects.bulk_create([
+        Usuario(
+            rut=f'{n:08d}-N', email=f'notificacion{n}@cesfam.cl',
+            nombre=f'Nombre{n}', apellido_paterno='Benchmark', apellido_materno='Prueba',
+            cargo='Funcionario', area=entorno.azar.choice([entorno.area_chica, entorno.area_grande]),
+            rol=entorno.roles[1], tipo_contrato=entorno.contrato, fecha_ingreso=date(2020, 1, 1),
+        )
+        for n in range(inicio + 1, inicio + faltan + 1)
+    ], batch_size=1000)
+
+    def preparar():
+        anuncio = Anuncio.objects.create(titulo='Benchmark', contenido=texto(entorno.azar, 40), creado_por=entorno.director)
+        return (EnvioNotificacion.encolar(anuncio),)
+
+    def enviar(envio):
+        # El autor no se notifica a sí mismo
+        if envio.enviar() != DESTINATARIOS_NOTIFICACION - 1:
+            raise AssertionError(f'El anuncio se notificó a {envio.destinatarios} usuarios')
+
+    return medir(enviar, max(3, repeticiones // 10), preparar=preparar)
+
+
+def ejecutar(nombres=None, repeticiones=30, tamanos=TAMANOS_LISTADO, entorno=None, al_terminar=None):
+    """Siembra el entorno y mide los casos pedidos (todos por defecto). Retorna {caso: medición}"""
+    entorno = entorno or Entorno(tamanos)
+    resultados = {}
+    for nombre in nombres or CASOS:
+        resultados[nombre] = CASOS[nombre](entorno, repeticiones)
+        if al_terminar:
+            al_terminar(nombre, resultados[nombre])
+    return resultados
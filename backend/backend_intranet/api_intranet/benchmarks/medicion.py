@@ -0,0 +1,96 @@
+# ======================================================
+# MEDICION - Latencia, memoria pico y consultas SQL
+# Ubicación: api_intranet/benchmarks/medicion.py
+# ======================================================
+
+import statistics
+import time
+import tracemalloc
+
+from django.db import connection
+
+
+def percentil(ordenados, p):
+    """Percentil por rango más cercano sobre una lista ya ordenada"""
+    indice = max(0, min(len(ordenados) - 1, round(p / 100 * len(ordenados)) - 1))
+    return ordenados[indice]
+
+
+class ContadorConsultas:
+    """Cuenta las consultas ejecutadas (sin el tope de 9000 de CaptureQueriesContext)"""
+
+    def __init__(self):
+        self.total = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.total += 1
+        return execute(sql, params, many, context)
+
+
+def medir(funcion, repeticiones, preparar=None, calentamiento=1):
+    """
+    Ejecuta `funcion(*preparar())` `repeticiones` veces. `preparar` arma los argumentos
+    de cada ejecución fuera del tiempo medido. Las consultas y la memoria pico se miden
+    en dos ejecuciones adicionales, para no sumar su costo a los tiempos.
+    """
+    def argumentos():
+        return preparar() if preparar else ()
+
+    for _ in range(calentamiento):
+        funcion(*argumentos())
+
+    tiempos = []
+    for _ in range(repeticiones):
+        args = argumentos()
+        t0 = time.perf_counter()
+        funcion(*args)
+        tiempos.append((time.perf_counter() - t0) * 1000)
+
+    args = argumentos()
+    consultas = ContadorConsultas()
+    with connection.execute_wrapper(consultas):
+        funcion(*args)
+
+    args = argumentos()
+    tracemalloc.start()
+    try:
+        funcion(*args)
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    tiempos.sort()
+    return {
+        'repeticiones': repeticiones,
+        'media_ms': round(statistics.fmean(tiempos), 3),
+        'p50_ms': round(percentil(tiempos, 50), 3),
+        'p90_ms': round(percentil(tiempos, 90), 3),
+        'p99_ms': round(percentil(tiempos, 99), 3),
+        'max_ms': round(tiempos[-1], 3),
+        'pico_kib': round(pico / 1024, 1),
+        'consultas': consultas.total,
+    }
+
+
+def comparar(actual, base, umbral):
+    """
+    Regresiones de `actual` respecto de `base` (ambos {caso: medición}).
+    Latencia p50 y memoria pico toleran `umbral` (0.25 = 25 %); las consultas
+    son deterministas, así que cualquier consulta extra es una regresión.
+    """
+    regresiones = []
+    for nombre, medicion in actual.items():
+        referencia = base.get(nombre)
+        if not referencia:
+            continue
+        for campo in ('p50_ms', 'pico_kib'):
+            limite = referencia[campo] * (1 + umbral)
+            if medicion[campo] > limite:
+                regresiones.append(
+                    f'{nombre}: {campo} {medicion[campo]} > {limite:.1f} (base {referencia[campo]})'
+                )
+        if medicion['consultas'] > referencia['consultas']:
+            regresiones.append(
+                f"{nombre}: consultas {medicion['consultas']} > {referencia['consultas']}"
+            )
+    return regresiones
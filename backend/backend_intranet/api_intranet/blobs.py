@@ -0,0 +1,126 @@
+# ======================================================
+# BLOBS - Almacén de archivos por contenido (SHA-256)
+# Ubicación: api_intranet/blobs.py
+# ======================================================
+#
+# Cada archivo se guarda una sola vez bajo su hash, con dos niveles de carpetas
+# para no llenar un directorio: <raíz>/ab/cd/abcd1234...  Dos documentos con el
+# mismo contenido comparten el archivo. La raíz (DOCUMENTOS_BLOB_ROOT) no debe
+# publicarse: los permisos se validan en la API antes de servir el archivo.
+
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+
+
+TAMANO_TROZO = 64 * 1024
+
+
+def raiz():
+    return Path(settings.DOCUMENTOS_BLOB_ROOT)
+
+
+def ruta(huella):
+    return raiz() / huella[:2] / huella[2:4] / huella
+
+
+def existe(huella):
+    return bool(huella) and ruta(huella).is_file()
+
+
+def abrir(huella):
+    """Archivo binario del blob, para leerlo por trozos"""
+    return open(ruta(huella), 'rb')
+
+
+def _trozos(origen):
+    """Acepta un UploadedFile (chunks()), un archivo abierto o un objeto bytes"""
+    if isinstance(origen, (bytes, bytearray, memoryview)):
+        vista = memoryview(origen)
+        for inicio in range(0, len(vista), TAMANO_TROZO):
+            yield vista[inicio:inicio + TAMANO_TROZO]
+    elif hasattr(origen, 'chunks'):
+        yield from origen.chunks(TAMANO_TROZO)
+    else:
+        yield from iter(lambda: origen.read(TAMANO_TROZO), b'')
+
+
+def calcular_huella(origen):
+    """SHA-256 del contenido sin guardarlo en el almacén (p. ej. un adjunto en MEDIA)"""
+    sha = hashlib.sha256()
+    for trozo in _trozos(origen):
+        sha.update(trozo)
+    return sha.hexdigest()
+
+
+def ruta_subida(subida_id):
+    """Archivo temporal de una subida por trozos (en la misma raíz, para moverlo sin copiar)"""
+    return raiz() / 'subidas' / str(subida_id)
+
+
+def _ubicar(temporal, huella):
+    """Mueve el temporal a su lugar definitivo, o lo descarta si el blob ya existía"""
+    final = ruta(huella)
+    if final.is_file():
+        os.unlink(temporal)
+    else:
+        final.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(temporal, final)
+
+
+def guardar(origen):
+    """
+    Guarda el contenido y retorna (sha256, tamaño). Se escribe por trozos en un
+    temporal dentro de la misma raíz, calculando el hash en el camino, y luego se
+    mueve con os.replace (atómico). Si el blob ya existía, el temporal se descarta.
+    """
+    temporales = raiz() / 'tmp'
+    temporales.mkdir(parents=True, exist_ok=True)
+
+    sha, tamano = hashlib.sha256(), 0
+    descriptor, temporal = tempfile.mkstemp(dir=temporales)
+    try:
+        with os.fdopen(descriptor, 'wb') as destino:
+            for trozo in _trozos(origen):
+                sha.update(trozo)
+                destino.write(trozo)
+                tamano += len(trozo)
+        huella = sha.hexdigest()
+        _ubicar(temporal, huella)
+    except BaseException:
+        if os.path.exists(temporal):
+            os.unlink(temporal)
+        raise
+    return huella, tamano
+
+
+def incorporar(temporal):
+    """
+    Incorpora al almacén un archivo ya escrito en la raíz (una subida por trozos):
+    lo lee una vez para el hash y lo enlaza sin copiarlo. Retorna (sha256, tamaño).
+    El temporal no se toca: se borra cuando se confirma la transacción que crea el
+    Documento, así un rollback deja la subida lista para reintentar.
+    """
+    sha, tamano = hashlib.sha256(), 0
+    with open(temporal, 'rb') as archivo:
+        for trozo in _trozos(archivo):
+            sha.update(trozo)
+            tamano += len(trozo)
+    huella = sha.hexdigest()
+    final = ruta(huella)
+    if not final.is_file():
+        final.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            # Enlace duro: mismo contenido, sin copiar ni mover el temporal
+            os.link(temporal, final)
+        except FileExistsError:
+            # Otro proceso lo incorporó entretanto
+            pass
+        except OSError:
+            # Sistema de archivos sin enlaces duros: se copia
+            with open(temporal, 'rb') as archivo:
+                guardar(archivo)
+    return huella, tamano
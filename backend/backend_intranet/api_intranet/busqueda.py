@@ -0,0 +1,131 @@
+# ======================================================
+# BUSQUEDA - Texto completo de documentos (PostgreSQL)
+# Ubicación: api_intranet/busqueda.py
+# ======================================================
+#
+# Documento.busqueda es un tsvector en español con título y código (peso A),
+# descripción (B) y el texto extraído del archivo (C), indexado con GIN.
+# En bases que no son PostgreSQL (p. ej. SQLite en desarrollo) ?search= vuelve
+# al SearchFilter de DRF sobre los campos del ViewSet.
+#
+# El texto de un documento nuevo se extrae en segundo plano, ya confirmada la
+# subida (leer un PDF grande tarda): hasta entonces se encuentra por sus metadatos.
+
+import logging
+
+from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank, SearchVector
+from django.db import connection
+from django.db.models import F
+from pypdf import PdfReader
+from rest_framework import filters
+
+from . import segundo_plano
+
+
+logger = logging.getLogger(__name__)
+
+CONFIGURACION = 'spanish'
+
+# Un tsvector admite hasta 1 MB; el texto extraído se corta antes
+MAXIMO_CARACTERES = 500_000
+
+# Documentos que entrega una búsqueda; el fragmento (ts_headline relee el texto
+# completo de cada uno) se calcula solo para estos
+MAXIMO_RESULTADOS = 50
+
+
+def soporta_texto_completo():
+    return connection.vendor == 'postgresql'
+
+
+def vector_documento():
+    """Expresión del tsvector de Documento, para usar en un UPDATE"""
+    return (
+        SearchVector('titulo', 'codigo_documento', weight='A', config=CONFIGURACION)
+        + SearchVector('descripcion', weight='B', config=CONFIGURACION)
+        + SearchVector('texto_contenido', weight='C', config=CONFIGURACION)
+    )
+
+
+def extraer_texto(abrir, nombre_archivo, mime_type):
+    """
+    Texto del cuerpo de un PDF o archivo de texto para el índice de búsqueda.
+    `abrir()` entrega el archivo en binario. Retorna '' para otros formatos o
+    si el archivo no se puede leer (la subida no debe fallar por eso).
+    """
+    es_pdf = mime_type == 'application/pdf' or nombre_archivo.lower().endswith('.pdf')
+    if not (es_pdf or mime_type.startswith('text/')):
+        return ''
+
+    with abrir() as archivo:
+        if not es_pdf:
+            texto = archivo.read(MAXIMO_CARACTERES * 4).decode('utf-8', errors='replace')
+        else:
+            partes, largo = [], 0
+            try:
+                for pagina in PdfReader(archivo).pages:
+                    partes.append(pagina.extract_text() or '')
+                    largo += len(partes[-1])
+                    if largo >= MAXIMO_CARACTERES:
+                        break
+            except Exception as error:
+                # PDF dañado o cifrado: se indexan solo los metadatos
+                logger.warning('No se pudo extraer texto de %s: %s', nombre_archivo, error)
+            texto = '\n'.join(partes)
+
+    # PostgreSQL no admite NUL en columnas de texto
+    return texto[:MAXIMO_CARACTERES].replace('\x00', '')
+
+
+def programar_indexado(documento_id):
+    """Extrae el texto del archivo en segundo plano, una vez confirmada la transacción en curso"""
+    segundo_plano.al_confirmar(indexar, documento_id)
+
+
+def indexar(documento_id):
+    """
+    Guarda el texto del archivo de un documento y recalcula su índice. Los errores
+    se registran: indexar_documentos completa después lo que haya quedado sin texto.
+    """
+    from .models import Documento
+
+    documento = Documento.objects.filter(pk=documento_id).only(
+        'pk', 'storage_type', 'archivo_hash', 'nombre_archivo', 'mime_type'
+    ).first()
+    if documento is None:
+        return
+    try:
+        texto = extraer_texto(documento.abrir_archivo, documento.nombre_archivo, documento.mime_type)
+    except Exception as error:
+        logger.warning('No se pudo indexar %s: %s', documento.nombre_archivo, error)
+        return
+    if texto:
+        Documento.objects.filter(pk=documento_id).update(texto_contenido=texto)
+        documento.actualizar_busqueda()
+
+
+class BusquedaDocumentoFilter(filters.SearchFilter):
+    """
+    ?search= sobre Documento.busqueda con sintaxis de buscador web ("frase exacta",
+    -excluir, or). Entrega los MAXIMO_RESULTADOS más relevantes (o los primeros según
+    ?ordering=) con `relevancia` y un `fragmento` con las coincidencias entre <mark></mark>.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        termino = ' '.join(self.get_search_terms(request))
+        if not termino or not soporta_texto_completo():
+            return super().filter_queryset(request, queryset, view)
+
+        consulta = SearchQuery(termino, config=CONFIGURACION, search_type='websearch')
+        queryset = queryset.filter(busqueda=consulta).annotate(relevancia=SearchRank(F('busqueda'), consulta))
+        if 'ordering' not in request.query_params:
+            queryset = queryset.order_by('-relevancia', '-subido_en')
+
+        # Primero se ordena y se corta con el índice y el rango; luego el fragmento, solo de esos
+        mejores = list(queryset.values_list('pk', flat=True)[:MAXIMO_RESULTADOS])
+        return queryset.filter(pk__in=mejores).annotate(
+            fragmento=SearchHeadline(
+                'texto_contenido', consulta, config=CONFIGURACION,
+                start_sel='<mark>', stop_sel='</mark>', max_fragments=2, max_words=30, min_words=10,
+            ),
+        )
@@ -0,0 +1,87 @@
+# ======================================================
+# COBERTURA - Ausentes por día y por área
+# Ubicación: api_intranet/cobertura.py
+# ======================================================
+
+from collections import defaultdict
+from itertools import accumulate
+
+from django.db.models import Count, Q
+
+from .models import Area, Solicitud, LicenciaMedica
+
+
+# Para cobertura solo cuenta lo que ya está aprobado
+ESTADOS_AUSENCIA = ['aprobada']
+
+# Límite del rango consultable (un año)
+MAXIMO_DIAS = 366
+
+
+def _ausencias(desde, hasta, areas=None):
+    """
+    (area_id, usuario_id, inicio, fin) de solicitudes y licencias aprobadas que tocan el rango.
+    Dos consultas de rango, una por tabla; el área es la actual del funcionario.
+    """
+    filtros = Q(estado__in=ESTADOS_AUSENCIA, fecha_inicio__lte=hasta, fecha_termino__gte=desde)
+    if areas is not None:
+        filtros &= Q(usuario__area__in=areas)
+
+    columnas = ('usuario__area_id', 'usuario_id', 'fecha_inicio', 'fecha_termino')
+    yield from Solicitud.objects.filter(filtros).order_by().values_list(*columnas)
+    yield from LicenciaMedica.objects.filter(filtros).order_by().values_list(*columnas)
+
+
+def _fusionar(rangos):
+    """Une los rangos de una persona para no contarla dos veces el mismo día"""
+    fusionados = []
+    for inicio, fin in sorted(rangos):
+        if fusionados and inicio <= fusionados[-1][1] + 1:
+            if fin > fusionados[-1][1]:
+                fusionados[-1][1] = fin
+        else:
+            fusionados.append([inicio, fin])
+    return fusionados
+
+
+def calcular_cobertura(desde, hasta, areas=None):
+    """
+    Cantidad de funcionarios ausentes en cada día de [desde, hasta], por área.
+    Arreglo de diferencias: +1 el día que empieza cada ausencia, -1 el día siguiente
+    al que termina, y una suma acumulada por área. O(ausencias + áreas × días).
+    Retorna {area_id: [ausentes_dia_0, ausentes_dia_1, ...]}.
+    """
+    total_dias = (hasta - desde).days + 1
+
+    # Rangos como índices de día relativos a 'desde', recortados al período
+    por_persona = defaultdict(list)
+    for area_id, usuario_id, inicio, fin in _ausencias(desde, hasta, areas):
+        if area_id is None:
+            continue
+        por_persona[(area_id, usuario_id)].append((
+            max((inicio - desde).days, 0),
+            min((fin - desde).days, total_dias - 1),
+        ))
+
+    diferencias = defaultdict(lambda: [0] * (total_dias + 1))
+    for (area_id, _), rangos in por_persona.items():
+        delta = diferencias[area_id]
+        for inicio, fin in _fusionar(rangos):
+            delta[inicio] += 1
+            delta[fin + 1] -= 1
+
+    cobertura = {}
+    for area_id in (areas if areas is not None else diferencias):
+        delta = diferencias.get(area_id)
+        cobertura[area_id] = list(accumulate(delta[:-1])) if delta else [0] * total_dias
+    return cobertura
+
+
+def dotacion_por_area(areas=None):
+    """Funcionarios activos de cada área (denominador del mapa de calor)"""
+    consulta = Area.objects.order_by()
+    if areas is not None:
+        consulta = consulta.filter(pk__in=areas)
+    return dict(consulta.annotate(
+        total=Count('funcionarios', filter=Q(funcionarios__is_active=True))
+    ).values_list('id', 'total'))
@@ -0,0 +1,62 @@
+# ======================================================
+# COLA_PDF.PY - Generación de PDF en procesos aparte (TrabajoPDF y exportaciones)
+# Ubicación: api_intranet/cola_pdf.py
+# ======================================================
+#
+# Los procesos del pool se crean con 'spawn': cada uno arranca Django desde cero
+# y abre su propia conexión, en vez de heredar (fork) la del proceso principal.
+# Por eso este módulo no importa modelos a nivel de módulo.
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+
+# Relaciones que se imprimen en el PDF (evita una consulta por cada una)
+RELACIONES_PDF = ('usuario__area', 'jefatura_aprobador', 'direccion_aprobador')
+
+
+def iniciar_proceso():
+    """Inicializador de cada proceso del pool"""
+    import django
+    django.setup()
+
+
+def _renovar_conexion():
+    """
+    Entre tareas, un proceso del pool descarta su conexión si quedó caída o vieja.
+    En el proceso principal (--procesos 0, o una exportación con un solo PDF
+    faltante) no se toca: cerraría la conexión de la petición en curso.
+    """
+    if multiprocessing.parent_process() is not None:
+        from django.db import close_old_connections
+        close_old_connections()
+
+
+def procesar_trabajo(trabajo_id):
+    """Genera el PDF de un trabajo ya tomado. Retorna (trabajo_id, estado)"""
+    from .models import TrabajoPDF
+
+    _renovar_conexion()
+    trabajo = TrabajoPDF.objects.select_related(
+        *(f'solicitud__{relacion}' for relacion in RELACIONES_PDF)
+    ).get(pk=trabajo_id)
+    return trabajo_id, trabajo.ejecutar()
+
+
+def renderizar_solicitud(solicitud_id):
+    """Asegura el PDF vigente de una solicitud. Retorna (solicitud_id, ruta en MEDIA)"""
+    from .models import Solicitud
+
+    _renovar_conexion()
+    solicitud = Solicitud.objects.select_related(*RELACIONES_PDF).get(pk=solicitud_id)
+    return solicitud_id, solicitud.asegurar_pdf()
+
+
+def crear_pool(procesos=None):
+    """Pool de procesos para ReportLab, por defecto uno por núcleo"""
+    return ProcessPoolExecutor(
+        max_workers=procesos or os.cpu_count() or 1,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=iniciar_proceso,
+    )
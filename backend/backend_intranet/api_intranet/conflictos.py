@@ -0,0 +1,111 @@
+# ======================================================
+# CONFLICTOS - Traslapes entre solicitudes y licencias médicas
+# Ubicación: api_intranet/conflictos.py
+# ======================================================
+
+import heapq
+import itertools
+from collections import namedtuple
+
+from django.db.models import CharField, F, Value
+
+from .models import Solicitud, LicenciaMedica
+
+
+# Solicitudes que todavía ocupan sus fechas (las anuladas/rechazadas no cuentan)
+ESTADOS_SOLICITUD_ACTIVOS = [
+    'pendiente_jefatura', 'pendiente_direccion', 'aprobada', 'solicitud_anulacion_licencia'
+]
+ESTADOS_LICENCIA_ACTIVOS = ['aprobada']
+
+# Ausencia de un usuario entre dos fechas (ambas inclusive)
+Intervalo = namedtuple('Intervalo', 'usuario_id inicio fin origen id referencia')
+
+
+def _solicitudes_en_rango(desde, hasta):
+    return Solicitud.objects.filter(
+        estado__in=ESTADOS_SOLICITUD_ACTIVOS,
+        fecha_inicio__lte=hasta,
+        fecha_termino__gte=desde,
+    ).order_by()
+
+
+def _licencias_en_rango(desde, hasta):
+    return LicenciaMedica.objects.filter(
+        estado__in=ESTADOS_LICENCIA_ACTIVOS,
+        fecha_inicio__lte=hasta,
+        fecha_termino__gte=desde,
+    ).order_by()
+
+
+def buscar_traslapes(usuario, fecha_inicio, fecha_termino, excluir_solicitud=None):
+    """
+    Solicitudes activas y licencias aprobadas del usuario que se cruzan con el rango.
+    Una sola consulta (UNION ALL) sobre los índices (usuario, fecha_inicio).
+    """
+    columnas = ('origen', 'id', 'referencia', 'fecha_inicio', 'fecha_termino')
+
+    solicitudes = _solicitudes_en_rango(fecha_inicio, fecha_termino).filter(usuario=usuario)
+    if excluir_solicitud is not None:
+        solicitudes = solicitudes.exclude(pk=excluir_solicitud)
+    solicitudes = solicitudes.annotate(
+        origen=Value('solicitud', output_field=CharField()),
+        referencia=F('numero_solicitud'),
+    ).values_list(*columnas)
+
+    licencias = _licencias_en_rango(fecha_inicio, fecha_termino).filter(usuario=usuario).annotate(
+        origen=Value('licencia', output_field=CharField()),
+        referencia=F('numero_licencia'),
+    ).values_list(*columnas)
+
+    return [
+        Intervalo(usuario.pk, inicio, fin, origen, pk, referencia)
+        for origen, pk, referencia, inicio, fin in solicitudes.union(licencias, all=True)
+    ]
+
+
+def intervalos_en_rango(desde, hasta, area=None):
+    """Todas las ausencias (solicitudes activas + licencias aprobadas) que tocan el rango"""
+    solicitudes = _solicitudes_en_rango(desde, hasta)
+    licencias = _licencias_en_rango(desde, hasta)
+    if area is not None:
+        solicitudes = solicitudes.filter(usuario__area=area)
+        licencias = licencias.filter(usuario__area=area)
+
+    columnas = ('usuario_id', 'fecha_inicio', 'fecha_termino', 'id')
+    intervalos = [
+        Intervalo(usuario_id, inicio, fin, 'solicitud', pk, numero)
+        for usuario_id, inicio, fin, pk, numero in solicitudes.values_list(*columnas, 'numero_solicitud')
+    ]
+    intervalos += [
+        Intervalo(usuario_id, inicio, fin, 'licencia', pk, numero)
+        for usuario_id, inicio, fin, pk, numero in licencias.values_list(*columnas, 'numero_licencia')
+    ]
+    return intervalos
+
+
+def detectar_conflictos(intervalos):
+    """
+    Pares de intervalos del mismo usuario que se traslapan.
+    Barrido ordenado: se ordena por (usuario, inicio) y se mantiene un heap con los
+    intervalos aún abiertos, así el costo es O(n log n + k) en vez de comparar todos contra todos.
+    """
+    conflictos = []
+    abiertos = []
+    usuario_actual = None
+    desempate = itertools.count()
+
+    for intervalo in sorted(intervalos, key=lambda i: (i.usuario_id, i.inicio, i.fin)):
+        if intervalo.usuario_id != usuario_actual:
+            usuario_actual = intervalo.usuario_id
+            abiertos = []
+
+        # Cerrar los que terminaron antes de que este comience
+        while abiertos and abiertos[0][0] < intervalo.inicio:
+            heapq.heappop(abiertos)
+
+        for _, _, abierto in abiertos:
+            conflictos.append((abierto, intervalo))
+        heapq.heappush(abiertos, (intervalo.fin, next(desempate), intervalo))
+
+    return conflictos
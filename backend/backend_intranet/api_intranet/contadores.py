@@ -0,0 +1,180 @@
+# ======================================================
+# CONTADORES - Descargas y visualizaciones con escritura diferida
+# Ubicación: api_intranet/contadores.py
+# ======================================================
+#
+# Cada descarga o visualización suma 1 en memoria del proceso. Cada
+# DOCUMENTOS_CONTADORES_INTERVALO segundos (y al terminar el proceso) se vacía
+# con un UPDATE ... SET descargas = descargas + n por documento, en vez de una
+# escritura por petición sobre la misma fila. El vaciado lo hace un hilo daemon
+# de cada proceso, aunque no lleguen más peticiones a ese worker. Si el proceso
+# muere sin vaciar se pierden a lo más los incrementos de ese intervalo.
+
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+
+logger = logging.getLogger(__name__)
+
+
+def _sumas(campos):
+    """{'descargas': 2} -> {'descargas': F('descargas') + 2}"""
+    return {campo: F(campo) + cantidad for campo, cantidad in campos.items()}
+
+
+def _agrupar(incrementos):
+    """{clave: {'descargas': 1}} -> {(('descargas', 1),): [claves]}: mismo incremento, mismo UPDATE"""
+    grupos = defaultdict(list)
+    for clave, campos in incrementos.items():
+        grupos[tuple(sorted(campos.items()))].append(clave)
+    return grupos
+
+
+def escribir(pendientes):
+    """
+    Aplica {(documento_id, hora, campo): cantidad} en Documento y ContadorDocumentoHora.
+    Los documentos con el mismo incremento comparten un UPDATE ... WHERE id IN (...),
+    así una descarga en lote de N documentos es una sola sentencia.
+    """
+    from .models import ContadorDocumentoHora, Documento
+
+    por_documento, por_hora = defaultdict(Counter), defaultdict(Counter)
+    for (documento_id, hora, campo), cantidad in pendientes.items():
+        por_documento[documento_id][campo] += cantidad
+        por_hora[hora, documento_id][campo] += cantidad
+
+    # Los documentos borrados desde entonces se descartan
+    existentes = set(Documento.objects.filter(pk__in=por_documento).values_list('pk', flat=True))
+
+    with transaction.atomic():
+        for campos, ids in _agrupar(por_documento).items():
+            Documento.objects.filter(pk__in=ids).update(**_sumas(dict(campos)))
+
+        por_hora = {clave: campos for clave, campos in por_hora.items() if clave[1] in existentes}
+        for campos, claves in _agrupar(por_hora).items():
+            campos = dict(campos)
+            for hora in {hora for hora, _ in claves}:
+                ids = [documento_id for h, documento_id in claves if h == hora]
+                filas = ContadorDocumentoHora.objects.filter(hora=hora, documento_id__in=ids)
+                con_fila = set(filas.values_list('documento_id', flat=True))
+                filas.update(**_sumas(campos))
+                nuevas = [
+                    ContadorDocumentoHora(documento_id=documento_id, hora=hora, **campos)
+                    for documento_id in ids if documento_id not in con_fila
+                ]
+                try:
+                    with transaction.atomic():
+                        ContadorDocumentoHora.objects.bulk_create(nuevas)
+                except IntegrityError:
+                    # Otro proceso creó alguna de estas filas entre la consulta y el INSERT
+                    for fila in nuevas:
+                        _sumar_hora(fila.documento_id, hora, campos)
+
+
+def _sumar_hora(documento_id, hora, campos):
+    from .models import ContadorDocumentoHora
+
+    fila = ContadorDocumentoHora.objects.filter(documento_id=documento_id, hora=hora)
+    if not fila.update(**_sumas(campos)):
+        ContadorDocumentoHora.objects.create(documento_id=documento_id, hora=hora, **campos)
+
+
+class BufferContadores:
+    """Incrementos pendientes por (documento, hora, campo) en memoria del proceso"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pendientes = Counter()
+        self._vaciado_en = time.monotonic()
+        # Proceso en que corre el hilo de vaciado (tras un fork el hijo inicia el suyo)
+        self._hilo_pid = None
+
+    def sumar(self, documento_ids, campo):
+        hora = timezone.now().replace(minute=0, second=0, microsecond=0)
+        with self._lock:
+            for documento_id in documento_ids:
+                self._pendientes[documento_id, hora, campo] += 1
+            vencido = time.monotonic() - self._vaciado_en >= settings.DOCUMENTOS_CONTADORES_INTERVALO
+            if not vencido and self._hilo_pid != os.getpid():
+                self._hilo_pid = os.getpid()
+                threading.Thread(target=self._vaciar_periodicamente, name='contadores', daemon=True).start()
+        if vencido:
+            self._vaciar_registrando()
+
+    def _vaciar_registrando(self):
+        try:
+            self.vaciar()
+        except Exception:
+            # La descarga no falla por esto: los incrementos quedan para el próximo intento
+            logger.exception('No se pudieron guardar los contadores de documentos')
+
+    def _vaciar_periodicamente(self):
+        """Hilo daemon: vacía el buffer al cumplirse el intervalo desde el último vaciado"""
+        while True:
+            intervalo = settings.DOCUMENTOS_CONTADORES_INTERVALO
+            if intervalo <= 0:
+                # Sin intervalo cada petición escribe lo suyo
+                with self._lock:
+                    self._hilo_pid = None
+                return
+            restante = self._vaciado_en + intervalo - time.monotonic()
+            if restante > 0:
+                # De a lo más un segundo, para notar si cambia el intervalo
+                time.sleep(min(restante, 1))
+                continue
+            try:
+                self._vaciar_registrando()
+            finally:
+                # La conexión de este hilo no queda abierta entre vaciados
+                connection.close()
+
+    def vaciar(self):
+        with self._lock:
+            pendientes, self._pendientes = self._pendientes, Counter()
+            self._vaciado_en = time.monotonic()
+        if not pendientes:
+            return
+        try:
+            escribir(pendientes)
+        except Exception:
+            # Se reintentan en el próximo vaciado
+            with self._lock:
+                self._pendientes.update(pendientes)
+            raise
+
+    def pendientes(self):
+        with self._lock:
+            return sum(self._pendientes.values())
+
+
+contadores = BufferContadores()
+
+
+def registrar_descarga(documento_id):
+    contadores.sumar([documento_id], 'descargas')
+
+
+def registrar_descargas(documento_ids):
+    """Una descarga de cada documento (p. ej. un ZIP en lote)"""
+    contadores.sumar(documento_ids, 'descargas')
+
+
+def registrar_visualizacion(documento_id):
+    contadores.sumar([documento_id], 'visualizaciones')
+
+
+@atexit.register
+def _vaciar_al_salir():
+    try:
+        contadores.vaciar()
+    except Exception:
+        logger.exception('No se pudieron guardar %s incrementos de contadores', contadores.pendientes())
@@ -0,0 +1,209 @@
+# ======================================================
+# DESCARGAS - Envío de archivos por trozos con Range y ETag
+# Ubicación: api_intranet/descargas.py
+# ======================================================
+#
+# Los visores de PDF piden los manuales por partes (Range); aquí se atienden
+# uno o varios rangos (206, multipart/byteranges) leyendo el archivo por
+# trozos, así que la memoria usada no depende del tamaño del archivo.
+# zip_en_trozos arma un ZIP al vuelo con el mismo principio.
+
+import io
+import re
+import secrets
+import zipfile
+
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header
+
+
+TAMANO_TROZO = 64 * 1024
+
+# Con más rangos que esto se ignora Range y se envía el archivo completo
+MAXIMO_RANGOS = 16
+
+PATRON_RANGO = re.compile(r'^\s*(\d*)\s*-\s*(\d*)\s*$')
+
+
+def parsear_rangos(cabecera, tamano):
+    """
+    Rangos (inicio, fin) inclusivos de una cabecera 'bytes=0-99,200-,-500'.
+    Retorna None si la cabecera falta o no se entiende (se envía todo) y [] si
+    ningún rango cae dentro del archivo (416). Los rangos traslapados o
+    contiguos se unen en uno.
+    """
+    if not cabecera:
+        return None
+    unidad, _, especificacion = cabecera.partition('=')
+    partes = especificacion.split(',')
+    if unidad.strip().lower() != 'bytes' or len(partes) > MAXIMO_RANGOS:
+        return None
+
+    rangos = []
+    for parte in partes:
+        match = PATRON_RANGO.match(parte)
+        if not match or not (match[1] or match[2]):
+            return None
+        if not match[1]:
+            # Sufijo: los últimos N bytes
+            largo = int(match[2])
+            if largo and tamano:
+                rangos.append((max(0, tamano - largo), tamano - 1))
+            continue
+        inicio = int(match[1])
+        if match[2] and int(match[2]) < inicio:
+            return None
+        fin = int(match[2]) if match[2] else tamano - 1
+        if inicio < tamano:
+            rangos.append((inicio, min(fin, tamano - 1)))
+
+    unidos = []
+    for inicio, fin in sorted(rangos):
+        if unidos and inicio <= unidos[-1][1] + 1:
+            unidos[-1] = (unidos[-1][0], max(unidos[-1][1], fin))
+        else:
+            unidos.append((inicio, fin))
+    return unidos
+
+
+def _leer(archivo, inicio, fin):
+    archivo.seek(inicio)
+    restante = fin - inicio + 1
+    while restante > 0:
+        trozo = archivo.read(min(TAMANO_TROZO, restante))
+        if not trozo:
+            break
+        restante -= len(trozo)
+        yield trozo
+
+
+def _rango(archivo, inicio, fin):
+    try:
+        yield from _leer(archivo, inicio, fin)
+    finally:
+        archivo.close()
+
+
+def _multiparte(archivo, partes, cierre):
+    try:
+        for encabezado, inicio, fin in partes:
+            yield encabezado
+            yield from _leer(archivo, inicio, fin)
+            yield b'\r\n'
+        yield cierre
+    finally:
+        archivo.close()
+
+
+def _if_range_vigente(request, etag):
+    """If-Range solo vale si trae exactamente el ETag fuerte actual"""
+    if_range = request.headers.get('If-Range')
+    if if_range is None:
+        return True
+    return etag is not None and if_range.strip() == etag
+
+
+def respuesta_archivo(request, abrir, content_type, nombre, etag=None):
+    """
+    Respuesta para descargar el archivo que entrega `abrir()` (binario, con seek).
+    Atiende If-None-Match (304), Range con uno o varios rangos (206) e If-Range.
+    `etag` debe ser fuerte y derivado del contenido; sin él no se responde 304
+    y un If-Range hace enviar el archivo completo.
+    """
+    if etag:
+        no_modificado = get_conditional_response(request, etag=etag)
+        if no_modificado is not None:
+            no_modificado['ETag'] = etag
+            return no_modificado
+
+    archivo = abrir()
+    tamano = archivo.seek(0, 2)
+    rangos = None
+    if request.method == 'GET' and _if_range_vigente(request, etag):
+        rangos = parsear_rangos(request.headers.get('Range'), tamano)
+
+    if rangos is None:
+        archivo.seek(0)
+        response = FileResponse(archivo, content_type=content_type, filename=nombre)
+        response.block_size = TAMANO_TROZO
+    elif not rangos:
+        archivo.close()
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{tamano}'
+    elif len(rangos) == 1:
+        inicio, fin = rangos[0]
+        response = StreamingHttpResponse(_rango(archivo, inicio, fin), status=206, content_type=content_type)
+        response['Content-Range'] = f'bytes {inicio}-{fin}/{tamano}'
+        response['Content-Length'] = fin - inicio + 1
+    else:
+        separador = secrets.token_hex(16)
+        partes = [
+            (
+                f'--{separador}\r\nContent-Type: {content_type}\r\n'
+                f'Content-Range: bytes {inicio}-{fin}/{tamano}\r\n\r\n'.encode(),
+                inicio, fin,
+            )
+            for inicio, fin in rangos
+        ]
+        cierre = f'--{separador}--\r\n'.encode()
+        response = StreamingHttpResponse(
+            _multiparte(archivo, partes, cierre), status=206,
+            content_type=f'multipart/byteranges; boundary={separador}',
+        )
+        response['Content-Length'] = len(cierre) + sum(
+            len(encabezado) + fin - inicio + 1 + 2 for encabezado, inicio, fin in partes
+        )
+
+    if response.status_code == 206:
+        response['Content-Disposition'] = content_disposition_header(False, nombre)
+    if etag:
+        response['ETag'] = etag
+    response['Accept-Ranges'] = 'bytes'
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+# ======================================================
+# ZIP AL VUELO
+# ======================================================
+
+class SalidaZip(io.RawIOBase):
+    """Destino no buscable para ZipFile: acumula lo escrito hasta que se envía"""
+
+    def __init__(self):
+        super().__init__()
+        self._partes = []
+
+    def writable(self):
+        return True
+
+    def write(self, datos):
+        self._partes.append(bytes(datos))
+        return len(datos)
+
+    def vaciar(self):
+        datos = b''.join(self._partes)
+        self._partes.clear()
+        return datos
+
+
+def _zip(entradas):
+    salida = SalidaZip()
+    # PDF, imágenes y documentos de Office ya vienen comprimidos: se guardan tal cual
+    with zipfile.ZipFile(salida, 'w', compression=zipfile.ZIP_STORED) as archivo_zip:
+        for nombre, abrir in entradas:
+            with abrir() as origen, archivo_zip.open(nombre, 'w') as destino:
+                for trozo in iter(lambda: origen.read(TAMANO_TROZO), b''):
+                    destino.write(trozo)
+                    yield salida.vaciar()
+            yield salida.vaciar()
+    yield salida.vaciar()
+
+
+def zip_en_trozos(entradas):
+    """
+    ZIP con un archivo por cada (nombre, abrir) de `entradas`, escrito y enviado de
+    a un trozo: en memoria solo vive el trozo en curso, nunca un archivo completo.
+    """
+    return (trozo for trozo in _zip(entradas) if trozo)
@@ -0,0 +1,101 @@
+# ======================================================
+# DÍAS HÁBILES - Calendario laboral precalculado por año
+# Ubicación: api_intranet/dias_habiles.py
+# ======================================================
+
+import threading
+import time as reloj
+from array import array
+from datetime import date, timedelta
+from decimal import Decimal
+
+from .models import Feriado
+
+
+# Cada proceso guarda su propio calendario; el TTL acota cuánto tarda en ver
+# un feriado agregado desde otro proceso (en el mismo proceso se invalida al guardar).
+DURACION_CACHE = 60 * 60
+
+# anio -> (cargado_en, mascara de días hábiles, sumas prefijas)
+_calendarios = {}
+_lock = threading.Lock()
+
+
+def _construir_calendario(anio):
+    feriados = set(Feriado.objects.filter(fecha__year=anio).values_list('fecha', flat=True))
+    primer_dia = date(anio, 1, 1)
+    total_dias = (date(anio + 1, 1, 1) - primer_dia).days
+
+    mascara = bytearray(total_dias)
+    prefijos = array('H', [0]) * (total_dias + 1)  # prefijos[i] = hábiles antes del día i
+    for i in range(total_dias):
+        dia = primer_dia + timedelta(days=i)
+        habil = dia.weekday() < 5 and dia not in feriados
+        mascara[i] = habil
+        prefijos[i + 1] = prefijos[i] + habil
+    return bytes(mascara), prefijos
+
+
+def _calendario(anio):
+    entrada = _calendarios.get(anio)
+    if entrada is None or reloj.monotonic() - entrada[0] > DURACION_CACHE:
+        with _lock:
+            entrada = _calendarios.get(anio)
+            if entrada is None or reloj.monotonic() - entrada[0] > DURACION_CACHE:
+                entrada = (reloj.monotonic(), *_construir_calendario(anio))
+                _calendarios[anio] = entrada
+    return entrada[1], entrada[2]
+
+
+def invalidar_calendario(anio=None):
+    """Descarta el calendario de un año (o todos) para recalcularlo en la próxima consulta"""
+    with _lock:
+        if anio is None:
+            _calendarios.clear()
+        else:
+            _calendarios.pop(anio, None)
+
+
+def es_dia_habil(fecha):
+    mascara, _ = _calendario(fecha.year)
+    return bool(mascara[fecha.timetuple().tm_yday - 1])
+
+
+def contar_dias_habiles(fecha_inicio, fecha_termino):
+    """
+    Días hábiles entre dos fechas (ambas inclusive), sin fines de semana ni feriados.
+    O(1) por año abarcado: diferencia de sumas prefijas.
+    """
+    if fecha_inicio > fecha_termino:
+        return 0
+
+    total = 0
+    for anio in range(fecha_inicio.year, fecha_termino.year + 1):
+        _, prefijos = _calendario(anio)
+        desde = fecha_inicio.timetuple().tm_yday - 1 if anio == fecha_inicio.year else 0
+        hasta = fecha_termino.timetuple().tm_yday if anio == fecha_termino.year else len(prefijos) - 1
+        total += prefijos[hasta] - prefijos[desde]
+    return total
+
+
+def validar_cantidad_dias(tipo, fecha_inicio, fecha_termino, cantidad, es_medio_dia=False):
+    """
+    Verifica que la cantidad declarada coincida con los días hábiles del rango.
+    Aplica a vacaciones y días administrativos; retorna el mensaje de error o None.
+    """
+    if tipo not in ('vacaciones', 'dia_administrativo'):
+        return None
+
+    habiles = contar_dias_habiles(fecha_inicio, fecha_termino)
+    if habiles == 0:
+        return "El rango seleccionado no contiene días hábiles."
+
+    cantidad = Decimal(str(cantidad))
+    if tipo == 'dia_administrativo' and es_medio_dia:
+        if fecha_inicio != fecha_termino or cantidad != Decimal('0.5'):
+            return "Un medio día administrativo debe ser de 0.5 días en una sola fecha."
+        return None
+
+    if cantidad != habiles:
+        return f"La cantidad de días no coincide con los días hábiles del rango ({habiles})."
+    return None
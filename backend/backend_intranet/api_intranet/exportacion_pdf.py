@@ -0,0 +1,85 @@
+# ======================================================
+# EXPORTACION_PDF - Descarga masiva de PDF de solicitudes aprobadas
+# Ubicación: api_intranet/exportacion_pdf.py
+# ======================================================
+#
+# El ZIP se entrega como generador de bytes para StreamingHttpResponse: en memoria
+# solo vive el trozo que se está enviando, no el archivo completo. El PDF unido no
+# puede armarse así (pypdf mantiene todas las páginas hasta escribirlo), de modo
+# que lo genera render_worker (ExportacionPDF) y se descarga ya terminado.
+# Los dos parten de los PDF individuales en caché; los que faltan se generan en
+# el pool.
+
+import tempfile
+from concurrent.futures import as_completed
+from functools import partial
+
+from django.core.files import File
+from django.core.files.storage import default_storage
+from pypdf import PdfWriter
+
+from . import descargas
+from .cola_pdf import crear_pool, renderizar_solicitud
+
+
+def _pdfs(solicitudes, procesos, pool=None):
+    """
+    (numero_solicitud, ruta) de cada solicitud. Primero las que ya tienen su PDF vigente;
+    mientras se envían, las que faltan se generan en paralelo en un pool de procesos
+    (`pool` si se entrega, como el de render_worker; si no, uno propio de `procesos`).
+    """
+    faltantes = {}
+    for solicitud in solicitudes:
+        ruta = solicitud.pdf_vigente()
+        if ruta:
+            yield solicitud.numero_solicitud, ruta
+        else:
+            faltantes[solicitud.pk] = solicitud.numero_solicitud
+
+    if pool is None and (procesos <= 0 or len(faltantes) <= 1):
+        for solicitud_id in faltantes:
+            _, ruta = renderizar_solicitud(solicitud_id)
+            yield faltantes[solicitud_id], ruta
+        return
+
+    propio = pool is None
+    if propio:
+        pool = crear_pool(min(procesos, len(faltantes)))
+    futuros = [pool.submit(renderizar_solicitud, solicitud_id) for solicitud_id in faltantes]
+    try:
+        for futuro in as_completed(futuros):
+            solicitud_id, ruta = futuro.result()
+            yield faltantes[solicitud_id], ruta
+    finally:
+        # Si el cliente corta la descarga no se siguen generando PDF
+        if propio:
+            pool.shutdown(wait=True, cancel_futures=True)
+        else:
+            for futuro in futuros:
+                futuro.cancel()
+
+
+def zip_en_trozos(solicitudes, procesos):
+    """ZIP con un PDF por solicitud, escrito y enviado de a un trozo"""
+    return descargas.zip_en_trozos(
+        (f'Solicitud_{numero}.pdf', partial(default_storage.open, ruta, 'rb'))
+        for numero, ruta in _pdfs(solicitudes, procesos)
+    )
+
+
+def pdf_unido(solicitudes, nombre, procesos=0, pool=None):
+    """
+    Un solo PDF con todas las solicitudes en orden de número, guardado en MEDIA
+    como `nombre` (se reemplaza si existe). Retorna la ruta guardada.
+    """
+    rutas = dict(_pdfs(solicitudes, procesos, pool))
+    escritor = PdfWriter()
+    for numero in sorted(rutas):
+        with default_storage.open(rutas[numero], 'rb') as archivo:
+            escritor.append(archivo)
+    with tempfile.TemporaryFile() as temporal:
+        escritor.write(temporal)
+        escritor.close()
+        temporal.seek(0)
+        default_storage.delete(nombre)
+        return default_storage.save(nombre, File(temporal))
@@ -0,0 +1,143 @@
+# ======================================================
+# IMÁGENES - Variantes WebP para srcset
+# Ubicación: api_intranet/imagenes.py
+# ======================================================
+#
+# Las imágenes de Actividad, Anuncio y el avatar de Usuario se suben a tamaño
+# completo (capturas PNG de varios MB). Al guardarlas se generan copias WebP
+# a unos pocos anchos en <carpeta>/variantes/, sin EXIF (la ubicación GPS de
+# las fotos de celular, entre otros), y se anotan en el modelo el ancho y
+# alto del original y {ancho: archivo} de las variantes. Los listados
+# entregan ese mapa para el srcset y el navegador baja la que necesita.
+#
+# El original sigue disponible en el campo de imagen, así que tampoco conserva
+# el EXIF: si lo trae se reescribe sin él, con la orientación ya aplicada.
+
+import logging
+import posixpath
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import ExifTags, Image, ImageOps
+
+
+logger = logging.getLogger(__name__)
+
+CALIDAD_WEBP = 80
+# Al reescribir un JPEG o WebP original sin EXIF
+CALIDAD_ORIGINAL = 92
+
+
+def srcset(variantes):
+    """{'320': '/media/.../x_320w.webp', ...} para armar el atributo srcset"""
+    return {
+        ancho: default_storage.url(nombre)
+        for ancho, nombre in (variantes or {}).get('anchos', {}).items()
+    }
+
+
+def actualizar(instancia, campo, anchos):
+    """
+    Regenera las variantes de `instancia.<campo>` si la imagen cambió desde la
+    última vez y guarda <campo>_ancho, <campo>_alto y <campo>_variantes con un
+    UPDATE. Los errores se registran: el guardado no debe fallar por esto.
+    """
+    archivo = getattr(instancia, campo)
+    anteriores = getattr(instancia, f'{campo}_variantes') or {}
+    origen = archivo.name if archivo else ''
+    if anteriores.get('origen', '') == origen:
+        return False
+
+    valores = {f'{campo}_ancho': None, f'{campo}_alto': None, f'{campo}_variantes': {}}
+    if archivo:
+        try:
+            limpio = quitar_exif(archivo)
+            if limpio != origen:
+                setattr(instancia, campo, limpio)
+                archivo = getattr(instancia, campo)
+                origen = valores[campo] = limpio
+            tamano, generadas = generar(archivo, anchos)
+        except Exception as error:
+            logger.warning('No se pudieron generar las variantes de %s: %s', origen, error)
+            return False
+        valores.update({
+            f'{campo}_ancho': tamano[0],
+            f'{campo}_alto': tamano[1],
+            f'{campo}_variantes': {'origen': origen, 'anchos': generadas},
+        })
+
+    for nombre in anteriores.get('anchos', {}).values():
+        default_storage.delete(nombre)
+    for atributo, valor in valores.items():
+        setattr(instancia, atributo, valor)
+    type(instancia)._default_manager.filter(pk=instancia.pk).update(**valores)
+    return True
+
+
+def quitar_exif(archivo):
+    """
+    Reescribe el original sin EXIF, girado según su orientación, y retorna el nombre
+    con que quedó (uno nuevo, para no pisar el archivo mientras se escribe). Si no
+    trae EXIF no se toca y retorna el mismo nombre.
+    """
+    with archivo.open('rb') as entrada:
+        imagen = Image.open(entrada)
+        formato = imagen.format
+        if not imagen.getexif() and 'exif' not in imagen.info:
+            return archivo.name
+        imagen = ImageOps.exif_transpose(imagen)
+        imagen.info.pop('exif', None)
+        salida = BytesIO()
+        opciones = {'quality': CALIDAD_ORIGINAL} if formato in ('JPEG', 'WEBP') else {}
+        imagen.save(salida, formato, exif=b'', **opciones)
+
+    anterior = archivo.name
+    nombre = default_storage.save(anterior, ContentFile(salida.getvalue()))
+    default_storage.delete(anterior)
+    return nombre
+
+
+def generar(archivo, anchos):
+    """
+    Escribe las variantes WebP de `archivo` y retorna ((ancho, alto) del
+    original, {'320': nombre, ...}). No se amplía: los anchos mayores que el
+    original se reemplazan por una sola variante al ancho original.
+    """
+    with archivo.open('rb') as entrada:
+        imagen = Image.open(entrada)
+        tamano_original = _tamano_orientado(imagen)
+        # JPEG: decodifica directamente a una escala cercana al ancho mayor (caja
+        # cuadrada: antes de girar según el EXIF el ancho puede ser el alto)
+        imagen.draft('RGB', (max(anchos), max(anchos)))
+        imagen = ImageOps.exif_transpose(imagen)
+        imagen = imagen.convert('RGBA' if _tiene_alfa(imagen) else 'RGB')
+
+    objetivos = sorted({min(ancho, tamano_original[0]) for ancho in anchos}, reverse=True)
+
+    carpeta, nombre = posixpath.split(archivo.name)
+    base = posixpath.splitext(nombre)[0]
+    generadas = {}
+    # Del mayor al menor, cada variante se reduce desde la anterior
+    for ancho in objetivos:
+        alto = max(1, round(imagen.height * ancho / imagen.width))
+        imagen = imagen.resize((ancho, alto), Image.Resampling.LANCZOS)
+        salida = BytesIO()
+        # Sin exif=: Pillow no copia los metadatos del original
+        imagen.save(salida, 'WEBP', quality=CALIDAD_WEBP, method=4)
+        destino = posixpath.join(carpeta, 'variantes', f'{base}_{ancho}w.webp')
+        generadas[str(ancho)] = default_storage.save(destino, ContentFile(salida.getvalue()))
+    return tamano_original, dict(sorted(generadas.items(), key=lambda par: int(par[0])))
+
+
+def _tamano_orientado(imagen):
+    """Tamaño real del original, girado si el EXIF indica 90° o 270°"""
+    ancho, alto = imagen.size
+    orientacion = imagen.getexif().get(ExifTags.Base.Orientation, 1)
+    if orientacion in (5, 6, 7, 8):
+        return alto, ancho
+    return ancho, alto
+
+
+def _tiene_alfa(imagen):
+    return imagen.mode in ('RGBA', 'LA', 'PA') or 'transparency' in imagen.info
@@ -0,0 +1,89 @@
+# ======================================================
+# BENCHMARK - Suite de rendimiento con línea base JSON
+# Ubicación: backend/backend_intranet/api_intranet/management/commands/benchmark.py
+# ======================================================
+#
+# Uso:
+#   python manage.py benchmark --salida base.json           # genera la línea base
+#   python manage.py benchmark --base base.json             # falla si hay regresiones
+#
+# Corre sobre una base de datos de pruebas temporal (como `manage.py test`),
+# así que no modifica los datos reales.
+
+import json
+import platform
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from api_intranet.benchmarks import CASOS, comparar, ejecutar
+from api_intranet.benchmarks.casos import TAMANOS_LISTADO
+
+
+class Command(BaseCommand):
+    help = 'Mide PDF, aprobación, validación, listados de solicitudes y envío de notificaciones; compara contra una línea base'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--casos', nargs='+', choices=sorted(CASOS), help='Casos a medir (por defecto, todos)')
+        parser.add_argument('--repeticiones', type=int, default=30)
+        parser.add_argument(
+            '--tamanos', type=int, nargs=2, default=list(TAMANOS_LISTADO), metavar=('CHICO', 'GRANDE'),
+            help='Solicitudes de los listados chico y grande (por defecto 1000 10000)'
+        )
+        parser.add_argument('--salida', help='Escribe los resultados en este archivo JSON')
+        parser.add_argument('--base', help='Línea base JSON con la que comparar')
+        parser.add_argument(
+            '--umbral', type=float, default=0.25,
+            help='Tolerancia de latencia p50 y memoria sobre la base (0.25 = 25 %%)'
+        )
+
+    def handle(self, *args, **options):
+        base = None
+        if options['base']:
+            with open(options['base'], encoding='utf-8') as archivo:
+                base = json.load(archivo)
+            if base['tamanos'] != options['tamanos']:
+                raise CommandError(
+                    f"La base se midió con tamaños {base['tamanos']}; use --tamanos {base['tamanos'][0]} {base['tamanos'][1]}"
+                )
+
+        self.stdout.write(f"{'caso':24} {'p50':>9} {'p90':>9} {'p99':>9} {'pico KiB':>10} {'consultas':>9}")
+        setup_test_environment()
+        nombre_original = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            resultados = ejecutar(
+                options['casos'], options['repeticiones'], options['tamanos'], al_terminar=self._mostrar
+            )
+        finally:
+            connection.creation.destroy_test_db(nombre_original, verbosity=0)
+            teardown_test_environment()
+
+        informe = {
+            'generado_en': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'base_de_datos': connection.vendor,
+            'repeticiones': options['repeticiones'],
+            'tamanos': options['tamanos'],
+            'casos': resultados,
+        }
+        if options['salida']:
+            with open(options['salida'], 'w', encoding='utf-8') as archivo:
+                json.dump(informe, archivo, indent=2, ensure_ascii=False)
+            self.stdout.write(f"Resultados guardados en {options['salida']}")
+
+        if base is None:
+            return
+        regresiones = comparar(resultados, base['casos'], options['umbral'])
+        if regresiones:
+            for regresion in regresiones:
+                self.stdout.write(self.style.ERROR(f'  ✗ {regresion}'))
+            raise CommandError(f'{len(regresiones)} regresiones respecto de {options["base"]}')
+        self.stdout.write(self.style.SUCCESS('✓ Sin regresiones respecto de la línea base'))
+
+    def _mostrar(self, nombre, r):
+        self.stdout.write(
+            f"{nombre:24} {r['p50_ms']:7.2f}ms {r['p90_ms']:7.2f}ms {r['p99_ms']:7.2f}ms "
+            f"{r['pico_kib']:10.1f} {r['consultas']:9d}"
+        )
@@ -0,0 +1,68 @@
+# ======================================================
+# BENCHMARK DÍAS HÁBILES - Conteo sobre rangos aleatorios
+# Ubicación: backend/backend_intranet/api_intranet/management/commands/benchmark_dias_habiles.py
+# ======================================================
+
+import random
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+
+from api_intranet.dias_habiles import contar_dias_habiles, invalidar_calendario
+from api_intranet.models import Feriado
+
+
+def contar_dia_a_dia(fecha_inicio, fecha_termino, feriados):
+    """Conteo ingenuo, recorre cada día del rango (solo para comparar)"""
+    total = 0
+    dia = fecha_inicio
+    while dia <= fecha_termino:
+        if dia.weekday() < 5 and dia not in feriados:
+            total += 1
+        dia += timedelta(days=1)
+    return total
+
+
+class Command(BaseCommand):
+    help = 'Mide contar_dias_habiles sobre N rangos aleatorios y lo compara con el conteo día a día'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--n', type=int, default=100_000, help='Cantidad de rangos (por defecto 100.000)')
+        parser.add_argument('--anio', type=int, default=2025, help='Año inicial de los rangos')
+        parser.add_argument('--max-dias', type=int, default=60, help='Largo máximo de cada rango')
+        parser.add_argument('--semilla', type=int, default=42)
+
+    def handle(self, *args, **options):
+        n = options['n']
+        azar = random.Random(options['semilla'])
+        base = date(options['anio'], 1, 1)
+        rangos = []
+        for _ in range(n):
+            inicio = base + timedelta(days=azar.randrange(730))
+            rangos.append((inicio, inicio + timedelta(days=azar.randrange(options['max_dias']))))
+
+        # Primera llamada en frío: incluye la consulta de feriados y la construcción del calendario
+        invalidar_calendario()
+        t0 = time.perf_counter()
+        contar_dias_habiles(*rangos[0])
+        frio = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        calculados = [contar_dias_habiles(inicio, termino) for inicio, termino in rangos]
+        rapido = time.perf_counter() - t0
+
+        feriados = set(Feriado.objects.values_list('fecha', flat=True))
+        t0 = time.perf_counter()
+        esperados = [contar_dia_a_dia(inicio, termino, feriados) for inicio, termino in rangos]
+        ingenuo = time.perf_counter() - t0
+
+        diferencias = sum(1 for a, b in zip(calculados, esperados) if a != b)
+        self.stdout.write(f'Rangos:              {n:,}')
+        self.stdout.write(f'Construcción (frío): {frio * 1000:.2f} ms')
+        self.stdout.write(f'Sumas prefijas:      {rapido * 1e6 / n:.2f} µs/rango ({rapido:.3f} s)')
+        self.stdout.write(f'Día a día:           {ingenuo * 1e6 / n:.2f} µs/rango ({ingenuo:.3f} s)')
+        if diferencias:
+            self.stdout.write(self.style.ERROR(f'✗ {diferencias} rangos con resultado distinto'))
+        else:
+            self.stdout.write(self.style.SUCCESS('✓ Ambos métodos coinciden en todos los rangos'))
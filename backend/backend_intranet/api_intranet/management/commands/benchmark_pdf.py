@@ -0,0 +1,70 @@
+# ======================================================
+# BENCHMARK PDF - Costo por PDF con y sin la plantilla compartida
+# Ubicación: backend/backend_intranet/api_intranet/management/commands/benchmark_pdf.py
+# ======================================================
+
+import statistics
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+
+from api_intranet.benchmarks.casos import solicitud_de_ejemplo
+from api_intranet.pdf_generator import SolicitudPDFGenerator, construir_plantilla, plantilla_compartida
+
+
+class Command(BaseCommand):
+    help = 'Mide latencia y asignaciones por PDF armando la plantilla en cada llamada o compartiéndola'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--n', type=int, default=200, help='PDF por escenario (por defecto 200)')
+
+    def medir(self, n, crear_generador, solicitud):
+        tiempos, armado = [], []
+        for _ in range(n):
+            t0 = time.perf_counter()
+            generador = crear_generador()
+            t1 = time.perf_counter()
+            generador.generate_solicitud_pdf(solicitud)
+            tiempos.append(time.perf_counter() - t0)
+            armado.append(t1 - t0)
+
+        # Memoria del armado del generador, aparte para no distorsionar los tiempos
+        tracemalloc.start()
+        antes = tracemalloc.take_snapshot()
+        generador = crear_generador()
+        despues = tracemalloc.take_snapshot()
+        _, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        bloques = sum(diff.count_diff for diff in despues.compare_to(antes, 'filename') if diff.count_diff > 0)
+        del generador
+
+        tiempos.sort()
+        return {
+            'armado': statistics.fmean(armado) * 1e6,
+            'bloques': bloques,
+            'pico': pico / 1024,
+            'media': statistics.fmean(tiempos) * 1000,
+            'p50': tiempos[len(tiempos) // 2] * 1000,
+            'p95': tiempos[int(len(tiempos) * 0.95) - 1] * 1000,
+        }
+
+    def handle(self, *args, **options):
+        n = options['n']
+        solicitud = solicitud_de_ejemplo()
+        plantilla_compartida()  # El primer uso construye la plantilla
+
+        escenarios = [
+            ('Plantilla por PDF', lambda: SolicitudPDFGenerator(construir_plantilla())),
+            ('Plantilla compartida', SolicitudPDFGenerator),
+        ]
+        self.stdout.write(f'PDF por escenario: {n}')
+        self.stdout.write(
+            f"{'':22} {'armado':>10} {'bloques':>8} {'KiB':>7}   {'PDF media':>9} {'p50':>9} {'p95':>9}"
+        )
+        for nombre, crear in escenarios:
+            r = self.medir(n, crear, solicitud)
+            self.stdout.write(
+                f"{nombre:22} {r['armado']:8.1f}µs {r['bloques']:8d} {r['pico']:7.1f}   "
+                f"{r['media']:7.2f}ms {r['p50']:7.2f}ms {r['p95']:7.2f}ms"
+            )
@@ -0,0 +1,101 @@
+# ======================================================
+# CARGAR FERIADOS - Feriados legales de Chile para un año
+# Ubicación: backend/backend_intranet/api_intranet/management/commands/cargar_feriados.py
+# ======================================================
+
+from datetime import date, datetime, timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api_intranet.models import Feriado
+
+
+def domingo_de_pascua(anio):
+    """Algoritmo gregoriano anónimo (Meeus/Jones/Butcher)"""
+    a = anio % 19
+    b, c = divmod(anio, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    mes, dia = divmod(h + l - 7 * m + 114, 31)
+    return date(anio, mes, dia + 1)
+
+
+def solsticio_de_invierno(anio):
+    """Fecha del solsticio de junio en hora de Chile continental (UTC-4), según Meeus cap. 27"""
+    y = (anio - 2000) / 1000
+    jde = 2451716.56767 + 365241.62603 * y + 0.00325 * y ** 2 + 0.00888 * y ** 3 - 0.00030 * y ** 4
+    instante_utc = datetime(2000, 1, 1, 12) + timedelta(days=jde - 2451545.0)
+    return (instante_utc - timedelta(hours=4)).date()
+
+
+def trasladar_a_lunes(fecha):
+    """Ley 19.668: martes a jueves pasa al lunes anterior; viernes, al lunes siguiente"""
+    if fecha.weekday() in (1, 2, 3):
+        return fecha - timedelta(days=fecha.weekday())
+    if fecha.weekday() == 4:
+        return fecha + timedelta(days=3)
+    return fecha
+
+
+def feriados_de_chile(anio):
+    """Lista de (fecha, nombre, irrenunciable) según la legislación vigente"""
+    pascua = domingo_de_pascua(anio)
+    feriados = [
+        (date(anio, 1, 1), 'Año Nuevo', True),
+        (pascua - timedelta(days=2), 'Viernes Santo', False),
+        (pascua - timedelta(days=1), 'Sábado Santo', False),
+        (date(anio, 5, 1), 'Día Nacional del Trabajo', True),
+        (date(anio, 5, 21), 'Día de las Glorias Navales', False),
+        (solsticio_de_invierno(anio), 'Día Nacional de los Pueblos Indígenas', False),
+        (trasladar_a_lunes(date(anio, 6, 29)), 'San Pedro y San Pablo', False),
+        (date(anio, 7, 16), 'Día de la Virgen del Carmen', False),
+        (date(anio, 8, 15), 'Asunción de la Virgen', False),
+        (date(anio, 9, 18), 'Independencia Nacional', True),
+        (date(anio, 9, 19), 'Día de las Glorias del Ejército', True),
+        (trasladar_a_lunes(date(anio, 10, 12)), 'Encuentro de Dos Mundos', False),
+        (date(anio, 11, 1), 'Día de Todos los Santos', False),
+        (date(anio, 12, 8), 'Inmaculada Concepción', False),
+        (date(anio, 12, 25), 'Navidad', True),
+    ]
+
+    # Fiestas Patrias: se agrega el 17 si el 18 cae martes, o el 20 si el 19 cae jueves
+    if date(anio, 9, 18).weekday() == 1:
+        feriados.append((date(anio, 9, 17), 'Fiestas Patrias (interferiado legal)', False))
+    if date(anio, 9, 19).weekday() == 3:
+        feriados.append((date(anio, 9, 20), 'Fiestas Patrias (interferiado legal)', False))
+
+    # Iglesias Evangélicas (Ley 20.299): martes pasa al viernes anterior, miércoles al siguiente
+    evangelicas = date(anio, 10, 31)
+    if evangelicas.weekday() == 1:
+        evangelicas -= timedelta(days=4)
+    elif evangelicas.weekday() == 2:
+        evangelicas += timedelta(days=2)
+    feriados.append((evangelicas, 'Día de las Iglesias Evangélicas y Protestantes', False))
+
+    return sorted(feriados)
+
+
+class Command(BaseCommand):
+    help = (
+        'Carga los feriados legales de Chile del año indicado. Los feriados '
+        'extraordinarios (elecciones, interferiados por ley especial) se agregan desde el admin.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--anio', type=int, default=None, help='Año a cargar (por defecto, el actual)')
+
+    def handle(self, *args, **options):
+        anio = options['anio'] or timezone.now().year
+        for fecha, nombre, irrenunciable in feriados_de_chile(anio):
+            _, creado = Feriado.objects.update_or_create(
+                fecha=fecha, defaults={'nombre': nombre, 'irrenunciable': irrenunciable}
+            )
+            marca = '✓' if creado else '·'
+            self.stdout.write(f'  {marca} {fecha:%d/%m/%Y} {nombre}')
+        self.stdout.write(self.style.SUCCESS(f'Feriados {anio} cargados.'))
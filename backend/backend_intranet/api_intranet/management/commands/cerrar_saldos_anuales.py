@@ -0,0 +1,55 @@
+# ======================================================
+# CERRAR SALDOS ANUALES - Foto de saldos al 1 de enero
+# Ubicación: backend/backend_intranet/api_intranet/management/commands/cerrar_saldos_anuales.py
+# ======================================================
+
+from datetime import datetime
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db.models import Sum
+from django.utils import timezone
+
+from api_intranet.models import Usuario, MovimientoSaldo, SaldoAnual
+
+
+class Command(BaseCommand):
+    help = (
+        'Calcula el saldo de cada bolsa al 1 de enero del año indicado '
+        '(saldo actual menos los movimientos registrados desde esa fecha)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--anio', type=int, default=None, help='Año a cerrar (por defecto, el actual)')
+
+    def handle(self, *args, **options):
+        anio = options['anio'] or timezone.now().year
+        inicio_anio = timezone.make_aware(datetime(anio, 1, 1))
+
+        # Una sola consulta agregada para todos los movimientos desde el inicio del año
+        movido = {
+            (fila['usuario_id'], fila['bolsa']): fila['total']
+            for fila in MovimientoSaldo.objects.filter(creado_en__gte=inicio_anio)
+            .values('usuario_id', 'bolsa').annotate(total=Sum('delta'))
+        }
+
+        campos = Usuario.CAMPOS_SALDO
+        fotos = []
+        for usuario in Usuario.objects.values('id', *campos.values()).iterator():
+            for bolsa, campo in campos.items():
+                actual = Decimal(str(usuario[campo]))
+                fotos.append(SaldoAnual(
+                    usuario_id=usuario['id'],
+                    bolsa=bolsa,
+                    anio=anio,
+                    saldo_inicial=actual - movido.get((usuario['id'], bolsa), Decimal('0')),
+                ))
+
+        SaldoAnual.objects.bulk_create(
+            fotos,
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=['usuario', 'bolsa', 'anio'],
+            update_fields=['saldo_inicial', 'calculado_en'],
+        )
+        self.stdout.write(self.style.SUCCESS(f'✓ {len(fotos)} saldos iniciales registrados para {anio}.'))
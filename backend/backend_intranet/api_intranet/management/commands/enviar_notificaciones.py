@@ -0,0 +1,33 @@
+# ======================================================
+# ENVIAR NOTIFICACIONES - Procesa los avisos de anuncios, actividades y documentos
+# Ubicación: backend/backend_intranet/api_intranet/management/commands/enviar_notificaciones.py
+# ======================================================
+#
+# La API solo registra un EnvioNotificacion al crear el contenido; este worker
+# crea las notificaciones de cada aviso con un INSERT ... SELECT. Se pueden
+# correr varios a la vez (SKIP LOCKED).
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from api_intranet.models import EnvioNotificacion
+
+
+class Command(BaseCommand):
+    help = 'Crea las notificaciones de los anuncios, actividades y documentos nuevos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--intervalo', type=float, default=5.0, help='Segundos de espera si no hay avisos')
+        parser.add_argument('--una-vez', action='store_true', help='Envía los avisos pendientes y termina')
+
+    def handle(self, *args, **options):
+        while True:
+            for envio in EnvioNotificacion.enviar_pendientes():
+                self.stdout.write(self.style.SUCCESS(f'  {envio.objeto}: {envio.destinatarios} notificaciones'))
+            if options['una_vez']:
+                return
+            time.sleep(options['intervalo'])
+            # Descarta la conexión si quedó caída o vieja durante la espera
+            close_old_connections()
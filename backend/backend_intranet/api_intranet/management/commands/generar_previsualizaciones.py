@@ -0,0 +1,66 @@
+# ======================================================
+# GENERAR PREVISUALIZACIONES - Miniaturas de archivos existentes
+# Ubicación: backend/backend_intranet/api_intranet/management/commands/generar_previsualizaciones.py
+# ======================================================
+#
+# Los archivos nuevos tienen su miniatura desde que se suben; este comando la
+# genera para los documentos y adjuntos anteriores. Las miniaturas ya existentes
+# no se vuelven a generar, ni los contenidos marcados sin vista previa salvo con
+# --reintentar (p. ej. los PDF de solo texto después de instalar pdftoppm).
+
+from functools import partial
+
+from django.core.management.base import BaseCommand
+
+from api_intranet import blobs, previsualizaciones
+from api_intranet.models import AdjuntoAnuncio, Documento
+
+
+class Command(BaseCommand):
+    help = 'Genera las miniaturas que faltan de documentos y adjuntos de anuncios'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reintentar', action='store_true',
+            help='Vuelve a intentar los archivos marcados sin vista previa'
+        )
+
+    def handle(self, *args, **options):
+        generadas = 0
+        reintentar = options['reintentar']
+
+        documentos = Documento.objects.exclude(archivo_hash='').only(
+            'pk', 'storage_type', 'archivo_hash', 'nombre_archivo', 'mime_type'
+        )
+        for documento in documentos.iterator(chunk_size=100):
+            if not previsualizaciones.es_previsualizable(documento.nombre_archivo, documento.mime_type):
+                continue
+            if previsualizaciones.existe(documento.archivo_hash):
+                continue
+            # Los archivos que faltan o no se pueden leer quedan registrados en el log
+            ruta = previsualizaciones.generar(
+                documento.archivo_hash, documento.abrir_archivo, documento.nombre_archivo, documento.mime_type,
+                reintentar=reintentar,
+            )
+            generadas += ruta is not None
+
+        for adjunto in AdjuntoAnuncio.objects.iterator(chunk_size=100):
+            if not previsualizaciones.es_previsualizable(adjunto.nombre_archivo, adjunto.tipo_archivo):
+                continue
+            abrir = partial(adjunto.archivo.open, 'rb')
+            try:
+                if not adjunto.archivo_hash:
+                    with abrir() as archivo:
+                        adjunto.archivo_hash = blobs.calcular_huella(archivo)
+                    adjunto.save(update_fields=['archivo_hash'])
+            except FileNotFoundError:
+                self.stdout.write(self.style.WARNING(f'  ✗ Adjunto {adjunto.pk}: falta el archivo'))
+                continue
+            if previsualizaciones.existe(adjunto.archivo_hash):
+                continue
+            ruta = previsualizaciones.generar(
+                adjunto.archivo_hash, abrir, adjunto.nombre_archivo, adjunto.tipo_archivo, reintentar=reintentar
+            )
+            generadas += ruta is not None
+
+        self.stdout.write(self.style.SUCCESS(f'✓ {generadas} miniaturas generadas.'))
@@ -0,0 +1,35 @@
+# ======================================================
+# GENERAR VARIANTES DE IMÁGENES - WebP de imágenes existentes
+# Ubicación: backend/backend_intranet/api_intranet/management/commands/generar_variantes_imagenes.py
+# ======================================================
+#
+# Las imágenes nuevas tienen sus variantes desde que se suben; este comando
+# las genera para las actividades, anuncios y avatares anteriores. Las que ya
+# corresponden a la imagen actual no se vuelven a generar.
+
+from django.core.management.base import BaseCommand
+
+from api_intranet import imagenes
+from api_intranet.models import Actividad, Anuncio, Usuario
+
+
+class Command(BaseCommand):
+    help = 'Genera las variantes WebP que faltan de imágenes de actividades, anuncios y avatares'
+
+    def handle(self, *args, **options):
+        modelos = (
+            (Actividad, 'imagen', Actividad.ANCHOS_IMAGEN),
+            (Anuncio, 'imagen', Anuncio.ANCHOS_IMAGEN),
+            (Usuario, 'avatar', Usuario.ANCHOS_AVATAR),
+        )
+        for modelo, campo, anchos in modelos:
+            generadas = 0
+            filas = modelo.objects.exclude(**{campo: ''}).exclude(**{f'{campo}__isnull': True}).only(
+                'pk', campo, f'{campo}_variantes'
+            )
+            for instancia in filas.iterator(chunk_size=100):
+                # Los archivos que faltan o no se pueden leer quedan registrados en el log
+                generadas += imagenes.actualizar(instancia, campo, anchos)
+            self.stdout.write(f'  {modelo._meta.verbose_name_plural}: {generadas} imágenes procesadas')
+
+        self.stdout.write(self.style.SUCCESS('✓ Variantes de imágenes al día.'))
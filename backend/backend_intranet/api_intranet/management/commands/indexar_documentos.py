@@ -0,0 +1,46 @@
+# ======================================================
+# INDEXAR DOCUMENTOS - Texto de los archivos para la búsqueda
+# Ubicación: backend/backend_intranet/api_intranet/management/commands/indexar_documentos.py
+# ======================================================
+#
+# Los documentos nuevos se indexan en segundo plano al subirlos; este comando
+# completa los anteriores (o los que quedaron sin indexar si el proceso se
+# detuvo antes) y recalcula el tsvector de todos (solo PostgreSQL).
+
+from django.core.management.base import BaseCommand
+
+from api_intranet.busqueda import extraer_texto, soporta_texto_completo, vector_documento
+from api_intranet.models import Documento
+
+
+class Command(BaseCommand):
+    help = 'Extrae el texto de los archivos de Documento y recalcula el índice de búsqueda'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--todos', action='store_true',
+            help='Vuelve a extraer el texto también de los documentos que ya lo tienen'
+        )
+
+    def handle(self, *args, **options):
+        pendientes = Documento.objects.exclude(storage_type='s3').only(
+            'pk', 'storage_type', 'archivo_hash', 'nombre_archivo', 'mime_type'
+        )
+        if not options['todos']:
+            pendientes = pendientes.filter(texto_contenido='')
+
+        extraidos = 0
+        for documento in pendientes.iterator(chunk_size=100):
+            try:
+                texto = extraer_texto(documento.abrir_archivo, documento.nombre_archivo, documento.mime_type)
+            except FileNotFoundError:
+                self.stdout.write(self.style.WARNING(f'  ✗ {documento.pk}: falta el archivo'))
+                continue
+            if texto:
+                Documento.objects.filter(pk=documento.pk).update(texto_contenido=texto)
+                extraidos += 1
+
+        self.stdout.write(f'{extraidos} documentos con texto extraído.')
+        if soporta_texto_completo():
+            total = Documento.objects.update(busqueda=vector_documento())
+            self.stdout.write(self.style.SUCCESS(f'✓ Índice de búsqueda recalculado para {total} documentos.'))
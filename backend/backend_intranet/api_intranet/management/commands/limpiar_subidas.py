@@ -0,0 +1,34 @@
+# ======================================================
+# LIMPIAR SUBIDAS - Descarta subidas por trozos abandonadas
+# Ubicación: backend/backend_intranet/api_intranet/management/commands/limpiar_subidas.py
+# ======================================================
+
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api_intranet.models import SubidaDocumento
+
+
+class Command(BaseCommand):
+    help = 'Elimina las subidas de documentos sin actividad y sus archivos temporales'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--horas', type=int, default=48, help='Horas sin recibir trozos')
+
+    def handle(self, *args, **options):
+        limite = timezone.now() - timedelta(hours=options['horas'])
+        abandonadas = SubidaDocumento.objects.filter(estado='en_curso', actualizada_en__lt=limite)
+
+        total = 0
+        for subida in abandonadas.iterator():
+            subida.descartar_temporal()
+            subida.delete()
+            total += 1
+
+        # Las completadas ya no tienen temporal: solo se borra el registro
+        completadas, _ = SubidaDocumento.objects.filter(estado='completada', actualizada_en__lt=limite).delete()
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ {total} subidas abandonadas y {completadas} completadas eliminadas.'
+        ))
@@ -0,0 +1,48 @@
+# ======================================================
+# MIGRAR DOCUMENTOS BLOB - Saca los archivos de Documento de la base de datos
+# Ubicación: backend/backend_intranet/api_intranet/management/commands/migrar_documentos_blob.py
+# ======================================================
+#
+# Recorre los documentos con storage_type='database' por lotes (orden por pk),
+# copia cada archivo al almacén de blobs y deja archivo_contenido en NULL.
+# Cada fila se confirma por separado, así que se puede interrumpir y volver a
+# correr: las filas ya migradas dejan de calzar con el filtro.
+
+from django.core.management.base import BaseCommand
+
+from api_intranet import blobs
+from api_intranet.models import Documento
+
+
+class Command(BaseCommand):
+    help = 'Mueve el contenido de los documentos guardados en la base de datos al almacén de blobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=100, help='Documentos leídos por consulta')
+
+    def handle(self, *args, **options):
+        pendientes = Documento.objects.filter(
+            storage_type='database', archivo_contenido__isnull=False
+        ).order_by('pk')
+
+        migrados, ultimo = 0, None
+        while True:
+            lote = pendientes if ultimo is None else pendientes.filter(pk__gt=ultimo)
+            ids = list(lote.values_list('pk', flat=True)[:options['lote']])
+            if not ids:
+                break
+
+            for pk in ids:
+                # El contenido se lee fila por fila para no tener el lote completo en memoria
+                contenido = pendientes.filter(pk=pk).values_list('archivo_contenido', flat=True).first()
+                if contenido is None:
+                    continue
+                archivo_hash, tamano = blobs.guardar(contenido)
+                migrados += pendientes.filter(pk=pk).update(
+                    storage_type='filesystem', archivo_hash=archivo_hash,
+                    tamano=tamano, archivo_contenido=None,
+                )
+            ultimo = ids[-1]
+            self.stdout.write(f'  {migrados} documentos migrados...')
+
+        self.stdout.write(self.style.SUCCESS(f'✓ {migrados} documentos movidos al almacén de blobs.'))
@@ -0,0 +1,114 @@
+# ======================================================
+# RENDER WORKER - Procesa la cola de PDF de solicitudes
+# Ubicación: backend/backend_intranet/api_intranet/management/commands/render_worker.py
+# ======================================================
+#
+# Además de los TrabajoPDF, arma los PDF unidos de exportar_pdfs (ExportacionPDF),
+# de a uno por vuelta: los PDF que les faltan se generan en el mismo pool.
+
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.utils import timezone
+
+from api_intranet.cola_pdf import crear_pool, procesar_trabajo
+from api_intranet.models import ExportacionPDF, TrabajoPDF
+
+
+class Command(BaseCommand):
+    help = 'Genera los PDF encolados en TrabajoPDF y ExportacionPDF usando un pool de procesos'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--procesos', type=int, default=os.cpu_count() or 1,
+            help='Procesos del pool (por defecto, uno por núcleo). 0 procesa en este mismo proceso'
+        )
+        parser.add_argument('--intervalo', type=float, default=2.0, help='Segundos de espera si la cola está vacía')
+        parser.add_argument(
+            '--atascados', type=int, default=15,
+            help="Minutos tras los cuales un trabajo 'procesando' vuelve a la cola"
+        )
+        parser.add_argument('--una-vez', action='store_true', help='Vacía la cola y termina')
+
+    def handle(self, *args, **options):
+        antes_de = timezone.now() - timedelta(minutes=options['atascados'])
+        liberados = TrabajoPDF.liberar_atascados(antes_de) + ExportacionPDF.liberar_atascados(antes_de)
+        if liberados:
+            self.stdout.write(f'{liberados} trabajos atascados devueltos a la cola.')
+
+        if options['procesos'] <= 0:
+            self._en_proceso(options)
+        else:
+            self._con_pool(options)
+
+    def _informar(self, trabajo_id, estado):
+        estilo = self.style.SUCCESS if estado == 'completado' else self.style.WARNING
+        self.stdout.write(estilo(f'  {trabajo_id}: {estado}'))
+
+    def _exportar(self, procesos=0, pool=None):
+        """Arma el siguiente PDF unido pendiente. Retorna False si no había ninguno"""
+        ids = ExportacionPDF.tomar(1)
+        if not ids:
+            return False
+        exportacion = ExportacionPDF.objects.get(pk=ids[0])
+        self._informar(exportacion.pk, exportacion.ejecutar(procesos, pool))
+        return True
+
+    def _en_espera(self, options):
+        """Sin nada en cola: limpia las exportaciones vencidas y espera. Retorna True si debe terminar"""
+        ExportacionPDF.eliminar_vencidas()
+        if options['una_vez']:
+            return True
+        time.sleep(options['intervalo'])
+        return False
+
+    def _en_proceso(self, options):
+        while True:
+            ids = TrabajoPDF.tomar(1)
+            if ids:
+                self._informar(*procesar_trabajo(ids[0]))
+            if not self._exportar() and not ids and self._en_espera(options):
+                return
+
+    def _con_pool(self, options):
+        procesos = options['procesos']
+        self.stdout.write(f'Procesando la cola con {procesos} procesos...')
+        en_curso = {}
+        pool = crear_pool(procesos)
+        try:
+            while True:
+                close_old_connections()
+                # Solo se toma lo que el pool puede ejecutar ya: el resto queda para otros workers
+                libres = procesos - len(en_curso)
+                if libres:
+                    for trabajo_id in TrabajoPDF.tomar(libres):
+                        en_curso[pool.submit(procesar_trabajo, trabajo_id)] = trabajo_id
+
+                exportada = self._exportar(procesos, pool)
+                if not en_curso:
+                    if not exportada and self._en_espera(options):
+                        return
+                    continue
+
+                listos, _ = wait(en_curso, timeout=options['intervalo'], return_when=FIRST_COMPLETED)
+                for futuro in listos:
+                    trabajo_id = en_curso.pop(futuro)
+                    try:
+                        self._informar(*futuro.result())
+                    except Exception as e:
+                        # El proceso murió: el trabajo vuelve a la cola (o queda en error)
+                        estado = 'pendiente' if TrabajoPDF.objects.filter(
+                            pk=trabajo_id, intentos__lt=TrabajoPDF.MAXIMO_INTENTOS
+                        ).exists() else 'error'
+                        TrabajoPDF.objects.filter(pk=trabajo_id).update(estado=estado, error=str(e))
+                        self._informar(trabajo_id, estado)
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+            # Los que no alcanzaron a ejecutarse vuelven a la cola
+            TrabajoPDF.objects.filter(
+                pk__in=[pk for futuro, pk in en_curso.items() if futuro.cancelled()]
+            ).update(estado='pendiente')
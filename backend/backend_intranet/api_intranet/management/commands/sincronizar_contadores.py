@@ -0,0 +1,65 @@
+# ======================================================
+# SINCRONIZAR CONTADORES - Re-alinea los correlativos con los datos existentes
+# Ubicación: backend/backend_intranet/api_intranet/management/commands/sincronizar_contadores.py
+# ======================================================
+
+import re
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api_intranet.models import Solicitud, Documento, ContadorSecuencia
+
+
+PATRON_CORRELATIVO = re.compile(r'^(?P<prefijo>[A-Z]+)-(?P<anio>\d{4})-(?P<numero>\d+)$')
+
+
+def maximos_existentes(valores):
+    """Retorna {(prefijo, anio): mayor número} a partir de códigos 'SOL-2025-0001'"""
+    maximos = {}
+    for valor in valores:
+        match = PATRON_CORRELATIVO.match(valor or '')
+        if not match:
+            continue
+        clave = (match['prefijo'], int(match['anio']))
+        maximos[clave] = max(maximos.get(clave, 0), int(match['numero']))
+    return maximos
+
+
+class Command(BaseCommand):
+    help = 'Sincroniza los contadores de SOL/DOC con los números ya emitidos en la base de datos'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Muestra los valores calculados sin modificar los contadores'
+        )
+
+    def handle(self, *args, **options):
+        maximos = maximos_existentes(
+            Solicitud.objects.values_list('numero_solicitud', flat=True).iterator()
+        )
+        maximos.update(maximos_existentes(
+            Documento.objects.values_list('codigo_documento', flat=True).iterator()
+        ))
+
+        if not maximos:
+            self.stdout.write('No hay correlativos emitidos. Nada que sincronizar.')
+            return
+
+        for (prefijo, anio), maximo in sorted(maximos.items()):
+            if options['dry_run']:
+                self.stdout.write(f'  {prefijo}-{anio}: {maximo}')
+                continue
+
+            with transaction.atomic():
+                contador, _ = ContadorSecuencia.objects.select_for_update().get_or_create(
+                    prefijo=prefijo, anio=anio
+                )
+                # Nunca retrocedemos: los números ya entregados pueden no tener fila (rollback)
+                if contador.ultimo_valor < maximo:
+                    contador.ultimo_valor = maximo
+                    contador.save(update_fields=['ultimo_valor', 'actualizado_en'])
+            self.stdout.write(f'  ✓ {prefijo}-{anio}: {contador.ultimo_valor}')
+
+        self.stdout.write(self.style.SUCCESS('Contadores sincronizados.'))
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.7 on 2026-10-16 20:45
+
+import re
+import uuid
+from django.db import migrations, models
+
+
+def poblar_contadores(apps, schema_editor):
+    """Inicializa los contadores con el mayor número ya emitido por prefijo y año"""
+    Solicitud = apps.get_model('api_intranet', 'Solicitud')
+    Documento = apps.get_model('api_intranet', 'Documento')
+    ContadorSecuencia = apps.get_model('api_intranet', 'ContadorSecuencia')
+
+    patron = re.compile(r'^([A-Z]+)-(\d{4})-(\d+)$')
+    maximos = {}
+    codigos = list(Solicitud.objects.values_list('numero_solicitud', flat=True))
+    codigos += list(Documento.objects.values_list('codigo_documento', flat=True))
+    for codigo in codigos:
+        match = patron.match(codigo or '')
+        if match:
+            clave = (match.group(1), int(match.group(2)))
+            maximos[clave] = max(maximos.get(clave, 0), int(match.group(3)))
+
+    ContadorSecuencia.objects.bulk_create([
+        ContadorSecuencia(id=uuid.uuid4(), prefijo=prefijo, anio=anio, ultimo_valor=maximo)
+        for (prefijo, anio), maximo in maximos.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_intranet', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContadorSecuencia',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('prefijo', models.CharField(max_length=10)),
+                ('anio', models.IntegerField()),
+                ('ultimo_valor', models.IntegerField(default=0)),
+                ('actualizado_en', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Contador de Secuencia',
+                'verbose_name_plural': 'Contadores de Secuencia',
+                'ordering': ['prefijo', '-anio'],
+                'unique_together': {('prefijo', 'anio')},
+            },
+        ),
+        migrations.RunPython(poblar_contadores, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.7 on 2026-10-16 20:47
+
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_intranet', '0002_contadorsecuencia'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MovimientoSaldo',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('bolsa', models.CharField(choices=[('vacaciones', 'Vacaciones'), ('administrativos', 'Días Administrativos'), ('sin_goce', 'Permiso sin goce (acumulado)'), ('devolucion', 'Horas de Devolución')], max_length=20)),
+                ('delta', models.DecimalField(decimal_places=1, max_digits=6)),
+                ('saldo_resultante', models.DecimalField(decimal_places=1, max_digits=6)),
+                ('descripcion', models.CharField(blank=True, max_length=255)),
+                ('creado_en', models.DateTimeField(default=django.utils.timezone.now, editable=False)),
+                ('licencia', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='movimientos_saldo', to='api_intranet.licenciamedica')),
+                ('solicitud', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='movimientos_saldo', to='api_intranet.solicitud')),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='movimientos_saldo', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Movimiento de Saldo',
+                'verbose_name_plural': 'Movimientos de Saldo',
+                'ordering': ['-creado_en'],
+                'indexes': [models.Index(fields=['usuario', 'bolsa', 'creado_en'], name='api_intrane_usuario_752649_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='SaldoAnual',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('bolsa', models.CharField(choices=[('vacaciones', 'Vacaciones'), ('administrativos', 'Días Administrativos'), ('sin_goce', 'Permiso sin goce (acumulado)'), ('devolucion', 'Horas de Devolución')], max_length=20)),
+                ('anio', models.IntegerField()),
+                ('saldo_inicial', models.DecimalField(decimal_places=1, max_digits=6)),
+                ('calculado_en', models.DateTimeField(auto_now=True)),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='saldos_anuales', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Saldo Anual',
+                'verbose_name_plural': 'Saldos Anuales',
+                'ordering': ['-anio'],
+                'unique_together': {('usuario', 'bolsa', 'anio')},
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.7 on 2026-10-16 20:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def copiar_area_del_solicitante(apps, schema_editor):
+    Solicitud = apps.get_model('api_intranet', 'Solicitud')
+    Usuario = apps.get_model('api_intranet', 'Usuario')
+    Solicitud.objects.update(
+        area=Subquery(Usuario.objects.filter(pk=OuterRef('usuario')).values('area')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_intranet', '0003_movimientosaldo_saldoanual'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='solicitud',
+            name='area',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='solicitudes', to='api_intranet.area'),
+        ),
+        migrations.RunPython(copiar_area_del_solicitante, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='solicitud',
+            index=models.Index(fields=['estado', 'creada_en'], name='api_intrane_estado_db312c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='solicitud',
+            index=models.Index(fields=['area', 'estado', 'creada_en'], name='api_intrane_area_id_d2ceec_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-16 20:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_intranet', '0004_solicitud_area_indices'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='solicitud',
+            index=models.Index(fields=['usuario', 'fecha_inicio', 'fecha_termino'], name='api_intrane_usuario_4baafe_idx'),
+        ),
+    ]
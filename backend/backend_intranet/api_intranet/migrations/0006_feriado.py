@@ -0,0 +1,29 @@
+# Generated by Django 5.2.7 on 2026-10-16 20:53
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_intranet', '0005_solicitud_indice_fechas_usuario'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Feriado',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('fecha', models.DateField(unique=True)),
+                ('nombre', models.CharField(max_length=150)),
+                ('irrenunciable', models.BooleanField(default=False)),
+                ('creado_en', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Feriado',
+                'verbose_name_plural': 'Feriados',
+                'ordering': ['fecha'],
+            },
+        ),
+    ]
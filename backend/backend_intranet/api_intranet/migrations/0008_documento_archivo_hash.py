@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-16 22:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_intranet', '0007_trabajopdf'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='documento',
+            name='archivo_hash',
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+        migrations.AlterField(
+            model_name='documento',
+            name='storage_type',
+            field=models.CharField(choices=[('database', 'Base de Datos'), ('filesystem', 'Almacén de Blobs'), ('s3', 'Amazon S3')], default='database', max_length=20),
+        ),
+    ]
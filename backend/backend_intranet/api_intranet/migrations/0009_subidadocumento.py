@@ -0,0 +1,37 @@
+# Generated by Django 5.2.7 on 2026-10-16 22:46
+
+import django.core.validators
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_intranet', '0008_documento_archivo_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SubidaDocumento',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('nombre_archivo', models.CharField(max_length=255)),
+                ('mime_type', models.CharField(default='application/octet-stream', max_length=100)),
+                ('tamano_total', models.BigIntegerField(validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(1073741824)])),
+                ('recibido', models.BigIntegerField(default=0)),
+                ('estado', models.CharField(choices=[('en_curso', 'En curso'), ('completada', 'Completada')], default='en_curso', max_length=20)),
+                ('creada_en', models.DateTimeField(auto_now_add=True)),
+                ('actualizada_en', models.DateTimeField(auto_now=True)),
+                ('documento', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='api_intranet.documento')),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='subidas_documentos', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Subida de Documento',
+                'verbose_name_plural': 'Subidas de Documentos',
+                'ordering': ['-creada_en'],
+            },
+        ),
+    ]
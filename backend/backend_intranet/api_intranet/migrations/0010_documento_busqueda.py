@@ -0,0 +1,53 @@
+# Generated by Django 5.2.7 on 2026-10-16 22:50
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations, models
+
+
+class AgregarIndiceEnPostgres(migrations.AddIndex):
+    """El índice GIN solo existe en PostgreSQL; en otras bases se registra sin crearse"""
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+def calcular_vectores(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    Documento = apps.get_model('api_intranet', 'Documento')
+    Documento.objects.update(busqueda=(
+        SearchVector('titulo', 'codigo_documento', weight='A', config='spanish')
+        + SearchVector('descripcion', weight='B', config='spanish')
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_intranet', '0009_subidadocumento'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='documento',
+            name='busqueda',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='documento',
+            name='texto_contenido',
+            field=models.TextField(blank=True, editable=False, help_text='Texto extraído del archivo'),
+        ),
+        AgregarIndiceEnPostgres(
+            model_name='documento',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['busqueda'], name='documento_busqueda_gin'),
+        ),
+        migrations.RunPython(calcular_vectores, migrations.RunPython.noop),
+    ]
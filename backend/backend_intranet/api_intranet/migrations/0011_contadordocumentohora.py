@@ -0,0 +1,30 @@
+# Generated by Django 5.2.7 on 2026-10-16 23:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_intranet', '0010_documento_busqueda'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContadorDocumentoHora',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hora', models.DateTimeField(help_text='Inicio de la hora')),
+                ('descargas', models.PositiveIntegerField(default=0)),
+                ('visualizaciones', models.PositiveIntegerField(default=0)),
+                ('documento', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='contadores_por_hora', to='api_intranet.documento')),
+            ],
+            options={
+                'verbose_name': 'Contador Horario de Documento',
+                'verbose_name_plural': 'Contadores Horarios de Documentos',
+                'ordering': ['documento', 'hora'],
+                'constraints': [models.UniqueConstraint(fields=('documento', 'hora'), name='contador_documento_hora_unico')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-16 23:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_intranet', '0011_contadordocumentohora'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='adjuntoanuncio',
+            name='archivo_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.7 on 2026-10-16 23:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# Copia de Anuncio.NIVELES_POR_VISIBILIDAD / NIVELES_VEN_TODO al crear la tabla
+NIVELES_POR_VISIBILIDAD = {
+    'solo_funcionarios': (1,),
+    'solo_jefatura': (2,),
+    'funcionarios_y_jefatura': (1, 2),
+    'solo_direccion': (),
+}
+NIVELES_VEN_TODO = (3, 4)
+
+
+def compilar_audiencias(apps, schema_editor):
+    Anuncio = apps.get_model('api_intranet', 'Anuncio')
+    AudienciaAnuncio = apps.get_model('api_intranet', 'AudienciaAnuncio')
+    filas = []
+    for anuncio in Anuncio.objects.prefetch_related('areas_destinatarias').iterator(chunk_size=500):
+        areas = [None] if anuncio.para_todas_areas else [area.pk for area in anuncio.areas_destinatarias.all()]
+        audiencia = {
+            (nivel, area) for nivel in NIVELES_POR_VISIBILIDAD[anuncio.visibilidad_roles] for area in areas
+        } | {(nivel, None) for nivel in NIVELES_VEN_TODO}
+        filas.extend(AudienciaAnuncio(anuncio_id=anuncio.pk, nivel=nivel, area_id=area) for nivel, area in audiencia)
+    AudienciaAnuncio.objects.bulk_create(filas, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_intranet', '0012_adjuntoanuncio_archivo_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AudienciaAnuncio',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nivel', models.PositiveSmallIntegerField()),
+                ('anuncio', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='audiencia', to='api_intranet.anuncio')),
+                ('area', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='api_intranet.area')),
+            ],
+            options={
+                'verbose_name': 'Audiencia de Anuncio',
+                'verbose_name_plural': 'Audiencias de Anuncios',
+                'indexes': [models.Index(fields=['nivel', 'area', 'anuncio'], name='audiencia_anuncio_idx')],
+            },
+        ),
+        migrations.RunPython(compilar_audiencias, migrations.RunPython.noop),
+    ]
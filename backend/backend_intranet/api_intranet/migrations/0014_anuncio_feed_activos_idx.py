@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-16 23:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_intranet', '0013_audienciaanuncio'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='anuncio',
+            index=models.Index(condition=models.Q(('activo', True)), fields=['-es_destacado', '-prioridad', '-fecha_publicacion', '-id'], name='anuncio_feed_activos_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.7 on 2026-10-16 23:53
+
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_intranet', '0015_variantes_imagenes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EnvioNotificacion',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('programado_para', models.DateTimeField(default=django.utils.timezone.now)),
+                ('creado_en', models.DateTimeField(auto_now_add=True)),
+                ('enviado_en', models.DateTimeField(blank=True, null=True)),
+                ('destinatarios', models.IntegerField(blank=True, null=True)),
+                ('actividad', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='envios_notificacion', to='api_intranet.actividad')),
+                ('anuncio', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='envios_notificacion', to='api_intranet.anuncio')),
+                ('documento', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='envios_notificacion', to='api_intranet.documento')),
+            ],
+            options={
+                'verbose_name': 'Envío de notificación',
+                'verbose_name_plural': 'Envíos de notificaciones',
+                'ordering': ['programado_para'],
+                'indexes': [models.Index(condition=models.Q(('enviado_en__isnull', True)), fields=['programado_para'], name='envio_notificacion_pend_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_intranet', '0016_envios_notificacion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='envionotificacion',
+            name='error',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='envionotificacion',
+            name='intentos',
+            field=models.IntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:57
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_intranet', '0017_envio_notificacion_intentos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExportacionPDF',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('desde', models.DateField()),
+                ('hasta', models.DateField()),
+                ('total', models.IntegerField(default=0)),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('procesando', 'Procesando'), ('completado', 'Completado'), ('error', 'Error')], default='pendiente', max_length=20)),
+                ('intentos', models.IntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('archivo', models.CharField(blank=True, max_length=500)),
+                ('creado_en', models.DateTimeField(auto_now_add=True)),
+                ('iniciado_en', models.DateTimeField(blank=True, null=True)),
+                ('terminado_en', models.DateTimeField(blank=True, null=True)),
+                ('area', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='api_intranet.area')),
+                ('solicitudes', models.ManyToManyField(related_name='+', to='api_intranet.solicitud')),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='exportaciones_pdf', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Exportación PDF',
+                'verbose_name_plural': 'Exportaciones PDF',
+                'ordering': ['-creado_en'],
+                'indexes': [models.Index(fields=['estado', 'creado_en'], name='api_intrane_estado_a54578_idx')],
+            },
+        ),
+    ]
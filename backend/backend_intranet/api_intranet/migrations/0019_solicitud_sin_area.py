@@ -0,0 +1,25 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_intranet', '0018_exportacion_pdf'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='solicitud',
+            name='api_intrane_area_id_d2ceec_idx',
+        ),
+        migrations.RemoveField(
+            model_name='solicitud',
+            name='area',
+        ),
+        migrations.AddIndex(
+            model_name='solicitud',
+            index=models.Index(fields=['usuario', 'estado', 'creada_en'], name='api_intrane_usuario_14734a_idx'),
+        ),
+    ]
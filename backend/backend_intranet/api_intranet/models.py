@@ -3,14 +3,33 @@
 # Ubicación: backend/intranet/models.py
 # ======================================================
 
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Case, Exists, F, OuterRef, Q, Sum, When
+from django.db.models.signals import m2m_changed
+from django.dispatch import receiver
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
 from django.core.validators import RegexValidator, MinValueValidator, MaxValueValidator
 from django.utils import timezone
+from django.utils.text import Truncator
 from django.core.exceptions import ValidationError
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 import uuid
+import hashlib
+import logging
+import shutil
+import tempfile
+from io import BytesIO
+from datetime import datetime, time, timedelta
 from decimal import Decimal  # <--- Agregar esta línea
 
+from . import blobs, imagenes, notificaciones, previsualizaciones
+from .busqueda import soporta_texto_completo, vector_documento
+
+
+logger = logging.getLogger(__name__)
 
 
 # ======================================================
@@ -161,6 +180,10 @@ class Usuario(AbstractBaseUser, PermissionsMixin):
 
     # Avatar y preferencias
     avatar = models.ImageField(upload_to='avatars/', blank=True, null=True)
+    # Tamaño del original y variantes WebP (ver imagenes.py)
+    avatar_ancho = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    avatar_alto = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    avatar_variantes = models.JSONField(default=dict, blank=True, editable=False)
     tema_preferido = models.CharField(
         max_length=10, choices=[('light', 'Claro'), ('dark', 'Oscuro')], default='light'
     )
@@ -187,27 +210,63 @@ class Usuario(AbstractBaseUser, PermissionsMixin):
     def get_nombre_completo(self):
         return f"{self.nombre} {self.apellido_paterno} {self.apellido_materno}"
 
-    def actualizar_dias_disponibles(self, tipo_solicitud, cantidad, operacion='descontar'):
+    # Anchos de las variantes del avatar: 1x y 2x del tamaño en pantalla
+    ANCHOS_AVATAR = (96, 192)
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'avatar' in update_fields:
+            imagenes.actualizar(self, 'avatar', self.ANCHOS_AVATAR)
+
+    def get_srcset_avatar(self):
+        """{ancho: URL} de las variantes del avatar"""
+        return imagenes.srcset(self.avatar_variantes)
+
+    # Campo del saldo materializado que corresponde a cada bolsa del libro de saldos
+    CAMPOS_SALDO = {
+        'vacaciones': 'dias_vacaciones_disponibles',
+        'administrativos': 'dias_administrativos_disponibles',
+        'sin_goce': 'dias_sin_goce_acumulados',
+        'devolucion': 'horas_devolucion_disponibles',
+    }
+
+    def actualizar_dias_disponibles(self, tipo_solicitud, cantidad, operacion='descontar',
+                                    solicitud=None, licencia=None, descripcion=''):
         """
         Actualiza los saldos del usuario. 
         Operacion: 'descontar' o 'restituir' (para el caso de licencias)
+        Cada cambio queda en el libro de saldos (MovimientoSaldo) y se aplica con
+        un UPDATE atómico sobre la columna, sin reescribir el resto de la fila.
         """
-        factor = -1 if operacion == 'descontar' else 1
-        cantidad = Decimal(str(cantidad))
+        movimiento = MovimientoSaldo.para_solicitud(
+            self, tipo_solicitud, cantidad, operacion,
+            solicitud=solicitud, licencia=licencia, descripcion=descripcion
+        )
+        if movimiento:
+            MovimientoSaldo.registrar([movimiento])
+        return movimiento
+
+    def ajustar_saldos(self, nuevos_valores, descripcion='Ajuste manual de saldo'):
+        """
+        Lleva los saldos a los valores indicados ({campo: valor}) registrando la
+        diferencia como movimiento, para que los ajustes manuales también queden en el libro.
+        """
+        bolsas = {campo: bolsa for bolsa, campo in self.CAMPOS_SALDO.items()}
+        movimientos = []
+        for campo, valor in nuevos_valores.items():
+            delta = Decimal(str(valor)) - Decimal(str(getattr(self, campo)))
+            if delta:
+                movimientos.append(MovimientoSaldo(
+                    usuario=self, bolsa=bolsas[campo], delta=delta, descripcion=descripcion
+                ))
+        if movimientos:
+            MovimientoSaldo.registrar(movimientos)
+        return movimientos
 
-        if tipo_solicitud == 'vacaciones':
-            self.dias_vacaciones_disponibles += int(factor * cantidad)
-        elif tipo_solicitud == 'dia_administrativo':
-            self.dias_administrativos_disponibles += (Decimal(factor) * cantidad)
-        elif tipo_solicitud == 'devolucion_tiempo':
-            self.horas_devolucion_disponibles += (Decimal(factor) * cantidad)
-        elif tipo_solicitud == 'permiso_sin_goce':
-            if operacion == 'descontar': # En sin goce solo sumamos al acumulado
-                self.dias_sin_goce_acumulados += cantidad
-            else:
-                self.dias_sin_goce_acumulados -= cantidad
-        
-        self.save()
+    def saldo_al(self, bolsa, fecha):
+        """Saldo de una bolsa al cierre del día indicado"""
+        return MovimientoSaldo.saldo_al(self, bolsa, fecha)
 
 
 
@@ -243,6 +302,9 @@ class Actividad(models.Model):
     ubicacion = models.CharField(max_length=200, blank=True)
     color = models.CharField(max_length=7, default='#3B82F6')
     imagen = models.ImageField(upload_to='actividades/', blank=True, null=True)
+    imagen_ancho = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    imagen_alto = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    imagen_variantes = models.JSONField(default=dict, blank=True, editable=False)
     
     # Participantes
     para_todas_areas = models.BooleanField(default=True)
@@ -268,11 +330,39 @@ class Actividad(models.Model):
     def __str__(self):
         return f"{self.titulo} ({self.fecha_inicio.strftime('%d/%m/%Y')})"
     
+    # Anchos de las variantes de la imagen: tarjeta del listado y detalle
+    ANCHOS_IMAGEN = (320, 640, 1280)
+    
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'imagen' in update_fields:
+            imagenes.actualizar(self, 'imagen', self.ANCHOS_IMAGEN)
+    
+    def get_srcset_imagen(self):
+        """{ancho: URL} de las variantes de la imagen"""
+        return imagenes.srcset(self.imagen_variantes)
+    
+    def total_inscritos(self):
+        """Inscritos; usa la anotación num_inscritos si la consulta la trae"""
+        if hasattr(self, 'num_inscritos'):
+            return self.num_inscritos
+        return self.inscritos.count()
+    
     def tiene_cupos_disponibles(self):
         """Verifica si hay cupos disponibles"""
         if not self.cupo_maximo:
             return True
-        return self.inscritos.count() < self.cupo_maximo
+        return self.total_inscritos() < self.cupo_maximo
+    
+    def destinatarios(self):
+        """Usuarios activos que ven la actividad (mismo criterio que ActividadViewSet), como consulta"""
+        usuarios = Usuario.objects.filter(is_active=True)
+        if self.para_todas_areas:
+            return usuarios
+        return usuarios.filter(
+            Q(area__in=self.areas_participantes.values('pk')) | Q(rol__nivel__gte=3)
+        )
 
 
 class InscripcionActividad(models.Model):
@@ -324,6 +414,9 @@ class Anuncio(models.Model):
     
     # Archivos adjuntos
     imagen = models.ImageField(upload_to='anuncios/', blank=True, null=True)
+    imagen_ancho = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    imagen_alto = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    imagen_variantes = models.JSONField(default=dict, blank=True, editable=False)
     
     # Destinatarios por áreas
     para_todas_areas = models.BooleanField(default=True)
@@ -345,6 +438,17 @@ class Anuncio(models.Model):
     creado_en = models.DateTimeField(auto_now_add=True)
     actualizado_en = models.DateTimeField(auto_now=True)
     
+    # Niveles de rol que ven cada visibilidad; Subdirección y Dirección ven todos los anuncios
+    NIVELES_POR_VISIBILIDAD = {
+        'solo_funcionarios': (1,),
+        'solo_jefatura': (2,),
+        'funcionarios_y_jefatura': (1, 2),
+        'solo_direccion': (),
+    }
+    NIVELES_VEN_TODO = (3, 4)
+    CAMPOS_AUDIENCIA = {'visibilidad_roles', 'para_todas_areas'}
+    ANCHOS_IMAGEN = Actividad.ANCHOS_IMAGEN
+    
     class Meta:
         verbose_name = 'Anuncio'
         verbose_name_plural = 'Anuncios'
@@ -354,6 +458,11 @@ class Anuncio(models.Model):
             models.Index(fields=['tipo']),
             models.Index(fields=['es_destacado']),
             models.Index(fields=['visibilidad_roles']),
+            # Orden del feed (ver AnuncioViewSet.feed); los inactivos no se muestran
+            models.Index(
+                fields=['-es_destacado', '-prioridad', '-fecha_publicacion', '-id'],
+                condition=Q(activo=True), name='anuncio_feed_activos_idx'
+            ),
         ]
     
     def __str__(self):
@@ -366,27 +475,118 @@ class Anuncio(models.Model):
             return self.activo and now <= self.fecha_expiracion
         return self.activo
     
+    @staticmethod
+    def filtro_vigente(ahora):
+        """Lo mismo que esta_vigente(), para filtrar en la base de datos"""
+        return Q(activo=True) & (Q(fecha_expiracion__isnull=True) | Q(fecha_expiracion__gte=ahora))
+    
+    def save(self, *args, **kwargs):
+        es_nuevo = self._state.adding
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or self.CAMPOS_AUDIENCIA.intersection(update_fields):
+            self.actualizar_audiencia()
+        if update_fields is None or 'imagen' in update_fields:
+            imagenes.actualizar(self, 'imagen', self.ANCHOS_IMAGEN)
+        if not es_nuevo and (update_fields is None or 'fecha_publicacion' in update_fields):
+            # El aviso pendiente sigue a la fecha de publicación editada
+            EnvioNotificacion.reprogramar(self)
+    
+    def get_srcset_imagen(self):
+        """{ancho: URL} de las variantes de la imagen"""
+        return imagenes.srcset(self.imagen_variantes)
+    
+    def compilar_audiencia(self):
+        """
+        Pares (nivel de rol, área) que pueden ver el anuncio; área None = cualquiera.
+        Es la única definición de la visibilidad: puede_ver() la evalúa en Python y
+        AudienciaAnuncio la guarda para filtrar en SQL.
+        """
+        if self.para_todas_areas:
+            areas = [None]
+        else:
+            areas = list(self.areas_destinatarias.values_list('pk', flat=True))
+        audiencia = {
+            (nivel, area) for nivel in self.NIVELES_POR_VISIBILIDAD[self.visibilidad_roles] for area in areas
+        }
+        return audiencia | {(nivel, None) for nivel in self.NIVELES_VEN_TODO}
+    
+    def actualizar_audiencia(self):
+        """Reemplaza las filas de AudienciaAnuncio con la audiencia actual"""
+        filas = [
+            AudienciaAnuncio(anuncio=self, nivel=nivel, area_id=area)
+            for nivel, area in self.compilar_audiencia()
+        ]
+        with transaction.atomic():
+            AudienciaAnuncio.objects.filter(anuncio=self).delete()
+            AudienciaAnuncio.objects.bulk_create(filas)
+    
     def puede_ver(self, usuario):
         """
-        Determina si un usuario puede ver este anuncio basándose en su rol
+        Determina si un usuario puede ver este anuncio según su rol y su área
         """
+        audiencia = self.compilar_audiencia()
         nivel_usuario = usuario.rol.nivel
-        
-        # Dirección y Subdirección siempre pueden ver todo
-        if nivel_usuario >= 3:
-            return True
-        
-        # Verificar visibilidad por rol
-        if self.visibilidad_roles == 'solo_funcionarios':
-            return nivel_usuario == 1
-        elif self.visibilidad_roles == 'solo_jefatura':
-            return nivel_usuario == 2
-        elif self.visibilidad_roles == 'funcionarios_y_jefatura':
-            return nivel_usuario in [1, 2]
-        elif self.visibilidad_roles == 'solo_direccion':
-            return False  # Solo dirección/subdirección, y ya se verificó arriba
-        
-        return False
+        return (nivel_usuario, None) in audiencia or (nivel_usuario, usuario.area_id) in audiencia
+    
+    @classmethod
+    def visibles_para(cls, usuario):
+        """
+        Anuncios que el usuario puede ver: una búsqueda en el índice de AudienciaAnuncio
+        (nivel, área), sin JOIN con las áreas destinatarias ni DISTINCT
+        """
+        audiencia = AudienciaAnuncio.objects.filter(
+            Q(area__isnull=True) | Q(area_id=usuario.area_id), nivel=usuario.rol.nivel
+        )
+        return cls.objects.filter(pk__in=audiencia.values('anuncio_id'))
+    
+    def destinatarios(self):
+        """Usuarios activos que ven el anuncio: visibles_para() al revés, como consulta"""
+        audiencia = AudienciaAnuncio.objects.filter(
+            Q(area__isnull=True) | Q(area_id=OuterRef('area_id')),
+            anuncio=self, nivel=OuterRef('rol__nivel'),
+        )
+        return Usuario.objects.filter(Exists(audiencia), is_active=True)
+
+
+class AudienciaAnuncio(models.Model):
+    """
+    Visibilidad precalculada de Anuncio: una fila por (nivel de rol, área) que
+    puede verlo; área vacía = todas. Se reescribe al guardar el anuncio o cambiar
+    sus áreas destinatarias (ver Anuncio.compilar_audiencia).
+    """
+    anuncio = models.ForeignKey(Anuncio, on_delete=models.CASCADE, related_name='audiencia')
+    nivel = models.PositiveSmallIntegerField()
+    area = models.ForeignKey(Area, on_delete=models.CASCADE, null=True, blank=True)
+    
+    class Meta:
+        verbose_name = 'Audiencia de Anuncio'
+        verbose_name_plural = 'Audiencias de Anuncios'
+        indexes = [
+            # Cubre la consulta de visibles_para: se resuelve solo con el índice
+            models.Index(fields=['nivel', 'area', 'anuncio'], name='audiencia_anuncio_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.anuncio_id} → nivel {self.nivel}, {self.area_id or 'todas las áreas'}"
+
+
+@receiver(m2m_changed, sender=Anuncio.areas_destinatarias.through)
+def _areas_destinatarias_cambiadas(sender, instance, action, reverse, pk_set, **kwargs):
+    """Las áreas se asignan después de save(): se recalcula la audiencia al cambiar"""
+    if action == 'pre_clear' and reverse:
+        # Desde el área: se guardan los anuncios afectados antes de quitarlos
+        instance._anuncios_a_recalcular = list(instance.anuncio_set.values_list('pk', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        instance.actualizar_audiencia()
+        return
+    if action == 'post_clear':
+        pk_set = instance.__dict__.pop('_anuncios_a_recalcular', [])
+    for anuncio in Anuncio.objects.filter(pk__in=pk_set or []):
+        anuncio.actualizar_audiencia()
 
 
 class AdjuntoAnuncio(models.Model):
@@ -397,6 +597,8 @@ class AdjuntoAnuncio(models.Model):
     archivo = models.FileField(upload_to='anuncios/adjuntos/')
     tipo_archivo = models.CharField(max_length=50)  # pdf, doc, xls, etc.
     tamano = models.IntegerField()  # en bytes
+    # SHA-256 del archivo: clave de la miniatura en previsualizaciones.py
+    archivo_hash = models.CharField(max_length=64, blank=True, editable=False)
     subido_en = models.DateTimeField(auto_now_add=True)
     
     class Meta:
@@ -405,6 +607,12 @@ class AdjuntoAnuncio(models.Model):
     
     def __str__(self):
         return self.nombre_archivo
+    
+    def get_url_preview(self):
+        """URL de la miniatura, si ya se generó"""
+        if previsualizaciones.existe(self.archivo_hash):
+            return f"/api/anuncios/{self.anuncio_id}/adjuntos/{self.id}/preview/"
+        return None
 
 
 # ======================================================
@@ -429,6 +637,8 @@ class Solicitud(models.Model):
         ('solicitud_anulacion_licencia', 'Anulación solicitada por Licencia'),
         ('anulada_por_licencia', 'Anulada por Licencia Médica'),
     ]
+
+    ESTADOS_PENDIENTES = ['pendiente_jefatura', 'pendiente_direccion']
     
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     numero_solicitud = models.CharField(max_length=20, unique=True, editable=False)
@@ -466,6 +676,13 @@ class Solicitud(models.Model):
         verbose_name = 'Solicitud'
         verbose_name_plural = 'Solicitudes'
         ordering = ['-creada_en']
+        indexes = [
+            models.Index(fields=['estado', 'creada_en']),
+            # Bandeja de jefatura: se filtra por usuario__area (el área actual), así que
+            # se llega a las solicitudes desde los funcionarios del área
+            models.Index(fields=['usuario', 'estado', 'creada_en']),
+            models.Index(fields=['usuario', 'fecha_inicio', 'fecha_termino']),
+        ]
 
     def __str__(self):
         return f"{self.numero_solicitud} - {self.usuario.get_nombre_completo()}"
@@ -475,6 +692,13 @@ class Solicitud(models.Model):
         if self.fecha_inicio > self.fecha_termino:
             raise ValidationError("La fecha de término no puede ser anterior a la de inicio.")
 
+        from .dias_habiles import validar_cantidad_dias
+        error = validar_cantidad_dias(
+            self.tipo, self.fecha_inicio, self.fecha_termino, self.cantidad_dias, self.es_medio_dia
+        )
+        if error:
+            raise ValidationError(error)
+
         if self.tipo == 'vacaciones':
             if self.cantidad_dias % 1 != 0:
                 raise ValidationError("Las vacaciones solo pueden pedirse por días enteros.")
@@ -493,11 +717,11 @@ class Solicitud(models.Model):
     def save(self, *args, **kwargs):
         if not self.numero_solicitud:
             year = timezone.now().year
-            count = Solicitud.objects.filter(creada_en__year=year).count() + 1
-            self.numero_solicitud = f"SOL-{year}-{count:04d}"
+            numero = ContadorSecuencia.siguiente('SOL', year)
+            self.numero_solicitud = f"SOL-{year}-{numero:04d}"
         
         # Lógica inicial de estado según rol
-        if not self.id: # Solo al crear
+        if self._state.adding: # Solo al crear (self.id ya trae el uuid por defecto)
             nivel = self.usuario.rol.nivel
             if nivel == 1: # Funcionario
                 self.estado = 'pendiente_jefatura'
@@ -512,48 +736,223 @@ class Solicitud(models.Model):
 
     # --- MÉTODOS DE FLUJO ---
 
-    def aprobar(self, aprobador, comentarios=''):
+    def resolver_aprobacion(self, aprobador):
+        """
+        Estado al que pasa la solicitud si `aprobador` la aprueba,
+        o None si su nivel no le permite aprobarla.
+        """
         nivel_solicitante = self.usuario.rol.nivel
         nivel_aprobador = aprobador.rol.nivel
         if nivel_solicitante == 1:
             if nivel_aprobador == 2:
-                self.estado = 'pendiente_direccion'
-                self.jefatura_aprobador = aprobador
-                self.fecha_aprobacion_jefatura = timezone.now()
+                return 'pendiente_direccion'
             elif nivel_aprobador >= 3:
-                self.estado = 'aprobada'
-                self.direccion_aprobador = aprobador
-                self.fecha_aprobacion_direccion = timezone.now()
-                self.usuario.actualizar_dias_disponibles(self.tipo, self.cantidad_dias, 'descontar')
+                return 'aprobada'
         elif nivel_solicitante == 2 and nivel_aprobador >= 3:
-            self.estado = 'aprobada'
-            self.direccion_aprobador = aprobador
-            self.fecha_aprobacion_direccion = timezone.now()
-            self.usuario.actualizar_dias_disponibles(self.tipo, self.cantidad_dias, 'descontar')
+            return 'aprobada'
         elif nivel_solicitante == 3 and nivel_aprobador >= 3 and aprobador != self.usuario:
-            self.estado = 'aprobada'
-            self.direccion_aprobador = aprobador
-            self.fecha_aprobacion_direccion = timezone.now()
-            self.usuario.actualizar_dias_disponibles(self.tipo, self.cantidad_dias, 'descontar')
+            return 'aprobada'
         elif nivel_solicitante == 4 and nivel_aprobador == 3:
-            self.estado = 'aprobada'
-            self.direccion_aprobador = aprobador
-            self.fecha_aprobacion_direccion = timezone.now()
-            self.usuario.actualizar_dias_disponibles(self.tipo, self.cantidad_dias, 'descontar')
-        self.comentarios_administracion = comentarios
-        self.save()
+            return 'aprobada'
+        return None
+
+    @classmethod
+    def estados_que_resuelve(cls, aprobador):
+        """Jefatura resuelve solo la primera etapa; Subdirección y Dirección, ambas"""
+        if aprobador.rol.nivel == 2:
+            return ['pendiente_jefatura']
+        return list(cls.ESTADOS_PENDIENTES)
+
+    def impedimento_resolucion(self, aprobador, aprobar):
+        """
+        Motivo por el que `aprobador` no puede aprobar (o rechazar) la solicitud en su
+        estado actual, o None si puede. Lo usan `aprobar`, `rechazar` y `resolver_lote`.
+        """
+        if self.estado not in self.ESTADOS_PENDIENTES:
+            return 'La solicitud no está pendiente.'
+        if self.estado not in self.estados_que_resuelve(aprobador):
+            return 'La solicitud ya pasó la etapa de jefatura.'
+        if aprobar and not self.resolver_aprobacion(aprobador):
+            return 'Su nivel no permite aprobar esta solicitud.'
+        if not aprobar and self.usuario_id == aprobador.id:
+            return 'No puede rechazar su propia solicitud.'
+        return None
+
+    def _campos_aprobacion(self, aprobador, nuevo_estado, fecha):
+        """Quién aprobó y cuándo, según la etapa a la que pasa"""
+        if nuevo_estado == 'pendiente_direccion':
+            return {'jefatura_aprobador': aprobador, 'fecha_aprobacion_jefatura': fecha}
+        return {'direccion_aprobador': aprobador, 'fecha_aprobacion_direccion': fecha}
+
+    def _transicionar(self, estados_origen, nuevo_estado, **campos):
+        """
+        Cambio de estado condicional: UPDATE ... WHERE id = ? AND estado IN (estados_origen).
+        Si otra petición cambió el estado primero no se afecta ninguna fila y retorna False;
+        así dos aprobadores simultáneos no pueden aplicar la misma transición dos veces.
+        """
+        campos.update(estado=nuevo_estado, actualizada_en=timezone.now())
+        afectadas = Solicitud.objects.filter(pk=self.pk, estado__in=estados_origen).update(**campos)
+        if not afectadas:
+            return False
+        for campo, valor in campos.items():
+            setattr(self, campo, valor)
+        return True
+
+    def aprobar(self, aprobador, comentarios=''):
+        """
+        Aprueba la etapa que corresponde al nivel del aprobador.
+        Retorna False si la solicitud ya no está pendiente, si el aprobador no puede
+        resolverla o si otra petición la resolvió antes. Los días se descuentan
+        solo cuando esta llamada es la que deja la solicitud aprobada.
+        """
+        if self.impedimento_resolucion(aprobador, aprobar=True):
+            return False
+        nuevo_estado = self.resolver_aprobacion(aprobador)
+
+        campos = self._campos_aprobacion(aprobador, nuevo_estado, timezone.now())
+        with transaction.atomic():
+            if not self._transicionar([self.estado], nuevo_estado, comentarios_administracion=comentarios, **campos):
+                return False
+            if nuevo_estado == 'aprobada':
+                self.usuario.actualizar_dias_disponibles(self.tipo, self.cantidad_dias, 'descontar', solicitud=self)
+                Solicitud.programar_pdfs([self.pk])
+        return True
+
+    def rechazar(self, aprobador, comentarios=''):
+        """
+        Rechaza la solicitud con las mismas reglas de `resolver_lote`.
+        Retorna False si `aprobador` no puede rechazarla o si otra petición la resolvió antes.
+        """
+        if self.impedimento_resolucion(aprobador, aprobar=False):
+            return False
+        return self._transicionar([self.estado], 'rechazada', comentarios_administracion=comentarios)
+
+    @classmethod
+    def resolver_lote(cls, solicitudes, aprobador, aprobar, comentarios=''):
+        """
+        Aprueba o rechaza varias solicitudes con las mismas reglas de `aprobar`.
+        Escribe todo con un bulk_update y descuenta saldos en lote.
+        Debe llamarse dentro de una transacción con las filas bloqueadas.
+        Retorna {id: (estado_resultante, error)}.
+        """
+        ahora = timezone.now()
+        resultados, modificadas, movimientos = {}, [], []
+
+        for solicitud in solicitudes:
+            error = solicitud.impedimento_resolucion(aprobador, aprobar)
+            if error:
+                resultados[solicitud.id] = (None, error)
+                continue
+
+            if aprobar:
+                nuevo_estado = solicitud.resolver_aprobacion(aprobador)
+                solicitud.estado = nuevo_estado
+                for campo, valor in solicitud._campos_aprobacion(aprobador, nuevo_estado, ahora).items():
+                    setattr(solicitud, campo, valor)
+                if nuevo_estado == 'aprobada':
+                    movimiento = MovimientoSaldo.para_solicitud(
+                        solicitud.usuario, solicitud.tipo, solicitud.cantidad_dias, 'descontar',
+                        solicitud=solicitud
+                    )
+                    if movimiento:
+                        movimientos.append(movimiento)
+            else:
+                solicitud.estado = 'rechazada'
+
+            solicitud.comentarios_administracion = comentarios
+            solicitud.actualizada_en = ahora
+            modificadas.append(solicitud)
+            resultados[solicitud.id] = (solicitud.estado, None)
+
+        cls.objects.bulk_update(modificadas, [
+            'estado', 'jefatura_aprobador', 'fecha_aprobacion_jefatura',
+            'direccion_aprobador', 'fecha_aprobacion_direccion',
+            'comentarios_administracion', 'actualizada_en',
+        ])
+        MovimientoSaldo.registrar(movimientos)
+        aprobadas = [s.pk for s in modificadas if s.estado == 'aprobada']
+        if aprobadas:
+            cls.programar_pdfs(aprobadas)
+        return resultados
 
     def anular_por_usuario(self):
         """El usuario anula su propia solicitud si está pendiente"""
-        if 'pendiente' in self.estado:
-            self.estado = 'anulada_usuario'
-            self.save()
+        return self._transicionar(self.ESTADOS_PENDIENTES, 'anulada_usuario')
 
     def solicitar_anulacion_licencia(self):
         """El usuario pide anular una aprobada porque tiene licencia"""
-        if self.estado == 'aprobada':
-            self.estado = 'solicitud_anulacion_licencia'
-            self.save()
+        return self._transicionar(['aprobada'], 'solicitud_anulacion_licencia')
+
+    def finalizar_anulacion_licencia(self):
+        """Dirección confirma la anulación pedida por licencia"""
+        return self._transicionar(['solicitud_anulacion_licencia'], 'anulada_por_licencia')
+
+    # --- PDF DE LA RESOLUCIÓN ---
+
+    CARPETA_PDF = 'solicitudes/pdf'
+
+    def huella_pdf(self):
+        """
+        SHA-256 de los datos que se imprimen en el PDF. Mientras no cambie,
+        el archivo ya generado sigue siendo válido (también se usa como ETag).
+        """
+        def nombre(usuario):
+            return usuario.get_nombre_completo() if usuario else ''
+
+        def fecha(valor):
+            return valor.isoformat() if valor else ''
+
+        usuario = self.usuario
+        partes = [
+            self.numero_solicitud, self.tipo, fecha(self.fecha_inicio), fecha(self.fecha_termino),
+            Decimal(str(self.cantidad_dias)).normalize(), self.motivo, self.telefono_contacto,
+            fecha(self.creada_en), nombre(usuario), usuario.rut, usuario.cargo,
+            usuario.area.nombre if usuario.area_id else '', usuario.email,
+            nombre(self.jefatura_aprobador), fecha(self.fecha_aprobacion_jefatura),
+            nombre(self.direccion_aprobador), fecha(self.fecha_aprobacion_direccion),
+            self.comentarios_administracion,
+        ]
+        return hashlib.sha256('\x1f'.join(str(p) for p in partes).encode('utf-8')).hexdigest()
+
+    def ruta_pdf(self, huella=None):
+        return f"{self.CARPETA_PDF}/{self.numero_solicitud}-{huella or self.huella_pdf()}.pdf"
+
+    def pdf_vigente(self, huella=None):
+        """Ruta del PDF ya generado si corresponde a los datos actuales, o None"""
+        nombre = self.ruta_pdf(huella)
+        if self.url_pdf == nombre and default_storage.exists(nombre):
+            return nombre
+        return None
+
+    def asegurar_pdf(self, huella=None):
+        """
+        Ruta en MEDIA del PDF vigente. Lo genera solo si no existe o si cambiaron
+        los datos de la resolución; en ese caso borra la versión anterior.
+        """
+        from .pdf_generator import generar_pdf_solicitud
+
+        huella = huella or self.huella_pdf()
+        nombre = self.ruta_pdf(huella)
+        if self.pdf_vigente(huella):
+            return nombre
+
+        if not default_storage.exists(nombre):
+            nombre = default_storage.save(nombre, ContentFile(generar_pdf_solicitud(self).getvalue()))
+
+        anterior = self.url_pdf
+        Solicitud.objects.filter(pk=self.pk).update(pdf_generado=True, url_pdf=nombre)
+        self.pdf_generado, self.url_pdf = True, nombre
+        if anterior and anterior != nombre:
+            default_storage.delete(anterior)
+        return nombre
+
+    @classmethod
+    def programar_pdfs(cls, ids):
+        """
+        Encola la generación del PDF de las solicitudes recién aprobadas.
+        El trabajo se confirma junto con la aprobación y lo procesa `render_worker`.
+        """
+        return TrabajoPDF.encolar(ids)
 
 
 
@@ -708,7 +1107,8 @@ class CategoriaDocumento(models.Model):
 class Documento(models.Model):
     """
     Documentos institucionales (circulares, protocolos, etc.)
-    Soporta almacenamiento en BD (actual) y S3 (futuro)
+    Los archivos nuevos van al almacén de blobs por contenido (api_intranet/blobs.py);
+    'database' queda para filas antiguas hasta correr `manage.py migrar_documentos_blob`
     """
     TIPO_CHOICES = [
         ('circular', 'Circular'),
@@ -723,6 +1123,7 @@ class Documento(models.Model):
     
     STORAGE_CHOICES = [
         ('database', 'Base de Datos'),
+        ('filesystem', 'Almacén de Blobs'),
         ('s3', 'Amazon S3'),
     ]
     
@@ -738,9 +1139,16 @@ class Documento(models.Model):
     # Archivo - Almacenamiento híbrido
     storage_type = models.CharField(max_length=20, choices=STORAGE_CHOICES, default='database')
     
-    # Para almacenamiento en BD
+    # Para almacenamiento en BD (filas antiguas)
     archivo_contenido = models.BinaryField(null=True, blank=True, editable=False)
     
+    # Para almacenamiento en blobs: SHA-256 del contenido
+    archivo_hash = models.CharField(max_length=64, blank=True, db_index=True)
+    
+    # Búsqueda de texto completo (ver busqueda.py)
+    texto_contenido = models.TextField(blank=True, editable=False, help_text='Texto extraído del archivo')
+    busqueda = SearchVectorField(null=True, editable=False)
+    
     # Para almacenamiento en S3 (futuro)
     archivo_url = models.URLField(max_length=500, null=True, blank=True)
     
@@ -777,8 +1185,11 @@ class Documento(models.Model):
         indexes = [
             models.Index(fields=['tipo', 'categoria']),
             models.Index(fields=['fecha_vigencia']),
+            GinIndex(fields=['busqueda'], name='documento_busqueda_gin'),
         ]
     
+    CAMPOS_BUSQUEDA = {'titulo', 'codigo_documento', 'descripcion', 'texto_contenido'}
+    
     def __str__(self):
         return f"{self.titulo} (v{self.version})"
     
@@ -786,10 +1197,20 @@ class Documento(models.Model):
         # Generar código automáticamente
         if not self.codigo_documento:
             year = timezone.now().year
-            count = Documento.objects.filter(subido_en__year=year).count() + 1
-            self.codigo_documento = f"DOC-{year}-{count:04d}"
+            numero = ContadorSecuencia.siguiente('DOC', year)
+            self.codigo_documento = f"DOC-{year}-{numero:04d}"
         
         super().save(*args, **kwargs)
+        
+        # Contadores y otros campos no tocan el índice de búsqueda
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or self.CAMPOS_BUSQUEDA.intersection(update_fields):
+            self.actualizar_busqueda()
+    
+    def actualizar_busqueda(self):
+        """Recalcula el tsvector en la base de datos (solo PostgreSQL)"""
+        if soporta_texto_completo():
+            Documento.objects.filter(pk=self.pk).update(busqueda=vector_documento())
     
     def esta_vigente(self):
         """Verifica si el documento está vigente"""
@@ -805,6 +1226,130 @@ class Documento(models.Model):
         else:
             # Para archivos en BD, usar endpoint de descarga
             return f"/api/documentos/{self.id}/download/"
+    
+    def get_url_preview(self):
+        """URL de la miniatura de la primera página, si ya se generó"""
+        if previsualizaciones.existe(self.archivo_hash):
+            return f"/api/documentos/{self.id}/preview/"
+        return None
+    
+    def abrir_archivo(self):
+        """Archivo binario con el contenido, listo para leer por trozos"""
+        if self.storage_type == 'filesystem':
+            return blobs.abrir(self.archivo_hash)
+        return BytesIO(bytes(self.archivo_contenido or b''))
+    
+    def destinatarios(self):
+        """Usuarios activos que ven el documento (mismo criterio que DocumentoViewSet), como consulta"""
+        usuarios = Usuario.objects.filter(is_active=True)
+        if self.publico:
+            return usuarios
+        return usuarios.filter(
+            Q(area__in=self.areas_con_acceso.values('pk')) | Q(rol__nivel__gte=3)
+        )
+
+
+class SubidaDocumento(models.Model):
+    """
+    Subida de un archivo por trozos (iniciar → PUT de cada trozo → finalizar).
+    Los trozos se escriben en un temporal del almacén de blobs y el Documento se
+    crea recién al finalizar, así una subida cortada se retoma desde `recibido`.
+    """
+    ESTADO_CHOICES = [
+        ('en_curso', 'En curso'),
+        ('completada', 'Completada'),
+    ]
+    
+    TAMANO_MAXIMO = 1024 ** 3  # 1 GiB
+    TAMANO_MAXIMO_TROZO = 8 * 1024 * 1024
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    usuario = models.ForeignKey(Usuario, on_delete=models.CASCADE, related_name='subidas_documentos')
+    nombre_archivo = models.CharField(max_length=255)
+    mime_type = models.CharField(max_length=100, default='application/octet-stream')
+    tamano_total = models.BigIntegerField(validators=[MinValueValidator(1), MaxValueValidator(TAMANO_MAXIMO)])
+    recibido = models.BigIntegerField(default=0)
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='en_curso')
+    documento = models.ForeignKey(Documento, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    creada_en = models.DateTimeField(auto_now_add=True)
+    actualizada_en = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = 'Subida de Documento'
+        verbose_name_plural = 'Subidas de Documentos'
+        ordering = ['-creada_en']
+    
+    def __str__(self):
+        return f"{self.nombre_archivo} ({self.recibido}/{self.tamano_total})"
+    
+    def ruta_temporal(self):
+        return blobs.ruta_subida(self.pk)
+    
+    def crear_temporal(self):
+        ruta = self.ruta_temporal()
+        ruta.parent.mkdir(parents=True, exist_ok=True)
+        ruta.touch()
+    
+    def escribir_trozo(self, posicion, origen, largo):
+        """
+        Copia `largo` bytes de `origen` al temporal desde `posicion`, que debe ser lo
+        ya recibido. El cuerpo se lee primero a un archivo aparte, sin bloqueo: la fila
+        se bloquea solo para validar la posición, escribir en disco y avanzar `recibido`.
+        Retorna False si la subida no admite el trozo (el cliente retoma desde `recibido`).
+        """
+        if self.estado != 'en_curso' or posicion != self.recibido:
+            return False
+        
+        with tempfile.TemporaryFile() as recibido:
+            escritos = 0
+            while escritos < largo:
+                trozo = origen.read(min(blobs.TAMANO_TROZO, largo - escritos))
+                if not trozo:
+                    break
+                recibido.write(trozo)
+                escritos += len(trozo)
+            recibido.seek(0)
+            
+            with transaction.atomic():
+                subida = SubidaDocumento.objects.select_for_update().get(pk=self.pk)
+                if subida.estado != 'en_curso' or posicion != subida.recibido:
+                    self.recibido, self.estado = subida.recibido, subida.estado
+                    return False
+                
+                with open(self.ruta_temporal(), 'r+b') as destino:
+                    destino.seek(posicion)
+                    shutil.copyfileobj(recibido, destino, blobs.TAMANO_TROZO)
+                
+                # Si la conexión se cortó a medio trozo, lo recibido hasta ahí es válido
+                subida.recibido = posicion + escritos
+                subida.save(update_fields=['recibido', 'actualizada_en'])
+        self.recibido = subida.recibido
+        return True
+    
+    def descartar_temporal(self):
+        self.ruta_temporal().unlink(missing_ok=True)
+
+
+class ContadorDocumentoHora(models.Model):
+    """
+    Descargas y visualizaciones de un documento por hora, para gráficos de tendencia.
+    Se escribe junto con los totales de Documento al vaciar el buffer de contadores.py.
+    """
+    documento = models.ForeignKey(Documento, on_delete=models.CASCADE, related_name='contadores_por_hora')
+    hora = models.DateTimeField(help_text='Inicio de la hora')
+    descargas = models.PositiveIntegerField(default=0)
+    visualizaciones = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        verbose_name = 'Contador Horario de Documento'
+        verbose_name_plural = 'Contadores Horarios de Documentos'
+        ordering = ['documento', 'hora']
+        constraints = [
+            models.UniqueConstraint(fields=['documento', 'hora'], name='contador_documento_hora_unico'),
+        ]
+    
+    def __str__(self):
+        return f"{self.documento_id} {self.hora:%Y-%m-%d %H}h: {self.descargas}/{self.visualizaciones}"
 
 
 # ======================================================
@@ -865,6 +1410,142 @@ class Notificacion(models.Model):
         self.save()
 
 
+class EnvioNotificacion(models.Model):
+    """
+    Aviso pendiente de un anuncio, actividad o documento nuevo. La API solo lo
+    registra; el comando `enviar_notificaciones` resuelve los destinatarios y crea
+    sus notificaciones de una vez (ver notificaciones.py), fuera de la petición.
+    """
+    MAXIMO_INTENTOS = 3
+    # Espera antes de reintentar un envío que falló, multiplicada por el número de intento
+    ESPERA_REINTENTO = timedelta(minutes=1)
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    anuncio = models.ForeignKey('Anuncio', on_delete=models.CASCADE, null=True, blank=True, related_name='envios_notificacion')
+    actividad = models.ForeignKey('Actividad', on_delete=models.CASCADE, null=True, blank=True, related_name='envios_notificacion')
+    documento = models.ForeignKey('Documento', on_delete=models.CASCADE, null=True, blank=True, related_name='envios_notificacion')
+    
+    # Un anuncio con fecha de publicación futura se avisa al publicarse
+    programado_para = models.DateTimeField(default=timezone.now)
+    creado_en = models.DateTimeField(auto_now_add=True)
+    enviado_en = models.DateTimeField(null=True, blank=True)
+    destinatarios = models.IntegerField(null=True, blank=True)
+    intentos = models.IntegerField(default=0)
+    error = models.TextField(blank=True)
+    
+    class Meta:
+        verbose_name = 'Envío de notificación'
+        verbose_name_plural = 'Envíos de notificaciones'
+        ordering = ['programado_para']
+        indexes = [
+            models.Index(
+                fields=['programado_para'], condition=Q(enviado_en__isnull=True),
+                name='envio_notificacion_pend_idx'
+            ),
+        ]
+    
+    def __str__(self):
+        if self.enviado_en:
+            estado = 'enviado'
+        elif self.intentos >= self.MAXIMO_INTENTOS:
+            estado = 'fallido'
+        else:
+            estado = 'pendiente'
+        return f"{self.objeto} ({estado})"
+    
+    @property
+    def objeto(self):
+        return self.anuncio or self.actividad or self.documento
+    
+    @classmethod
+    def encolar(cls, objeto):
+        """Registra el aviso de un Anuncio, Actividad o Documento recién creado"""
+        campo = objeto._meta.model_name
+        programado_para = getattr(objeto, 'fecha_publicacion', None) or timezone.now()
+        return cls.objects.create(programado_para=programado_para, **{campo: objeto})
+    
+    @classmethod
+    def reprogramar(cls, anuncio):
+        """Mueve el aviso aún no enviado de `anuncio` a su fecha de publicación actual"""
+        return cls.objects.filter(anuncio=anuncio, enviado_en__isnull=True).update(
+            programado_para=anuncio.fecha_publicacion or timezone.now()
+        )
+    
+    @classmethod
+    def enviar_pendientes(cls, limite=None):
+        """
+        Envía los avisos ya programados, cada uno en su transacción. SKIP LOCKED
+        permite correr varios workers sin enviar dos veces el mismo. Si un envío falla
+        se registra el error y se reintenta más tarde, hasta MAXIMO_INTENTOS veces,
+        sin detener los demás. Retorna los enviados.
+        """
+        enviados = []
+        while limite is None or len(enviados) < limite:
+            with transaction.atomic():
+                envio = (
+                    cls.objects.filter(
+                        enviado_en__isnull=True, programado_para__lte=timezone.now(),
+                        intentos__lt=cls.MAXIMO_INTENTOS,
+                    )
+                    .select_related('anuncio', 'actividad', 'documento')
+                    .select_for_update(skip_locked=True, of=('self',))
+                    .first()
+                )
+                if envio is None:
+                    break
+                try:
+                    with transaction.atomic():
+                        envio.enviar()
+                except Exception as error:
+                    logger.exception('No se pudo enviar el aviso %s', envio.pk)
+                    envio._registrar_fallo(error)
+                    continue
+            enviados.append(envio)
+        return enviados
+    
+    def _registrar_fallo(self, error):
+        self.intentos += 1
+        self.error = str(error)
+        # Queda fuera de la consulta de pendientes hasta su próximo intento
+        self.programado_para = timezone.now() + self.ESPERA_REINTENTO * self.intentos
+        EnvioNotificacion.objects.filter(pk=self.pk).update(
+            intentos=self.intentos, error=self.error, programado_para=self.programado_para
+        )
+    
+    def _contenido(self):
+        """(tipo, título, mensaje, url, ícono, autor) de la notificación"""
+        if self.anuncio:
+            anuncio = self.anuncio
+            return ('nuevo_anuncio', f'Nuevo anuncio: {anuncio.titulo}',
+                    Truncator(anuncio.contenido).chars(200), '/anuncios', '📢', anuncio.creado_por_id)
+        if self.actividad:
+            actividad = self.actividad
+            return ('nueva_actividad', f'Nueva actividad: {actividad.titulo}',
+                    Truncator(actividad.descripcion).chars(200), '/actividades', '🎉', actividad.creado_por_id)
+        documento = self.documento
+        return ('documento_nuevo', f'Nuevo documento: {documento.titulo}',
+                Truncator(documento.descripcion).chars(200), '/repositorio', '📄', documento.subido_por_id)
+    
+    def enviar(self):
+        """Crea las notificaciones del aviso (ninguna si ya no está vigente). Retorna cuántas"""
+        objeto = self.objeto
+        if self.anuncio:
+            vigente = objeto.esta_vigente()
+        elif self.actividad:
+            vigente = objeto.activa
+        else:
+            vigente = objeto.activo
+        total = 0
+        if vigente:
+            tipo, titulo, mensaje, url, icono, autor_id = self._contenido()
+            total = notificaciones.crear_para(
+                objeto.destinatarios().exclude(pk=autor_id), tipo, titulo, mensaje, url, icono
+            )
+        self.enviado_en, self.destinatarios = timezone.now(), total
+        EnvioNotificacion.objects.filter(pk=self.pk).update(enviado_en=self.enviado_en, destinatarios=total)
+        return total
+
+
 # ======================================================
 # 7. LOGS Y AUDITORÍA
 # ======================================================
@@ -913,4 +1594,470 @@ class LogAuditoria(models.Model):
         ]
     
     def __str__(self):
-        return f"{self.usuario} - {self.accion} - {self.modelo} - {self.timestamp}"
\ No newline at end of file
+        return f"{self.usuario} - {self.accion} - {self.modelo} - {self.timestamp}"
+
+
+# ======================================================
+# 8. CORRELATIVOS (Números de solicitud y códigos de documento)
+# ======================================================
+
+class ContadorSecuencia(models.Model):
+    """
+    Último correlativo entregado por prefijo y año (SOL-2025-0001, DOC-2025-0001).
+    El incremento se hace con un UPDATE sobre una sola fila, que queda bloqueada
+    hasta el commit: dos inserciones concurrentes nunca reciben el mismo número.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    prefijo = models.CharField(max_length=10)
+    anio = models.IntegerField()
+    ultimo_valor = models.IntegerField(default=0)
+    actualizado_en = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ['prefijo', 'anio']
+        verbose_name = 'Contador de Secuencia'
+        verbose_name_plural = 'Contadores de Secuencia'
+        ordering = ['prefijo', '-anio']
+
+    def __str__(self):
+        return f"{self.prefijo}-{self.anio}: {self.ultimo_valor}"
+
+    @classmethod
+    def siguiente(cls, prefijo, anio):
+        """Entrega el siguiente correlativo en tiempo constante (sin COUNT)"""
+        with transaction.atomic():
+            filas = cls.objects.filter(prefijo=prefijo, anio=anio)
+            if not filas.update(ultimo_valor=F('ultimo_valor') + 1):
+                # Primer número del año: get_or_create resuelve la carrera de creación
+                _, creado = cls.objects.get_or_create(
+                    prefijo=prefijo, anio=anio, defaults={'ultimo_valor': 1}
+                )
+                if creado:
+                    return 1
+                filas.update(ultimo_valor=F('ultimo_valor') + 1)
+            return filas.values_list('ultimo_valor', flat=True).get()
+
+
+# ======================================================
+# 9. LIBRO DE SALDOS (Historial de movimientos de días)
+# ======================================================
+
+class MovimientoSaldo(models.Model):
+    """
+    Registro inmutable de cada cambio en las bolsas de tiempo de un usuario.
+    El saldo vigente sigue materializado en Usuario; este libro explica cómo llegó ahí.
+    """
+    BOLSA_CHOICES = [
+        ('vacaciones', 'Vacaciones'),
+        ('administrativos', 'Días Administrativos'),
+        ('sin_goce', 'Permiso sin goce (acumulado)'),
+        ('devolucion', 'Horas de Devolución'),
+    ]
+
+    # tipo de solicitud -> (bolsa, signo al descontar)
+    # En sin goce el "descuento" suma al acumulado
+    BOLSA_POR_TIPO = {
+        'vacaciones': ('vacaciones', -1),
+        'dia_administrativo': ('administrativos', -1),
+        'devolucion_tiempo': ('devolucion', -1),
+        'permiso_sin_goce': ('sin_goce', 1),
+    }
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    usuario = models.ForeignKey(Usuario, on_delete=models.CASCADE, related_name='movimientos_saldo')
+    bolsa = models.CharField(max_length=20, choices=BOLSA_CHOICES)
+    delta = models.DecimalField(max_digits=6, decimal_places=1)
+    saldo_resultante = models.DecimalField(max_digits=6, decimal_places=1)
+
+    # Origen del movimiento (opcional)
+    solicitud = models.ForeignKey(
+        Solicitud, on_delete=models.SET_NULL, null=True, blank=True, related_name='movimientos_saldo'
+    )
+    licencia = models.ForeignKey(
+        LicenciaMedica, on_delete=models.SET_NULL, null=True, blank=True, related_name='movimientos_saldo'
+    )
+    descripcion = models.CharField(max_length=255, blank=True)
+
+    creado_en = models.DateTimeField(default=timezone.now, editable=False)
+
+    class Meta:
+        verbose_name = 'Movimiento de Saldo'
+        verbose_name_plural = 'Movimientos de Saldo'
+        ordering = ['-creado_en']
+        indexes = [
+            models.Index(fields=['usuario', 'bolsa', 'creado_en']),
+        ]
+
+    def __str__(self):
+        return f"{self.usuario_id} {self.bolsa} {self.delta:+} ({self.creado_en:%d/%m/%Y})"
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValidationError("Los movimientos de saldo no se pueden modificar.")
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValidationError("Los movimientos de saldo no se pueden eliminar.")
+
+    @classmethod
+    def para_solicitud(cls, usuario, tipo_solicitud, cantidad, operacion='descontar', **extra):
+        """Construye (sin guardar) el movimiento que corresponde a una solicitud"""
+        if tipo_solicitud not in cls.BOLSA_POR_TIPO:
+            return None
+        bolsa, signo = cls.BOLSA_POR_TIPO[tipo_solicitud]
+        if operacion != 'descontar':
+            signo = -signo
+        cantidad = Decimal(str(cantidad))
+        if bolsa == 'vacaciones':
+            cantidad = Decimal(int(cantidad))  # Vacaciones: días enteros
+        return cls(usuario=usuario, bolsa=bolsa, delta=signo * cantidad, **extra)
+
+    @classmethod
+    def registrar(cls, movimientos):
+        """
+        Aplica y guarda un lote de movimientos en una sola transacción:
+        un único UPDATE con F() para todos los usuarios y un bulk_create.
+        Actualiza en memoria los saldos de las instancias de usuario recibidas.
+        """
+        if not movimientos:
+            return []
+
+        deltas = {}
+        for mov in movimientos:
+            por_bolsa = deltas.setdefault(mov.usuario_id, {})
+            por_bolsa[mov.bolsa] = por_bolsa.get(mov.bolsa, 0) + mov.delta
+
+        # Un solo UPDATE para todo el lote: CASE por usuario en cada columna afectada
+        cambios = {}
+        for usuario_id, por_bolsa in deltas.items():
+            for bolsa, delta in por_bolsa.items():
+                campo = Usuario.CAMPOS_SALDO[bolsa]
+                delta = int(delta) if bolsa == 'vacaciones' else delta
+                cambios.setdefault(campo, []).append(When(pk=usuario_id, then=F(campo) + delta))
+
+        campos = list(Usuario.CAMPOS_SALDO.values())
+        with transaction.atomic():
+            Usuario.objects.filter(pk__in=deltas).update(**{
+                campo: Case(*casos, default=F(campo), output_field=Usuario._meta.get_field(campo))
+                for campo, casos in cambios.items()
+            })
+            saldos = {
+                fila['id']: fila
+                for fila in Usuario.objects.filter(pk__in=deltas).values('id', *campos)
+            }
+
+            # Saldo resultante de cada movimiento: se recorre el lote hacia atrás
+            # desde el saldo final, deshaciendo los deltas posteriores.
+            restante = {}
+            for mov in reversed(movimientos):
+                clave = (mov.usuario_id, mov.bolsa)
+                if clave not in restante:
+                    restante[clave] = Decimal(saldos[mov.usuario_id][Usuario.CAMPOS_SALDO[mov.bolsa]])
+                mov.saldo_resultante = restante[clave]
+                restante[clave] -= mov.delta
+
+            cls.objects.bulk_create(movimientos)
+
+        for mov in movimientos:
+            if cls.usuario.is_cached(mov):
+                campo = Usuario.CAMPOS_SALDO[mov.bolsa]
+                setattr(mov.usuario, campo, saldos[mov.usuario_id][campo])
+        return movimientos
+
+    @classmethod
+    def saldo_al(cls, usuario, bolsa, fecha):
+        """
+        Saldo de una bolsa al cierre de `fecha`. Parte de la foto anual (SaldoAnual)
+        y suma solo los movimientos de ese año; sin foto, retrocede desde el saldo actual.
+        """
+        fin_del_dia = timezone.make_aware(datetime.combine(fecha + timedelta(days=1), time.min))
+        movimientos = cls.objects.filter(usuario=usuario, bolsa=bolsa)
+
+        foto = SaldoAnual.objects.filter(usuario=usuario, bolsa=bolsa, anio=fecha.year).first()
+        if foto:
+            inicio_anio = timezone.make_aware(datetime(fecha.year, 1, 1))
+            suma = movimientos.filter(
+                creado_en__gte=inicio_anio, creado_en__lt=fin_del_dia
+            ).aggregate(total=Sum('delta'))['total'] or Decimal('0')
+            return foto.saldo_inicial + suma
+
+        actual = Usuario.objects.filter(pk=usuario.pk).values_list(
+            Usuario.CAMPOS_SALDO[bolsa], flat=True
+        ).get()
+        posteriores = movimientos.filter(creado_en__gte=fin_del_dia).aggregate(
+            total=Sum('delta')
+        )['total'] or Decimal('0')
+        return Decimal(str(actual)) - posteriores
+
+
+class SaldoAnual(models.Model):
+    """
+    Foto del saldo de cada bolsa al 1 de enero. Permite consultar el saldo a una fecha
+    sumando solo los movimientos del año, en vez de recorrer todo el historial.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    usuario = models.ForeignKey(Usuario, on_delete=models.CASCADE, related_name='saldos_anuales')
+    bolsa = models.CharField(max_length=20, choices=MovimientoSaldo.BOLSA_CHOICES)
+    anio = models.IntegerField()
+    saldo_inicial = models.DecimalField(max_digits=6, decimal_places=1)
+    calculado_en = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ['usuario', 'bolsa', 'anio']
+        verbose_name = 'Saldo Anual'
+        verbose_name_plural = 'Saldos Anuales'
+        ordering = ['-anio']
+
+    def __str__(self):
+        return f"{self.usuario_id} {self.bolsa} {self.anio}: {self.saldo_inicial}"
+
+
+# ======================================================
+# 10. CALENDARIO LABORAL (Feriados)
+# ======================================================
+
+class Feriado(models.Model):
+    """
+    Feriados legales. Junto con sábados y domingos definen los días hábiles
+    que se descuentan en vacaciones y días administrativos.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    fecha = models.DateField(unique=True)
+    nombre = models.CharField(max_length=150)
+    irrenunciable = models.BooleanField(default=False)
+    creado_en = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Feriado'
+        verbose_name_plural = 'Feriados'
+        ordering = ['fecha']
+
+    def __str__(self):
+        return f"{self.fecha:%d/%m/%Y} - {self.nombre}"
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        from .dias_habiles import invalidar_calendario
+        invalidar_calendario(self.fecha.year)
+
+    def delete(self, *args, **kwargs):
+        anio = self.fecha.year
+        resultado = super().delete(*args, **kwargs)
+        from .dias_habiles import invalidar_calendario
+        invalidar_calendario(anio)
+        return resultado
+
+
+# ======================================================
+# 11. COLA DE GENERACIÓN DE PDF
+# ======================================================
+
+class TrabajoPDF(models.Model):
+    """
+    Generación pendiente del PDF de una solicitud. La API solo encola; el comando
+    `render_worker` toma los trabajos y ejecuta ReportLab fuera de los workers web.
+    """
+    ESTADO_CHOICES = [
+        ('pendiente', 'Pendiente'),
+        ('procesando', 'Procesando'),
+        ('completado', 'Completado'),
+        ('error', 'Error'),
+    ]
+
+    ESTADOS_ACTIVOS = ['pendiente', 'procesando']
+    MAXIMO_INTENTOS = 3
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    solicitud = models.ForeignKey(Solicitud, on_delete=models.CASCADE, related_name='trabajos_pdf')
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='pendiente')
+    intentos = models.IntegerField(default=0)
+    error = models.TextField(blank=True)
+    archivo = models.CharField(max_length=500, blank=True)
+
+    creado_en = models.DateTimeField(auto_now_add=True)
+    iniciado_en = models.DateTimeField(null=True, blank=True)
+    terminado_en = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Trabajo PDF'
+        verbose_name_plural = 'Trabajos PDF'
+        ordering = ['-creado_en']
+        indexes = [
+            models.Index(fields=['estado', 'creado_en']),
+        ]
+
+    def __str__(self):
+        return f"{self.solicitud_id} ({self.estado})"
+
+    @classmethod
+    def encolar(cls, ids):
+        """
+        Encola la generación para las solicitudes indicadas. Si una ya tiene un trabajo
+        pendiente o en proceso se reutiliza. Retorna {solicitud_id: trabajo}.
+        """
+        trabajos = {
+            trabajo.solicitud_id: trabajo
+            for trabajo in cls.objects.filter(solicitud_id__in=ids, estado__in=cls.ESTADOS_ACTIVOS)
+        }
+        nuevos = [cls(solicitud_id=pk) for pk in dict.fromkeys(ids) if pk not in trabajos]
+        cls.objects.bulk_create(nuevos)
+        trabajos.update((trabajo.solicitud_id, trabajo) for trabajo in nuevos)
+        return trabajos
+
+    @classmethod
+    def tomar(cls, limite):
+        """
+        Marca como 'procesando' hasta `limite` trabajos pendientes y retorna sus ids.
+        SKIP LOCKED permite correr varios workers sin que tomen el mismo trabajo.
+        """
+        with transaction.atomic():
+            ids = list(
+                cls.objects.filter(estado='pendiente').order_by('creado_en')
+                .select_for_update(skip_locked=True)
+                .values_list('id', flat=True)[:limite]
+            )
+            cls.objects.filter(pk__in=ids).update(
+                estado='procesando', iniciado_en=timezone.now(), intentos=F('intentos') + 1
+            )
+        return ids
+
+    @classmethod
+    def liberar_atascados(cls, antes_de):
+        """Devuelve a la cola los trabajos que quedaron 'procesando' desde antes de `antes_de`"""
+        return cls.objects.filter(estado='procesando', iniciado_en__lt=antes_de).update(estado='pendiente')
+
+    def _actualizar(self, **campos):
+        TrabajoPDF.objects.filter(pk=self.pk).update(**campos)
+        for campo, valor in campos.items():
+            setattr(self, campo, valor)
+
+    def ejecutar(self):
+        """Genera el PDF del trabajo. Si ReportLab falla se reintenta hasta MAXIMO_INTENTOS veces"""
+        if self.solicitud.estado != 'aprobada':
+            self._actualizar(estado='error', error='La solicitud ya no está aprobada.', terminado_en=timezone.now())
+            return self.estado
+
+        try:
+            archivo = self.solicitud.asegurar_pdf()
+        except Exception as e:
+            estado = 'pendiente' if self.intentos < self.MAXIMO_INTENTOS else 'error'
+            self._actualizar(estado=estado, error=str(e))
+            return self.estado
+
+        self._actualizar(estado='completado', archivo=archivo, error='', terminado_en=timezone.now())
+        return self.estado
+
+
+class ExportacionPDF(models.Model):
+    """
+    PDF unido de varias solicitudes aprobadas (exportar_pdfs?formato=pdf). pypdf arma
+    el documento completo en memoria antes de escribirlo, así que no se hace en la
+    petición: la API encola y `render_worker` lo deja en MEDIA para descargarlo.
+    """
+    ESTADO_CHOICES = TrabajoPDF.ESTADO_CHOICES
+    ESTADOS_ACTIVOS = TrabajoPDF.ESTADOS_ACTIVOS
+    MAXIMO_INTENTOS = 3
+    # Acota la memoria del worker al unir: para más, el ZIP se envía por trozos
+    MAXIMO_SOLICITUDES = 500
+    # Horas que se conserva el archivo una vez terminado
+    HORAS_VIGENCIA = 24
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    usuario = models.ForeignKey(Usuario, on_delete=models.CASCADE, related_name='exportaciones_pdf')
+    desde = models.DateField()
+    hasta = models.DateField()
+    area = models.ForeignKey(Area, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    solicitudes = models.ManyToManyField(Solicitud, related_name='+')
+    total = models.IntegerField(default=0)
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='pendiente')
+    intentos = models.IntegerField(default=0)
+    error = models.TextField(blank=True)
+    archivo = models.CharField(max_length=500, blank=True)
+
+    creado_en = models.DateTimeField(auto_now_add=True)
+    iniciado_en = models.DateTimeField(null=True, blank=True)
+    terminado_en = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Exportación PDF'
+        verbose_name_plural = 'Exportaciones PDF'
+        ordering = ['-creado_en']
+        indexes = [
+            models.Index(fields=['estado', 'creado_en']),
+        ]
+
+    def __str__(self):
+        return f"{self.desde} a {self.hasta} ({self.estado})"
+
+    @classmethod
+    def encolar(cls, usuario, desde, hasta, area_id, solicitudes):
+        """
+        Encola el PDF unido de `solicitudes` (el alcance del usuario al pedirlo). Si el
+        usuario ya tiene uno pendiente o en proceso con los mismos filtros se reutiliza.
+        """
+        with transaction.atomic():
+            activa = cls.objects.filter(
+                usuario=usuario, desde=desde, hasta=hasta, area_id=area_id, estado__in=cls.ESTADOS_ACTIVOS
+            ).first()
+            if activa:
+                return activa
+            ids = list(solicitudes.values_list('pk', flat=True))
+            exportacion = cls.objects.create(
+                usuario=usuario, desde=desde, hasta=hasta, area_id=area_id, total=len(ids)
+            )
+            exportacion.solicitudes.set(ids)
+        return exportacion
+
+    @classmethod
+    def tomar(cls, limite):
+        """Marca como 'procesando' hasta `limite` exportaciones pendientes (SKIP LOCKED) y retorna sus ids"""
+        with transaction.atomic():
+            ids = list(
+                cls.objects.filter(estado='pendiente').order_by('creado_en')
+                .select_for_update(skip_locked=True)
+                .values_list('id', flat=True)[:limite]
+            )
+            cls.objects.filter(pk__in=ids).update(
+                estado='procesando', iniciado_en=timezone.now(), intentos=F('intentos') + 1
+            )
+        return ids
+
+    @classmethod
+    def liberar_atascados(cls, antes_de):
+        """Devuelve a la cola las exportaciones que quedaron 'procesando' desde antes de `antes_de`"""
+        return cls.objects.filter(estado='procesando', iniciado_en__lt=antes_de).update(estado='pendiente')
+
+    @classmethod
+    def eliminar_vencidas(cls):
+        """Borra las exportaciones terminadas hace más de HORAS_VIGENCIA horas y sus archivos"""
+        vencidas = cls.objects.filter(terminado_en__lt=timezone.now() - timedelta(hours=cls.HORAS_VIGENCIA))
+        for archivo in vencidas.exclude(archivo='').values_list('archivo', flat=True):
+            default_storage.delete(archivo)
+        return vencidas.delete()[0]
+
+    def _actualizar(self, **campos):
+        ExportacionPDF.objects.filter(pk=self.pk).update(**campos)
+        for campo, valor in campos.items():
+            setattr(self, campo, valor)
+
+    def ejecutar(self, procesos=0, pool=None):
+        """
+        Une los PDF de las solicitudes (generando los que falten, en `pool` si se entrega)
+        y lo guarda en MEDIA. Si falla se reintenta hasta MAXIMO_INTENTOS veces.
+        """
+        from .cola_pdf import RELACIONES_PDF
+        from .exportacion_pdf import pdf_unido
+
+        # Las anuladas después de pedir la exportación ya no se incluyen
+        solicitudes = self.solicitudes.filter(estado='aprobada').select_related(*RELACIONES_PDF)
+        try:
+            archivo = pdf_unido(solicitudes, f'exportaciones/{self.pk}.pdf', procesos, pool)
+        except Exception as e:
+            if self.intentos < self.MAXIMO_INTENTOS:
+                self._actualizar(estado='pendiente', error=str(e))
+            else:
+                self._actualizar(estado='error', error=str(e), terminado_en=timezone.now())
+            return self.estado
+
+        self._actualizar(estado='completado', archivo=archivo, error='', terminado_en=timezone.now())
+        return self.estado
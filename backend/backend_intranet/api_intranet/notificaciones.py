@@ -0,0 +1,65 @@
+# ======================================================
+# NOTIFICACIONES - Creación masiva por conjunto de destinatarios
+# Ubicación: api_intranet/notificaciones.py
+# ======================================================
+#
+# Un anuncio para todo el CESFAM son cientos o miles de notificaciones. En vez
+# de un create() por usuario, los destinatarios se resuelven como consulta
+# (áreas × visibilidad por rol, ver destinatarios() de cada modelo) y se
+# insertan con un solo INSERT ... SELECT: los usuarios no pasan por Python.
+# En motores sin gen_random_uuid() se usa bulk_create en lotes fijos.
+#
+# Lo llama EnvioNotificacion.enviar() desde el comando `enviar_notificaciones`,
+# fuera de la petición que creó el anuncio, actividad o documento.
+
+from django.db import connection
+from django.db.models import DateTimeField, F, Func, UUIDField, Value
+from django.utils import timezone
+
+
+# Filas por INSERT cuando no se puede usar INSERT ... SELECT
+TAMANO_LOTE = 1000
+
+
+def crear_para(usuarios, tipo, titulo, mensaje, url='', icono='🔔'):
+    """
+    Crea la misma notificación para cada usuario del queryset `usuarios`.
+    Retorna cuántas se crearon.
+    """
+    from .models import Notificacion
+
+    valores = {
+        'tipo': tipo, 'titulo': titulo[:200], 'mensaje': mensaje,
+        'url': url, 'icono': icono, 'leida': False, 'creada_en': timezone.now(),
+    }
+    if connection.vendor != 'postgresql':
+        return _crear_en_lotes(Notificacion, usuarios, valores)
+
+    columnas = {
+        # gen_random_uuid() es parte de PostgreSQL desde la versión 13
+        'id': Func(function='gen_random_uuid', output_field=UUIDField()),
+        'usuario_id': F('pk'),
+        **{
+            campo: Value(valor, output_field=DateTimeField()) if campo == 'creada_en' else Value(valor)
+            for campo, valor in valores.items()
+        },
+    }
+    seleccion = usuarios.order_by().annotate(
+        **{f'notificacion_{campo}': expresion for campo, expresion in columnas.items()}
+    ).values_list(*(f'notificacion_{campo}' for campo in columnas))
+    sql, params = seleccion.query.sql_with_params()
+
+    nombre = connection.ops.quote_name
+    destino = ', '.join(nombre(Notificacion._meta.get_field(campo).column) for campo in columnas)
+    with connection.cursor() as cursor:
+        cursor.execute(f'INSERT INTO {nombre(Notificacion._meta.db_table)} ({destino}) {sql}', params)
+        return cursor.rowcount
+
+
+def _crear_en_lotes(Notificacion, usuarios, valores):
+    ids = list(usuarios.order_by().values_list('pk', flat=True))
+    for inicio in range(0, len(ids), TAMANO_LOTE):
+        Notificacion.objects.bulk_create(
+            Notificacion(usuario_id=usuario_id, **valores) for usuario_id in ids[inicio:inicio + TAMANO_LOTE]
+        )
+    return len(ids)
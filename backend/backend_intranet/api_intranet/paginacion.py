@@ -0,0 +1,75 @@
+# ======================================================
+# PAGINACIÓN - Cursor por clave (keyset)
+# Ubicación: api_intranet/paginacion.py
+# ======================================================
+#
+# En vez de OFFSET, cada página continúa después de la última fila enviada:
+# WHERE (a, b, c) < (último a, último b, último c) sobre un índice con el
+# mismo orden. El costo no crece con el número de página y las filas nuevas
+# no desplazan a las ya vistas. El cursor es opaco para el cliente (base64).
+
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.db import models
+from django.db.models import Q
+
+
+def _a_json(valor):
+    # Fechas con microsegundos completos (DjangoJSONEncoder los corta a milisegundos
+    # y el cursor saltaría o repetiría filas)
+    if hasattr(valor, 'isoformat'):
+        return valor.isoformat()
+    return str(valor)
+
+
+def codificar(valores):
+    """Cursor opaco con los valores de orden de la última fila de la página"""
+    datos = json.dumps(list(valores), default=_a_json, separators=(',', ':'))
+    return base64.urlsafe_b64encode(datos.encode()).decode().rstrip('=')
+
+
+def decodificar(cursor, modelo, campos):
+    """
+    Valores de un cursor para los `campos` de `modelo`, ya convertidos al tipo de
+    cada campo; ValueError si no es uno de los emitidos por codificar()
+    """
+    try:
+        valores = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (binascii.Error, UnicodeDecodeError, json.JSONDecodeError) as error:
+        raise ValueError('Cursor inválido') from error
+    if not isinstance(valores, list) or len(valores) != len(campos):
+        raise ValueError('Cursor inválido')
+    return [_convertir(modelo._meta.get_field(campo), valor) for campo, valor in zip(campos, valores)]
+
+
+def _convertir(campo, valor):
+    # El tipo JSON que codificar() emite para cada campo: lo demás (una lista, null,
+    # un número donde va una fecha) no se puede comparar en el filtro
+    if isinstance(campo, models.BooleanField):
+        valido = isinstance(valor, bool)
+    elif isinstance(campo, (models.IntegerField, models.FloatField)):
+        valido = isinstance(valor, (int, float)) and not isinstance(valor, bool)
+    else:
+        # Fechas, UUID, decimales y textos viajan como texto (_a_json)
+        valido = isinstance(valor, str)
+    if not valido:
+        raise ValueError('Cursor inválido')
+    try:
+        return campo.to_python(valor)
+    except (ValidationError, TypeError, ValueError) as error:
+        raise ValueError('Cursor inválido') from error
+
+
+def despues_de(campos, valores):
+    """
+    Filas que van después de `valores` en un orden descendente por `campos`:
+    a <= A AND (a < A OR (a = A AND (b < B OR ...))). La primera condición deja
+    al planificador un rango directo sobre la primera columna del índice.
+    """
+    condicion = Q(**{f'{campos[-1]}__lt': valores[-1]})
+    for campo, valor in zip(reversed(campos[:-1]), reversed(valores[:-1])):
+        condicion = Q(**{f'{campo}__lt': valor}) | (Q(**{campo: valor}) & condicion)
+    return Q(**{f'{campos[0]}__lte': valores[0]}) & condicion
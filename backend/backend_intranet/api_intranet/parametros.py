@@ -0,0 +1,38 @@
+# ======================================================
+# PARÁMETROS - Lectura de ?fecha= y ?id= en las vistas
+# Ubicación: api_intranet/parametros.py
+# ======================================================
+#
+# Un valor mal formado en la URL es un error del cliente: se responde 400 con
+# {'error': ...} (la excepción la convierte DRF), no un 500 al usarlo en la consulta.
+
+import uuid
+
+from django.utils.dateparse import parse_date
+from rest_framework.exceptions import ValidationError
+
+
+def fecha(request, nombre, defecto=None):
+    """?<nombre>=YYYY-MM-DD como date; `defecto` si no viene"""
+    valor = request.query_params.get(nombre)
+    if not valor:
+        return defecto
+    try:
+        # parse_date retorna None si el formato no calza y ValueError si la fecha no existe (2025-02-30)
+        resultado = parse_date(valor)
+    except ValueError:
+        resultado = None
+    if resultado is None:
+        raise ValidationError({'error': f'{nombre}: fecha inválida (use YYYY-MM-DD)'})
+    return resultado
+
+
+def identificador(request, nombre):
+    """?<nombre>=<uuid> como UUID; None si no viene"""
+    valor = request.query_params.get(nombre)
+    if not valor:
+        return None
+    try:
+        return uuid.UUID(valor)
+    except ValueError:
+        raise ValidationError({'error': f'{nombre}: identificador inválido'}) from None
@@ -11,54 +11,127 @@ from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, Tabl
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_JUSTIFY
 from io import BytesIO
 from datetime import datetime
+from types import MappingProxyType
+from typing import NamedTuple
+import threading
 
-class SolicitudPDFGenerator:
-    """
-    Generador de PDFs para solicitudes de vacaciones y días administrativos aprobadas.
-    """
-    
-    def __init__(self):
-        self.styles = getSampleStyleSheet()
-        self._setup_custom_styles()
-    
-    def _setup_custom_styles(self):
-        """Configurar estilos personalizados"""
-        self.styles.add(ParagraphStyle(
+
+class PlantillaPDF(NamedTuple):
+    """Estilos, anchos de columna y fuentes compartidos por todos los PDF"""
+    estilos: MappingProxyType
+    tablas: MappingProxyType
+    anchos_columnas: tuple
+    fuente_negrita: str
+
+
+def construir_plantilla():
+    """Arma la plantilla desde cero (getSampleStyleSheet + estilos y tablas propios)"""
+    base = getSampleStyleSheet()
+    negrita = 'Helvetica-Bold'
+
+    estilos = {
+        'CustomTitle': ParagraphStyle(
             name='CustomTitle',
-            parent=self.styles['Title'],
+            parent=base['Title'],
             fontSize=18,
             textColor=colors.HexColor('#1e40af'),
             spaceAfter=12,
             alignment=TA_CENTER,
-            fontName='Helvetica-Bold'
-        ))
-        
-        self.styles.add(ParagraphStyle(
+            fontName=negrita
+        ),
+        'CustomHeading': ParagraphStyle(
             name='CustomHeading',
-            parent=self.styles['Heading2'],
+            parent=base['Heading2'],
             fontSize=14,
             textColor=colors.HexColor('#1e40af'),
             spaceAfter=8,
             spaceBefore=12,
-            fontName='Helvetica-Bold'
-        ))
-        
-        self.styles.add(ParagraphStyle(
+            fontName=negrita
+        ),
+        'CustomBody': ParagraphStyle(
             name='CustomBody',
-            parent=self.styles['Normal'],
+            parent=base['Normal'],
             fontSize=11,
             textColor=colors.black,
             alignment=TA_JUSTIFY,
             spaceAfter=6
-        ))
-        
-        self.styles.add(ParagraphStyle(
+        ),
+        'CustomSmall': ParagraphStyle(
             name='CustomSmall',
-            parent=self.styles['Normal'],
+            parent=base['Normal'],
             fontSize=9,
             textColor=colors.HexColor('#4b5563'),
             alignment=TA_LEFT
-        ))
+        ),
+    }
+
+    tablas = {
+        'info': TableStyle([
+            ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#e5e7eb')),
+            ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('FONTNAME', (0, 0), (0, -1), negrita),
+            ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#d1d5db')),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+            ('TOPPADDING', (0, 0), (-1, -1), 8),
+        ]),
+        'solicitante': TableStyle([
+            ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#eff6ff')),
+            ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#bfdbfe')),
+            ('FONTNAME', (0, 0), (0, -1), negrita),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+        ]),
+        'detalle': TableStyle([
+            ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#f0fdf4')),
+            ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#bbf7d0')),
+            ('FONTNAME', (0, 0), (0, -1), negrita),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+        ]),
+        'jefatura': TableStyle([
+            ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#fff7ed')),
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#ffedd5')),
+            ('FONTSIZE', (0, 0), (-1, -1), 9),
+        ]),
+        'direccion': TableStyle([
+            ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#f0fdfa')),
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#ccfbf1')),
+            ('FONTSIZE', (0, 0), (-1, -1), 9),
+        ]),
+    }
+
+    return PlantillaPDF(
+        estilos=MappingProxyType(estilos),
+        tablas=MappingProxyType(tablas),
+        anchos_columnas=(2.5*inch, 3.5*inch),
+        fuente_negrita=negrita,
+    )
+
+
+_plantilla = None
+_plantilla_lock = threading.Lock()
+
+
+def plantilla_compartida():
+    """
+    Plantilla del proceso, construida en el primer uso. ReportLab solo lee los
+    estilos al armar el documento, así que se comparten entre hilos sin copiarlos.
+    """
+    global _plantilla
+    if _plantilla is None:
+        with _plantilla_lock:
+            if _plantilla is None:
+                _plantilla = construir_plantilla()
+    return _plantilla
+
+
+class SolicitudPDFGenerator:
+    """
+    Generador de PDFs para solicitudes de vacaciones y días administrativos aprobadas.
+    """
+    
+    def __init__(self, plantilla=None):
+        self.plantilla = plantilla or plantilla_compartida()
+        self.styles = self.plantilla.estilos
     
     def _format_rut(self, rut):
         return rut
@@ -81,21 +154,27 @@ class SolicitudPDFGenerator:
                 return dt
         return dt.strftime('%d/%m/%Y %H:%M')
     
-    def generate_solicitud_pdf(self, solicitud):
-        """
-        Genera un PDF para una solicitud aprobada.
-        """
-        buffer = BytesIO()
-        
-        doc = SimpleDocTemplate(
-            buffer,
+    def _documento(self, destino):
+        return SimpleDocTemplate(
+            destino,
             pagesize=letter,
             rightMargin=72,
             leftMargin=72,
             topMargin=72,
             bottomMargin=72,
         )
-        
+
+    def generate_solicitud_pdf(self, solicitud):
+        """
+        Genera un PDF para una solicitud aprobada.
+        """
+        buffer = BytesIO()
+        self._documento(buffer).build(self._contenido(solicitud))
+        buffer.seek(0)
+        return buffer
+
+    def _contenido(self, solicitud):
+        """Flowables de una solicitud"""
         story = []
         
         # HEADER / TÍTULO
@@ -113,16 +192,8 @@ class SolicitudPDFGenerator:
             ['Fecha de Solicitud:', self._format_datetime(solicitud.creada_en)],
         ]
         
-        info_table = Table(info_doc, colWidths=[2.5*inch, 3.5*inch])
-        info_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#e5e7eb')),
-            ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-            ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#d1d5db')),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-            ('TOPPADDING', (0, 0), (-1, -1), 8),
-        ]))
+        info_table = Table(info_doc, colWidths=self.plantilla.anchos_columnas)
+        info_table.setStyle(self.plantilla.tablas['info'])
         story.append(info_table)
         story.append(Spacer(1, 0.3*inch))
         
@@ -138,13 +209,8 @@ class SolicitudPDFGenerator:
             ['Teléfono:', solicitud.telefono_contacto],
         ]
         
-        sol_table = Table(datos_solicitante, colWidths=[2.5*inch, 3.5*inch])
-        sol_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#eff6ff')),
-            ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#bfdbfe')),
-            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-        ]))
+        sol_table = Table(datos_solicitante, colWidths=self.plantilla.anchos_columnas)
+        sol_table.setStyle(self.plantilla.tablas['solicitante'])
         story.append(sol_table)
         story.append(Spacer(1, 0.3*inch))
         
@@ -158,13 +224,8 @@ class SolicitudPDFGenerator:
             ['Cantidad Solicitada:', f"{solicitud.cantidad_dias} {'Días' if solicitud.tipo != 'devolucion_tiempo' else 'Horas'}"],
         ]
         
-        det_table = Table(detalle_solicitud, colWidths=[2.5*inch, 3.5*inch])
-        det_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#f0fdf4')),
-            ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#bbf7d0')),
-            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-        ]))
+        det_table = Table(detalle_solicitud, colWidths=self.plantilla.anchos_columnas)
+        det_table.setStyle(self.plantilla.tablas['detalle'])
         story.append(det_table)
         
         if solicitud.motivo:
@@ -183,12 +244,8 @@ class SolicitudPDFGenerator:
                 ['Aprobado por:', solicitud.jefatura_aprobador.get_nombre_completo()],
                 ['Fecha:', self._format_datetime(solicitud.fecha_aprobacion_jefatura)],
             ]
-            jef_table = Table(jef_data, colWidths=[2.5*inch, 3.5*inch])
-            jef_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#fff7ed')),
-                ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#ffedd5')),
-                ('FONTSIZE', (0, 0), (-1, -1), 9),
-            ]))
+            jef_table = Table(jef_data, colWidths=self.plantilla.anchos_columnas)
+            jef_table.setStyle(self.plantilla.tablas['jefatura'])
             story.append(jef_table)
             story.append(Spacer(1, 0.1*inch))
         
@@ -199,12 +256,8 @@ class SolicitudPDFGenerator:
                 ['Aprobado por:', solicitud.direccion_aprobador.get_nombre_completo()],
                 ['Fecha:', self._format_datetime(solicitud.fecha_aprobacion_direccion)],
             ]
-            dir_table = Table(dir_data, colWidths=[2.5*inch, 3.5*inch])
-            dir_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#f0fdfa')),
-                ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#ccfbf1')),
-                ('FONTSIZE', (0, 0), (-1, -1), 9),
-            ]))
+            dir_table = Table(dir_data, colWidths=self.plantilla.anchos_columnas)
+            dir_table.setStyle(self.plantilla.tablas['direccion'])
             story.append(dir_table)
             
         # Comentarios Finales (Cualquier rol)
@@ -219,10 +272,7 @@ class SolicitudPDFGenerator:
             f"Documento generado automáticamente el {datetime.now().strftime('%d/%m/%Y %H:%M')}",
             self.styles['CustomSmall']
         ))
-        
-        doc.build(story)
-        buffer.seek(0)
-        return buffer
+        return story
 
 def generar_pdf_solicitud(solicitud):
     generator = SolicitudPDFGenerator()
@@ -0,0 +1,170 @@
+# ======================================================
+# PREVISUALIZACIONES - Miniatura de la primera página
+# Ubicación: api_intranet/previsualizaciones.py
+# ======================================================
+#
+# Al subir un Documento o un AdjuntoAnuncio se genera un JPEG pequeño: la
+# primera página de un PDF o la imagen reducida. Se guarda una sola vez por
+# hash del contenido en <DOCUMENTOS_BLOB_ROOT>/previews/ab/<hash>.jpg, así
+# dos archivos iguales comparten la miniatura. Se sirve por la API, con los
+# mismos permisos que el archivo; la API no la genera al pedirla.
+#
+# La generación corre en segundo plano (segundo_plano.py) después de confirmar
+# la subida (pdftoppm puede tardar segundos): la petición no la espera. Si el contenido
+# no tiene miniatura posible queda anotado con <hash>.sin, para no volver a
+# leerlo; el comando generar_previsualizaciones --reintentar ignora esa marca.
+#
+# Los PDF se rasterizan con pdftoppm (poppler-utils) si está instalado. Sin
+# él se usa la imagen más grande incrustada en la primera página, que cubre
+# los documentos escaneados; los PDF de solo texto quedan sin miniatura.
+
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+
+from PIL import Image, ImageOps
+from pypdf import PdfReader
+
+from . import blobs, segundo_plano
+
+
+logger = logging.getLogger(__name__)
+
+# Caja máxima de la miniatura (ancho, alto); se conserva la proporción
+TAMANO = (320, 320)
+CALIDAD_JPEG = 80
+
+# Segundos máximos para rasterizar una página con pdftoppm
+TIEMPO_MAXIMO_PDF = 20
+
+
+def ruta(huella):
+    return blobs.raiz() / 'previews' / huella[:2] / f'{huella}.jpg'
+
+
+def ruta_sin_vista_previa(huella):
+    """Marca de un contenido que ya se intentó y no tiene miniatura"""
+    return ruta(huella).with_suffix('.sin')
+
+
+def existe(huella):
+    return bool(huella) and ruta(huella).is_file()
+
+
+def sin_vista_previa(huella):
+    return bool(huella) and ruta_sin_vista_previa(huella).is_file()
+
+
+def es_previsualizable(nombre_archivo, mime_type):
+    return _es_pdf(nombre_archivo, mime_type) or (mime_type or '').startswith('image/')
+
+
+def _es_pdf(nombre_archivo, mime_type):
+    return mime_type == 'application/pdf' or nombre_archivo.lower().endswith('.pdf')
+
+
+def programar(huella, abrir, nombre_archivo, mime_type):
+    """
+    Genera la miniatura en segundo plano una vez confirmada la transacción en curso.
+    No hace nada si ya existe, si el formato no tiene o si ya se intentó sin éxito.
+    """
+    if not huella or not es_previsualizable(nombre_archivo, mime_type):
+        return
+    if existe(huella) or sin_vista_previa(huella):
+        return
+    segundo_plano.al_confirmar(generar, huella, abrir, nombre_archivo, mime_type)
+
+
+def generar(huella, abrir, nombre_archivo, mime_type, reintentar=False):
+    """
+    Genera (si no existe) la miniatura del contenido `huella` y retorna su ruta,
+    o None si el formato no se puede previsualizar. `abrir()` entrega el archivo
+    en binario. Los errores se registran: la subida no debe fallar por esto.
+    """
+    destino = ruta(huella)
+    if destino.is_file():
+        return destino
+    if not es_previsualizable(nombre_archivo, mime_type):
+        return None
+    if sin_vista_previa(huella) and not reintentar:
+        return None
+
+    try:
+        with abrir() as archivo:
+            if _es_pdf(nombre_archivo, mime_type):
+                imagen = _primera_pagina(archivo)
+            else:
+                imagen = Image.open(archivo)
+                # JPEG: decodifica directamente a una escala cercana en vez de a tamaño completo
+                imagen.draft('RGB', TAMANO)
+                imagen = ImageOps.exif_transpose(imagen)
+            if imagen is not None:
+                imagen.thumbnail(TAMANO)
+                _guardar(imagen, destino)
+                ruta_sin_vista_previa(huella).unlink(missing_ok=True)
+                return destino
+    except FileNotFoundError as error:
+        # Sin el archivo no se sabe si tendría miniatura: no se marca
+        logger.warning('No se pudo generar la miniatura de %s: %s', nombre_archivo, error)
+        return None
+    except Exception as error:
+        logger.warning('No se pudo generar la miniatura de %s: %s', nombre_archivo, error)
+
+    marca = ruta_sin_vista_previa(huella)
+    marca.parent.mkdir(parents=True, exist_ok=True)
+    marca.touch()
+    return None
+
+
+def _guardar(imagen, destino):
+    """JPEG escrito en un temporal y movido con os.replace, como los blobs"""
+    if imagen.mode != 'RGB':
+        # Transparencias sobre fondo blanco (JPEG no tiene canal alfa)
+        con_alfa = imagen.convert('RGBA')
+        imagen = Image.new('RGB', imagen.size, 'white')
+        imagen.paste(con_alfa, mask=con_alfa.getchannel('A'))
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    descriptor, temporal = tempfile.mkstemp(dir=destino.parent, suffix='.tmp')
+    try:
+        with os.fdopen(descriptor, 'wb') as salida:
+            imagen.save(salida, 'JPEG', quality=CALIDAD_JPEG, optimize=True)
+        os.replace(temporal, destino)
+    except BaseException:
+        if os.path.exists(temporal):
+            os.unlink(temporal)
+        raise
+
+
+def _primera_pagina(archivo):
+    programa = shutil.which('pdftoppm')
+    if programa:
+        return _rasterizar(programa, archivo)
+    return _imagen_incrustada(archivo)
+
+
+def _rasterizar(programa, archivo):
+    """Primera página con pdftoppm, ya escalada a TAMANO"""
+    with tempfile.TemporaryDirectory() as carpeta:
+        entrada = os.path.join(carpeta, 'entrada.pdf')
+        with open(entrada, 'wb') as destino:
+            shutil.copyfileobj(archivo, destino, blobs.TAMANO_TROZO)
+        subprocess.run(
+            [programa, '-f', '1', '-l', '1', '-singlefile', '-png',
+             '-scale-to-x', str(TAMANO[0]), '-scale-to-y', '-1',
+             entrada, os.path.join(carpeta, 'pagina')],
+            check=True, capture_output=True, timeout=TIEMPO_MAXIMO_PDF,
+        )
+        with Image.open(os.path.join(carpeta, 'pagina.png')) as imagen:
+            imagen.load()
+            return imagen.copy()
+
+
+def _imagen_incrustada(archivo):
+    """La imagen más grande de la primera página (PDF escaneados), o None"""
+    pagina = PdfReader(archivo).pages[0]
+    imagenes = [incrustada.image for incrustada in pagina.images]
+    if not imagenes:
+        return None
+    return max(imagenes, key=lambda imagen: imagen.width * imagen.height)
@@ -0,0 +1,51 @@
+# ======================================================
+# SEGUNDO PLANO - Trabajo posterior a una subida, fuera de la petición
+# Ubicación: api_intranet/segundo_plano.py
+# ======================================================
+#
+# Las miniaturas y el texto para la búsqueda de los archivos subidos se
+# procesan en un hilo del proceso, de a uno, después de confirmar la
+# transacción: la petición no los espera ni mantiene bloqueos mientras tanto.
+# Si el proceso termina antes, indexar_documentos y generar_previsualizaciones
+# completan lo que haya quedado pendiente.
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import connection, transaction
+
+
+# Un hilo por proceso: las tareas no compiten con las peticiones
+_ejecutor = None
+_ejecutor_pid = None
+_lock = threading.Lock()
+
+
+def _tarea(funcion, args):
+    try:
+        return funcion(*args)
+    finally:
+        # La conexión que haya abierto el hilo no queda abierta entre tareas
+        connection.close()
+
+
+def ejecutar(funcion, *args):
+    """Ejecuta `funcion(*args)` en el hilo de este proceso. Retorna el Future"""
+    global _ejecutor, _ejecutor_pid
+    with _lock:
+        # Tras un fork el hilo del padre no existe en el hijo
+        if _ejecutor is None or _ejecutor_pid != os.getpid():
+            _ejecutor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='segundo-plano')
+            _ejecutor_pid = os.getpid()
+        return _ejecutor.submit(_tarea, funcion, args)
+
+
+def al_confirmar(funcion, *args):
+    """Ejecuta `funcion(*args)` en segundo plano una vez confirmada la transacción en curso"""
+    transaction.on_commit(lambda: ejecutar(funcion, *args))
+
+
+def esperar():
+    """Espera a que terminen las tareas programadas en este proceso"""
+    ejecutar(lambda: None).result()
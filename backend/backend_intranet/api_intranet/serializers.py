@@ -5,11 +5,16 @@
 # ======================================================
 
 from rest_framework import serializers
+from . import blobs, previsualizaciones
+from .busqueda import programar_indexado
+from .conflictos import buscar_traslapes
+from .dias_habiles import validar_cantidad_dias
 from .models import (
     Usuario, Rol, Area, Solicitud,TipoContrato,
     LicenciaMedica, Actividad, InscripcionActividad,
     Anuncio, AdjuntoAnuncio, Documento, CategoriaDocumento,
-    Notificacion, LogAuditoria
+    Notificacion, EnvioNotificacion, LogAuditoria, MovimientoSaldo, TrabajoPDF, ExportacionPDF,
+    SubidaDocumento
 )
 
 
@@ -49,6 +54,9 @@ class AreaSerializer(serializers.ModelSerializer):
         return obj.jefe.get_nombre_completo() if obj.jefe else None
     
     def get_total_funcionarios(self, obj):
+        # AreaViewSet lo anota en la consulta; al crear/editar se cuenta
+        if hasattr(obj, 'num_funcionarios'):
+            return obj.num_funcionarios
         return obj.funcionarios.count()
 
 
@@ -69,6 +77,7 @@ class UsuarioListSerializer(serializers.ModelSerializer):
     rol_nivel = serializers.IntegerField(source='rol.nivel', read_only=True)
     area_nombre = serializers.CharField(source='area.nombre', read_only=True)
     nombre_completo = serializers.SerializerMethodField()
+    avatar_srcset = serializers.SerializerMethodField()
     
     class Meta:
         model = Usuario
@@ -76,12 +85,15 @@ class UsuarioListSerializer(serializers.ModelSerializer):
             'id', 'rut', 'nombre', 'apellido_paterno', 'apellido_materno', 
             'nombre_completo', 'email', 'telefono',
             'cargo', 'area', 'area_nombre', 'rol', 'rol_nombre', 'rol_nivel',
-            'avatar', 'is_active'
+            'avatar', 'avatar_ancho', 'avatar_alto', 'avatar_srcset', 'is_active'
         ]
         read_only_fields = ('id',)
     
     def get_nombre_completo(self, obj):
         return obj.get_nombre_completo()
+    
+    def get_avatar_srcset(self, obj):
+        return obj.get_srcset_avatar()
 
 
 class UsuarioDetailSerializer(serializers.ModelSerializer):
@@ -91,6 +103,7 @@ class UsuarioDetailSerializer(serializers.ModelSerializer):
     area_nombre = serializers.CharField(source='area.nombre', read_only=True)
     tipo_contrato_nombre = serializers.CharField(source='tipo_contrato.nombre', read_only=True)
     nombre_completo = serializers.CharField(source='get_nombre_completo', read_only=True)
+    avatar_srcset = serializers.SerializerMethodField()
     
     # Permisos del rol
     rol_nivel = serializers.IntegerField(source='rol.nivel', read_only=True)
@@ -118,7 +131,7 @@ class UsuarioDetailSerializer(serializers.ModelSerializer):
             'dias_sin_goce_acumulados',
             'horas_devolucion_disponibles',
             
-            'avatar', 'tema_preferido', 'is_active',
+            'avatar', 'avatar_ancho', 'avatar_alto', 'avatar_srcset', 'tema_preferido', 'is_active',
             'creado_en', 'actualizado_en', 'ultimo_acceso',
             
             'rol_nivel', 'rol_puede_crear_usuarios', 'rol_puede_eliminar_contenido',
@@ -129,6 +142,36 @@ class UsuarioDetailSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id', 'creado_en', 'actualizado_en']
 
+    def get_avatar_srcset(self, obj):
+        return obj.get_srcset_avatar()
+
+    def update(self, instance, validated_data):
+        # Los saldos se ajustan vía libro de saldos (delta atómico), no sobrescribiendo la columna
+        nuevos_saldos = {
+            campo: validated_data.pop(campo)
+            for campo in Usuario.CAMPOS_SALDO.values()
+            if campo in validated_data
+        }
+        instance = super().update(instance, validated_data)
+        if nuevos_saldos:
+            instance.ajustar_saldos(nuevos_saldos, descripcion='Ajuste manual desde perfil de usuario')
+        return instance
+
+
+class MovimientoSaldoSerializer(serializers.ModelSerializer):
+    """Serializer de solo lectura para el libro de saldos"""
+    bolsa_display = serializers.CharField(source='get_bolsa_display', read_only=True)
+    numero_solicitud = serializers.CharField(source='solicitud.numero_solicitud', read_only=True, default=None)
+    numero_licencia = serializers.CharField(source='licencia.numero_licencia', read_only=True, default=None)
+
+    class Meta:
+        model = MovimientoSaldo
+        fields = [
+            'id', 'usuario', 'bolsa', 'bolsa_display', 'delta', 'saldo_resultante',
+            'solicitud', 'numero_solicitud', 'licencia', 'numero_licencia',
+            'descripcion', 'creado_en'
+        ]
+        read_only_fields = fields
 
 
 class UsuarioCreateSerializer(serializers.ModelSerializer):
@@ -207,6 +250,33 @@ class SolicitudDetailSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
+class TrabajoPDFSerializer(serializers.ModelSerializer):
+    """Estado de la generación en segundo plano del PDF de una solicitud"""
+    numero_solicitud = serializers.CharField(source='solicitud.numero_solicitud', read_only=True)
+    estado_display = serializers.CharField(source='get_estado_display', read_only=True)
+
+    class Meta:
+        model = TrabajoPDF
+        fields = [
+            'id', 'solicitud', 'numero_solicitud', 'estado', 'estado_display',
+            'intentos', 'error', 'creado_en', 'iniciado_en', 'terminado_en'
+        ]
+        read_only_fields = fields
+
+
+class ExportacionPDFSerializer(serializers.ModelSerializer):
+    """Estado de un PDF unido que genera render_worker"""
+    estado_display = serializers.CharField(source='get_estado_display', read_only=True)
+
+    class Meta:
+        model = ExportacionPDF
+        fields = [
+            'id', 'desde', 'hasta', 'area', 'total', 'estado', 'estado_display',
+            'intentos', 'error', 'creado_en', 'iniciado_en', 'terminado_en'
+        ]
+        read_only_fields = fields
+
+
 class SolicitudCreateSerializer(serializers.ModelSerializer):
     """Serializer para crear solicitud con validación de saldos y tipos"""
     class Meta:
@@ -228,6 +298,25 @@ class SolicitudCreateSerializer(serializers.ModelSerializer):
                 "fecha_termino": "La fecha de inicio debe ser anterior a la de término"
             })
         
+        # 2a. La cantidad declarada debe calzar con los días hábiles del rango
+        error_dias = validar_cantidad_dias(
+            tipo, data['fecha_inicio'], data['fecha_termino'], cantidad, data.get('es_medio_dia', False)
+        )
+        if error_dias:
+            raise serializers.ValidationError({"cantidad_dias": error_dias})
+
+        # 2b. No puede traslaparse con otra solicitud activa ni con una licencia aprobada
+        traslapes = buscar_traslapes(user, data['fecha_inicio'], data['fecha_termino'])
+        if traslapes:
+            detalle = ', '.join(
+                f"{'licencia' if t.origen == 'licencia' else 'solicitud'} {t.referencia} "
+                f"({t.inicio:%d/%m/%Y} - {t.fin:%d/%m/%Y})"
+                for t in traslapes
+            )
+            raise serializers.ValidationError({
+                "fecha_inicio": f"Las fechas se traslapan con: {detalle}"
+            })
+        
         # 3. Validar Nombre de otro permiso si corresponde
         if tipo == 'otro_permiso' and not data.get('nombre_otro_permiso'):
             raise serializers.ValidationError({
@@ -266,6 +355,13 @@ class SolicitudAprobacionSerializer(serializers.Serializer):
     aprobar = serializers.BooleanField(required=True)
     comentarios = serializers.CharField(required=False, allow_blank=True)
 
+
+class SolicitudResolucionMasivaSerializer(SolicitudAprobacionSerializer):
+    """Serializer para aprobar/rechazar varias solicitudes en una sola llamada"""
+    ids = serializers.ListField(
+        child=serializers.UUIDField(), allow_empty=False, max_length=500
+    )
+
 # ======================================================
 # LICENCIA MÉDICA SERIALIZER
 # ======================================================
@@ -311,22 +407,27 @@ class ActividadListSerializer(serializers.ModelSerializer):
     creado_por_nombre = serializers.CharField(source='creado_por.get_nombre_completo', read_only=True)
     total_inscritos = serializers.SerializerMethodField()
     tiene_cupos = serializers.SerializerMethodField()
+    imagen_srcset = serializers.SerializerMethodField()
     
     class Meta:
         model = Actividad
         fields = [
             'id', 'titulo', 'descripcion', 'tipo', 'tipo_display',
             'fecha_inicio', 'fecha_termino', 'ubicacion', 'color',
-            'imagen', 'cupo_maximo', 'total_inscritos', 'tiene_cupos',
+            'imagen', 'imagen_ancho', 'imagen_alto', 'imagen_srcset',
+            'cupo_maximo', 'total_inscritos', 'tiene_cupos',
             'activa', 'creado_por_nombre', 'creado_en'
         ]
         read_only_fields = ('id', 'creado_en')
     
     def get_total_inscritos(self, obj):
-        return obj.inscritos.count()
+        return obj.total_inscritos()
     
     def get_tiene_cupos(self, obj):
         return obj.tiene_cupos_disponibles()
+    
+    def get_imagen_srcset(self, obj):
+        return obj.get_srcset_imagen()
 
 
 class ActividadDetailSerializer(serializers.ModelSerializer):
@@ -337,6 +438,7 @@ class ActividadDetailSerializer(serializers.ModelSerializer):
     inscritos_list = InscripcionActividadSerializer(source='inscripcionactividad_set', many=True, read_only=True)
     total_inscritos = serializers.SerializerMethodField()
     tiene_cupos = serializers.SerializerMethodField()
+    imagen_srcset = serializers.SerializerMethodField()
     
     class Meta:
         model = Actividad
@@ -347,10 +449,13 @@ class ActividadDetailSerializer(serializers.ModelSerializer):
         return [area.nombre for area in obj.areas_participantes.all()]
     
     def get_total_inscritos(self, obj):
-        return obj.inscritos.count()
+        return obj.total_inscritos()
     
     def get_tiene_cupos(self, obj):
         return obj.tiene_cupos_disponibles()
+    
+    def get_imagen_srcset(self, obj):
+        return obj.get_srcset_imagen()
 
 
 # ======================================================
@@ -359,10 +464,15 @@ class ActividadDetailSerializer(serializers.ModelSerializer):
 
 class AdjuntoAnuncioSerializer(serializers.ModelSerializer):
     """Serializer para adjuntos de anuncio"""
+    preview_url = serializers.SerializerMethodField()
+    
     class Meta:
         model = AdjuntoAnuncio
         fields = '__all__'
         read_only_fields = ('id', 'subido_en')
+    
+    def get_preview_url(self, obj):
+        return obj.get_url_preview()
 
 
 class AnuncioListSerializer(serializers.ModelSerializer):
@@ -373,13 +483,15 @@ class AnuncioListSerializer(serializers.ModelSerializer):
     areas_destinatarias_nombres = serializers.SerializerMethodField()
     adjuntos = AdjuntoAnuncioSerializer(many=True, read_only=True)
     esta_vigente = serializers.SerializerMethodField()
+    imagen_srcset = serializers.SerializerMethodField()
     
     class Meta:
         model = Anuncio
         fields = [
             'id', 'titulo', 'contenido', 'tipo', 'tipo_display', 'es_destacado',
             'prioridad', 'fecha_publicacion', 'fecha_expiracion',
-            'imagen', 'activo', 'esta_vigente', 'creado_por_nombre',
+            'imagen', 'imagen_ancho', 'imagen_alto', 'imagen_srcset',
+            'activo', 'esta_vigente', 'creado_por_nombre',
             'creado_en', 'visibilidad_roles', 'visibilidad_roles_display',
             'para_todas_areas', 'areas_destinatarias_nombres', 'adjuntos'
         ]
@@ -390,6 +502,9 @@ class AnuncioListSerializer(serializers.ModelSerializer):
     
     def get_esta_vigente(self, obj):
         return obj.esta_vigente()
+    
+    def get_imagen_srcset(self, obj):
+        return obj.get_srcset_imagen()
 
 
 class AnuncioDetailSerializer(serializers.ModelSerializer):
@@ -400,6 +515,7 @@ class AnuncioDetailSerializer(serializers.ModelSerializer):
     areas_destinatarias_nombres = serializers.SerializerMethodField()
     adjuntos = AdjuntoAnuncioSerializer(many=True, read_only=True)
     esta_vigente = serializers.SerializerMethodField()
+    imagen_srcset = serializers.SerializerMethodField()
     
     class Meta:
         model = Anuncio
@@ -411,6 +527,9 @@ class AnuncioDetailSerializer(serializers.ModelSerializer):
     
     def get_esta_vigente(self, obj):
         return obj.esta_vigente()
+    
+    def get_imagen_srcset(self, obj):
+        return obj.get_srcset_imagen()
 
 
 
@@ -425,6 +544,10 @@ class DocumentoListSerializer(serializers.ModelSerializer):
     subido_por_nombre = serializers.CharField(source='subido_por.get_nombre_completo', read_only=True)
     esta_vigente = serializers.SerializerMethodField()
     url_descarga = serializers.SerializerMethodField()
+    preview_url = serializers.SerializerMethodField()
+    # Solo con ?search= en PostgreSQL (ver busqueda.BusquedaDocumentoFilter)
+    relevancia = serializers.FloatField(read_only=True, default=None)
+    fragmento = serializers.CharField(read_only=True, default=None)
     
     class Meta:
         model = Documento
@@ -434,7 +557,8 @@ class DocumentoListSerializer(serializers.ModelSerializer):
             'nombre_archivo', 'mime_type', 'storage_type',
             'version', 'fecha_vigencia', 'fecha_expiracion',
             'publico', 'descargas', 'visualizaciones', 'activo',
-            'esta_vigente', 'subido_por_nombre', 'subido_en', 'url_descarga'
+            'esta_vigente', 'subido_por_nombre', 'subido_en', 'url_descarga', 'preview_url',
+            'relevancia', 'fragmento'
         ]
         read_only_fields = (
             'id', 'codigo_documento', 'descargas', 'visualizaciones',
@@ -446,6 +570,9 @@ class DocumentoListSerializer(serializers.ModelSerializer):
     
     def get_url_descarga(self, obj):
         return obj.get_url_descarga()
+    
+    def get_preview_url(self, obj):
+        return obj.get_url_preview()
 
 
 class DocumentoDetailSerializer(serializers.ModelSerializer):
@@ -498,35 +625,75 @@ class DocumentoCreateSerializer(serializers.ModelSerializer):
     
     def create(self, validated_data):
         archivo = validated_data.pop('archivo')
-        areas_con_acceso = validated_data.pop('areas_con_acceso', [])
         
-        # Extraer información del archivo
-        nombre_archivo = archivo.name
+        # Guardar el contenido en el almacén de blobs (por trozos, deduplicado por hash)
+        archivo_hash, tamano = blobs.guardar(archivo)
+        return self._crear_documento(
+            validated_data, archivo.name, archivo.content_type, archivo_hash, tamano
+        )
+    
+    def _crear_documento(self, validated_data, nombre_archivo, mime_type, archivo_hash, tamano):
+        areas_con_acceso = validated_data.pop('areas_con_acceso', [])
         extension = nombre_archivo.split('.')[-1] if '.' in nombre_archivo else ''
-        tamano = archivo.size
-        mime_type = archivo.content_type or 'application/octet-stream'
+        mime_type = mime_type or 'application/octet-stream'
         
-        # Leer contenido del archivo
-        archivo_contenido = archivo.read()
-        
-        # Crear el documento
         documento = Documento.objects.create(
-            storage_type='database',
+            storage_type='filesystem',
             nombre_archivo=nombre_archivo,
             extension=extension,
             tamano=tamano,
             mime_type=mime_type,
-            archivo_contenido=archivo_contenido,
+            archivo_hash=archivo_hash,
             **validated_data
         )
+        # El texto para la búsqueda y la miniatura se generan en segundo plano, después de confirmar la subida
+        programar_indexado(documento.pk)
+        previsualizaciones.programar(archivo_hash, lambda: blobs.abrir(archivo_hash), nombre_archivo, mime_type)
         
         # Asignar areas_con_acceso después de crear el objeto
         if areas_con_acceso:
             documento.areas_con_acceso.set(areas_con_acceso)
         
+        # Con las áreas ya asignadas: el envío resuelve los destinatarios con ellas
+        EnvioNotificacion.encolar(documento)
         return documento
 
 
+class DocumentoFinalizarSerializer(DocumentoCreateSerializer):
+    """Datos del documento al finalizar una subida por trozos (el archivo ya está en la subida)"""
+    archivo = None
+    
+    class Meta(DocumentoCreateSerializer.Meta):
+        fields = [campo for campo in DocumentoCreateSerializer.Meta.fields if campo != 'archivo']
+    
+    def create(self, validated_data):
+        subida = self.context['subida']
+        archivo_hash, tamano = blobs.incorporar(subida.ruta_temporal())
+        return self._crear_documento(
+            validated_data, subida.nombre_archivo, subida.mime_type, archivo_hash, tamano
+        )
+
+
+class DocumentoDescargaLoteSerializer(serializers.Serializer):
+    """Documentos a incluir en un ZIP, en el orden indicado"""
+    ids = serializers.ListField(
+        child=serializers.UUIDField(), allow_empty=False, max_length=100
+    )
+
+
+class SubidaDocumentoSerializer(serializers.ModelSerializer):
+    """Inicio y estado de una subida por trozos"""
+    estado_display = serializers.CharField(source='get_estado_display', read_only=True)
+    
+    class Meta:
+        model = SubidaDocumento
+        fields = [
+            'id', 'nombre_archivo', 'mime_type', 'tamano_total', 'recibido',
+            'estado', 'estado_display', 'documento', 'creada_en', 'actualizada_en'
+        ]
+        read_only_fields = ('id', 'recibido', 'estado', 'documento', 'creada_en', 'actualizada_en')
+
+
 # ======================================================
 # NOTIFICACIÓN SERIALIZER
 # ======================================================
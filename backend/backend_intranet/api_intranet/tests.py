@@ -1,3 +1,2398 @@
-from django.test import TestCase
+# ======================================================
+# TESTS.PY - Pruebas de la API Intranet
+# Ubicación: api_intranet/tests.py
+# ======================================================
 
-# Create your tests here.
+import hashlib
+import posixpath
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+import zipfile
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO, StringIO
+from unittest import mock, skipUnless
+
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+from pypdf import PdfReader
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfgen import canvas
+from rest_framework.test import APIClient
+
+from .models import (
+    Usuario, Rol, Area, TipoContrato, Solicitud, ContadorSecuencia,
+    MovimientoSaldo, SaldoAnual, LicenciaMedica, Feriado, TrabajoPDF, ExportacionPDF,
+    CategoriaDocumento, Documento, SubidaDocumento, ContadorDocumentoHora,
+    Anuncio, AdjuntoAnuncio, Actividad, InscripcionActividad, Notificacion, EnvioNotificacion,
+    LogAuditoria
+)
+from . import blobs, busqueda, notificaciones, paginacion, previsualizaciones, segundo_plano
+from .conflictos import Intervalo, detectar_conflictos
+from .contadores import contadores, registrar_visualizacion
+from .descargas import parsear_rangos
+from .dias_habiles import contar_dias_habiles, es_dia_habil, invalidar_calendario
+from .pdf_generator import SolicitudPDFGenerator, generar_pdf_solicitud, plantilla_compartida
+from .benchmarks import CASOS, comparar, ejecutar
+from .cola_pdf import renderizar_solicitud
+
+
+# ======================================================
+# DATOS DE PRUEBA
+# ======================================================
+
+def crear_datos_base():
+    """Crea un área, los cuatro roles y un tipo de contrato"""
+    area = Area.objects.create(nombre='Área Pruebas', codigo='TEST')
+    roles = {
+        nivel: Rol.objects.create(nombre=nombre, nivel=nivel)
+        for nivel, nombre in Rol.NIVEL_CHOICES
+    }
+    contrato = TipoContrato.objects.create(nombre='Indefinido')
+    return area, roles, contrato
+
+
+def crear_usuario(area, rol, contrato, sufijo, **extra):
+    return Usuario.objects.create_user(
+        rut=f'{sufijo:08d}-0',
+        email=f'usuario{sufijo}@cesfam.cl',
+        password='clave-segura-123',
+        nombre=f'Usuario{sufijo}',
+        apellido_paterno='Prueba',
+        apellido_materno='Test',
+        cargo='Funcionario',
+        area=area,
+        rol=rol,
+        tipo_contrato=contrato,
+        fecha_ingreso=date(2020, 1, 1),
+        **extra
+    )
+
+
+def crear_solicitud(usuario, **extra):
+    datos = {
+        'tipo': 'vacaciones',
+        'fecha_inicio': date(2025, 2, 3),
+        'fecha_termino': date(2025, 2, 7),
+        'cantidad_dias': 5,
+        'motivo': 'Descanso',
+        'telefono_contacto': '+56900000000',
+    }
+    datos.update(extra)
+    return Solicitud.objects.create(usuario=usuario, **datos)
+
+
+# ======================================================
+# PRESUPUESTO DE CONSULTAS
+# ======================================================
+
+class PresupuestoConsultasTests(TestCase):
+    """
+    Cada endpoint declara cuántas consultas hace. Se mide con N y con 10×N filas:
+    si el número cambia, algún serializer consulta una vez por fila (N+1).
+    """
+    N = 2
+    PRESUPUESTOS = {
+        'tipos-contrato': 1,
+        'roles': 1,
+        'categorias-documento': 1,
+        'usuarios': 1,
+        'usuario': 1,
+        'usuarios-me': 0,
+        'usuario-dias_disponibles': 1,
+        # Tres consultas por cada una de las cuatro bolsas
+        'usuario-dias_disponibles-fecha': 13,
+        'usuario-movimientos_saldo': 2,
+        'areas': 1,
+        'area': 1,
+        'area-cobertura': 4,
+        'areas-cobertura': 4,
+        'solicitudes': 1,
+        'solicitud': 1,
+        'solicitudes-mis_solicitudes': 1,
+        'solicitudes-pendientes': 2,
+        'solicitudes-conflictos': 3,
+        # Con el calendario del año ya cargado en el proceso
+        'solicitudes-dias_habiles': 0,
+        # Solo la vista: los PDF se leen (o generan en el pool) mientras se envía la respuesta
+        'solicitudes-exportar_pdfs': 1,
+        'trabajos-pdf': 1,
+        'exportaciones-pdf': 1,
+        'licencias': 1,
+        'licencia': 1,
+        'actividades': 1,
+        'actividad': 4,
+        'anuncios': 3,
+        'anuncio': 3,
+        'anuncios-vigentes': 3,
+        'anuncios-feed': 3,
+        'documentos': 1,
+        'documento': 2,
+        'documento-estadisticas': 2,
+        # Solo la vista (los contadores quedan en el buffer): el contenido se lee mientras se envía el ZIP
+        'documentos-descargar_lote': 2,
+        'subida-documento': 1,
+        'notificaciones': 1,
+        'notificaciones-no_leidas': 1,
+        'notificaciones-marcar_todas_leidas': 1,
+        'logs': 1,
+    }
+
+    def setUp(self):
+        self.area, self.roles, self.contrato = crear_datos_base()
+        self.sufijo = 300
+        # Con rol, área y contrato ya cargados, como los deja la autenticación
+        self.director = Usuario.objects.select_related('rol', 'area', 'tipo_contrato').get(
+            pk=self.nuevo_usuario(nivel=4).pk
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.director)
+
+    def nuevo_usuario(self, nivel=1, area=None):
+        self.sufijo += 1
+        return crear_usuario(area or self.area, self.roles[nivel], self.contrato, self.sufijo)
+
+    def medir(self, metodo, url, datos=None):
+        """`datos` (o una función que los retorna, si dependen de lo sembrado) va como JSON"""
+        opciones = {}
+        if datos is not None:
+            opciones = {'data': datos() if callable(datos) else datos, 'format': 'json'}
+        with CaptureQueriesContext(connection) as consultas:
+            response = getattr(self.client, metodo)(url, **opciones)
+        self.assertLess(response.status_code, 400, url)
+        return len(consultas), [consulta['sql'] for consulta in consultas]
+
+    def comprobar(self, sembrar, endpoints):
+        """`sembrar(cantidad)` agrega filas; `endpoints` es {nombre: (método, url[, datos])}"""
+        sembrar(self.N)
+        con_n = {nombre: self.medir(*endpoint) for nombre, endpoint in endpoints.items()}
+        sembrar(9 * self.N)
+        con_10n = {nombre: self.medir(*endpoint) for nombre, endpoint in endpoints.items()}
+        for nombre in endpoints:
+            with self.subTest(endpoint=nombre):
+                presupuesto = self.PRESUPUESTOS[nombre]
+                for (total, sql), filas in ((con_n[nombre], self.N), (con_10n[nombre], 10 * self.N)):
+                    self.assertEqual(
+                        total, presupuesto, f'{nombre} con {filas} filas:\n' + '\n'.join(sql)
+                    )
+
+    def test_catalogos(self):
+        def sembrar(cantidad):
+            for _ in range(cantidad):
+                self.sufijo += 1
+                TipoContrato.objects.create(nombre=f'Contrato {self.sufijo}')
+                Rol.objects.create(nombre=f'Rol {self.sufijo}', nivel=1)
+                CategoriaDocumento.objects.create(nombre=f'Categoría {self.sufijo}')
+        self.comprobar(sembrar, {
+            'tipos-contrato': ('get', '/api/tipos-contrato/'),
+            'roles': ('get', '/api/roles/'),
+            'categorias-documento': ('get', '/api/categorias-documento/'),
+        })
+
+    def test_usuarios_y_areas(self):
+        def sembrar(cantidad):
+            for _ in range(cantidad):
+                area = Area.objects.create(nombre=f'Área {self.sufijo}', codigo=f'A{self.sufijo}')
+                area.jefe = self.nuevo_usuario(nivel=2, area=area)
+                area.save()
+                self.nuevo_usuario(area=self.area)
+                solicitud = crear_solicitud(self.director, fecha_inicio=date(2025, 1, 6), fecha_termino=date(2025, 1, 6))
+                MovimientoSaldo.objects.create(
+                    usuario=self.director, bolsa='vacaciones', delta=-1, saldo_resultante=14, solicitud=solicitud
+                )
+        usuario = f'/api/usuarios/{self.director.pk}'
+        self.comprobar(sembrar, {
+            'usuarios': ('get', '/api/usuarios/'),
+            'usuario': ('get', f'{usuario}/'),
+            'usuarios-me': ('get', '/api/usuarios/me/'),
+            'usuario-dias_disponibles': ('get', f'{usuario}/dias_disponibles/'),
+            'usuario-dias_disponibles-fecha': ('get', f'{usuario}/dias_disponibles/?fecha=2025-06-30'),
+            'usuario-movimientos_saldo': ('get', f'{usuario}/movimientos_saldo/'),
+            'areas': ('get', '/api/areas/'),
+            'area': ('get', f'/api/areas/{self.area.pk}/'),
+        })
+
+    def test_solicitudes_y_licencias(self):
+        jefe = self.nuevo_usuario(nivel=2)
+        funcionario = self.nuevo_usuario()
+        primera = crear_solicitud(funcionario)
+
+        def sembrar(cantidad):
+            for i in range(cantidad):
+                usuario = self.nuevo_usuario()
+                solicitud = crear_solicitud(usuario)
+                Solicitud.objects.filter(pk=solicitud.pk).update(
+                    estado='pendiente_direccion', jefatura_aprobador=jefe
+                )
+                TrabajoPDF.objects.create(solicitud=solicitud)
+                ExportacionPDF.objects.create(
+                    usuario=self.director, desde=date(2025, 2, 1), hasta=date(2025, 2, 28), area=self.area
+                ).solicitudes.add(solicitud)
+                crear_solicitud(self.director, motivo='Propia')
+                # Aprobada y traslapada con la pendiente: ausencia, conflicto y exportación
+                aprobada = crear_solicitud(
+                    usuario, fecha_inicio=date(2025, 2, 6), fecha_termino=date(2025, 2, 10), cantidad_dias=3
+                )
+                Solicitud.objects.filter(pk=aprobada.pk).update(
+                    estado='aprobada', fecha_aprobacion_direccion=timezone.now()
+                )
+                LicenciaMedica.objects.create(
+                    numero_licencia=f'LM-{self.sufijo}', usuario=usuario, revisada_por=self.director,
+                    fecha_inicio=date(2025, 3, 3), fecha_termino=date(2025, 3, 7),
+                    documento_licencia='licencias/test.pdf',
+                )
+        licencia = LicenciaMedica.objects.create(
+            numero_licencia='LM-0001', usuario=funcionario,
+            fecha_inicio=date(2025, 3, 3), fecha_termino=date(2025, 3, 7),
+            documento_licencia='licencias/test.pdf',
+        )
+        rango = 'desde=2025-02-01&hasta=2025-03-31'
+        contar_dias_habiles(date(2025, 2, 1), date(2025, 2, 1))
+        self.comprobar(sembrar, {
+            'solicitudes': ('get', '/api/solicitudes/'),
+            'solicitud': ('get', f'/api/solicitudes/{primera.pk}/'),
+            'solicitudes-mis_solicitudes': ('get', '/api/solicitudes/mis_solicitudes/'),
+            'solicitudes-pendientes': ('get', '/api/solicitudes/pendientes/'),
+            'solicitudes-conflictos': ('get', f'/api/solicitudes/conflictos/?{rango}'),
+            'solicitudes-dias_habiles': ('get', f'/api/solicitudes/dias_habiles/?{rango}'),
+            'solicitudes-exportar_pdfs': ('get', '/api/solicitudes/exportar_pdfs/'),
+            'area-cobertura': ('get', f'/api/areas/{self.area.pk}/cobertura/?{rango}'),
+            'areas-cobertura': ('get', f'/api/areas/cobertura/?{rango}'),
+            'trabajos-pdf': ('get', '/api/trabajos-pdf/'),
+            'exportaciones-pdf': ('get', '/api/exportaciones-pdf/'),
+            'licencias': ('get', '/api/licencias/'),
+            'licencia': ('get', f'/api/licencias/{licencia.pk}/'),
+        })
+
+    def test_actividades(self):
+        ahora = timezone.now()
+        actividad = Actividad.objects.create(
+            titulo='Pausa activa', descripcion='-', fecha_inicio=ahora, fecha_termino=ahora + timedelta(hours=1),
+            cupo_maximo=500, creado_por=self.director,
+        )
+
+        def sembrar(cantidad):
+            for _ in range(cantidad):
+                otra = Actividad.objects.create(
+                    titulo='Taller', descripcion='-', fecha_inicio=ahora, fecha_termino=ahora,
+                    cupo_maximo=10, creado_por=self.nuevo_usuario(),
+                )
+                usuario = self.nuevo_usuario()
+                InscripcionActividad.objects.create(actividad=actividad, usuario=usuario)
+                InscripcionActividad.objects.create(actividad=otra, usuario=usuario)
+                area = Area.objects.create(nombre=f'Área {self.sufijo}', codigo=f'A{self.sufijo}')
+                actividad.areas_participantes.add(area)
+        self.comprobar(sembrar, {
+            'actividades': ('get', '/api/actividades/'),
+            'actividad': ('get', f'/api/actividades/{actividad.pk}/'),
+        })
+
+    def test_anuncios(self):
+        anuncio = Anuncio.objects.create(titulo='Bienvenida', contenido='-', creado_por=self.director)
+
+        def sembrar(cantidad):
+            for _ in range(cantidad):
+                otro = Anuncio.objects.create(
+                    titulo='Aviso', contenido='-', para_todas_areas=False, creado_por=self.nuevo_usuario()
+                )
+                area = Area.objects.create(nombre=f'Área {self.sufijo}', codigo=f'A{self.sufijo}')
+                for destino in (anuncio, otro):
+                    destino.areas_destinatarias.add(area)
+                    AdjuntoAnuncio.objects.create(
+                        anuncio=destino, nombre_archivo='aviso.pdf', archivo='anuncios/adjuntos/aviso.pdf',
+                        tipo_archivo='application/pdf', tamano=10,
+                    )
+        self.comprobar(sembrar, {
+            'anuncios': ('get', '/api/anuncios/'),
+            'anuncio': ('get', f'/api/anuncios/{anuncio.pk}/'),
+            'anuncios-vigentes': ('get', '/api/anuncios/vigentes/'),
+            'anuncios-feed': ('get', '/api/anuncios/feed/?limite=50'),
+        })
+
+    @override_settings(DOCUMENTOS_CONTADORES_INTERVALO=3600)
+    def test_documentos(self):
+        contadores.vaciar()
+        self.addCleanup(contadores.vaciar)
+        categoria = CategoriaDocumento.objects.create(nombre='Protocolos')
+
+        def crear_documento(usuario):
+            return Documento.objects.create(
+                titulo='Protocolo', descripcion='-', tipo='protocolo', categoria=categoria,
+                storage_type='s3', archivo_url='https://example.com/p.pdf', nombre_archivo='p.pdf',
+                extension='pdf', tamano=10, fecha_vigencia=date(2025, 1, 1), subido_por=usuario,
+            )
+        documento = crear_documento(self.director)
+        subida = SubidaDocumento.objects.create(usuario=self.director, nombre_archivo='p.pdf', tamano_total=10)
+        en_base = []
+
+        def sembrar(cantidad):
+            for i in range(cantidad):
+                crear_documento(self.nuevo_usuario())
+                area = Area.objects.create(nombre=f'Área {self.sufijo}', codigo=f'A{self.sufijo}')
+                documento.areas_con_acceso.add(area)
+                ContadorDocumentoHora.objects.create(
+                    documento=documento, hora=timezone.now() - timedelta(hours=len(en_base) + i), descargas=1
+                )
+            for _ in range(cantidad):
+                en_base.append(Documento.objects.create(
+                    titulo='Formulario', descripcion='-', tipo='formulario', categoria=categoria,
+                    storage_type='database', archivo_contenido=b'%PDF-1.4', nombre_archivo='f.pdf',
+                    extension='pdf', tamano=8, fecha_vigencia=date(2025, 1, 1), subido_por=self.director,
+                ).pk)
+        self.comprobar(sembrar, {
+            'documentos': ('get', '/api/documentos/'),
+            'documento': ('get', f'/api/documentos/{documento.pk}/'),
+            'documento-estadisticas': ('get', f'/api/documentos/{documento.pk}/estadisticas/?agrupar=dia'),
+            'documentos-descargar_lote': (
+                'post', '/api/documentos/descargar_lote/', lambda: {'ids': [str(pk) for pk in en_base]}
+            ),
+            'subida-documento': ('get', f'/api/subidas-documentos/{subida.pk}/'),
+        })
+
+    def test_notificaciones_y_logs(self):
+        def sembrar(cantidad):
+            for _ in range(cantidad):
+                Notificacion.objects.create(usuario=self.director, tipo='sistema', titulo='Aviso', mensaje='-')
+                LogAuditoria.objects.create(
+                    usuario=self.nuevo_usuario(), accion='crear', modelo='Solicitud', objeto_id='1', descripcion='-'
+                )
+        self.comprobar(sembrar, {
+            'notificaciones': ('get', '/api/notificaciones/'),
+            'notificaciones-no_leidas': ('get', '/api/notificaciones/no_leidas/'),
+            'notificaciones-marcar_todas_leidas': ('post', '/api/notificaciones/marcar_todas_leidas/'),
+            'logs': ('get', '/api/logs/'),
+        })
+
+
+# ======================================================
+# CORRELATIVOS
+# ======================================================
+
+class ContadorSecuenciaTests(TestCase):
+
+    def setUp(self):
+        self.area, self.roles, self.contrato = crear_datos_base()
+        self.usuario = crear_usuario(self.area, self.roles[1], self.contrato, 10)
+
+    def test_numeros_consecutivos_por_anio(self):
+        year = timezone.now().year
+        primera = crear_solicitud(self.usuario)
+        segunda = crear_solicitud(self.usuario)
+        self.assertEqual(primera.numero_solicitud, f'SOL-{year}-0001')
+        self.assertEqual(segunda.numero_solicitud, f'SOL-{year}-0002')
+        self.assertEqual(ContadorSecuencia.siguiente('DOC', year), 1)
+
+    def test_sincronizar_contadores_desde_filas_existentes(self):
+        year = timezone.now().year
+        crear_solicitud(self.usuario)
+        Solicitud.objects.update(numero_solicitud=f'SOL-{year}-0041')
+        ContadorSecuencia.objects.all().delete()
+
+        call_command('sincronizar_contadores', stdout=StringIO())
+
+        self.assertEqual(crear_solicitud(self.usuario).numero_solicitud, f'SOL-{year}-0042')
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Requiere bloqueos de fila reales (PostgreSQL)')
+class ContadorSecuenciaConcurrenciaTests(TransactionTestCase):
+    HILOS = 8
+    POR_HILO = 250
+
+    def test_solicitudes_concurrentes_no_repiten_numero(self):
+        area, roles, contrato = crear_datos_base()
+        usuarios = [
+            crear_usuario(area, roles[1], contrato, 20 + i) for i in range(self.HILOS)
+        ]
+        errores = []
+
+        def trabajador(usuario):
+            try:
+                for _ in range(self.POR_HILO):
+                    crear_solicitud(usuario)
+            except Exception as exc:  # pragma: no cover - se reporta abajo
+                errores.append(exc)
+            finally:
+                connection.close()
+
+        hilos = [threading.Thread(target=trabajador, args=(u,)) for u in usuarios]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+
+        self.assertEqual(errores, [])
+        total = self.HILOS * self.POR_HILO
+        year = timezone.now().year
+        numeros = set(Solicitud.objects.values_list('numero_solicitud', flat=True))
+        self.assertEqual(numeros, {f'SOL-{year}-{n:04d}' for n in range(1, total + 1)})
+
+
+# ======================================================
+# LIBRO DE SALDOS
+# ======================================================
+
+class MovimientoSaldoTests(TestCase):
+
+    def setUp(self):
+        self.area, self.roles, self.contrato = crear_datos_base()
+        self.funcionario = crear_usuario(self.area, self.roles[1], self.contrato, 30)
+        self.director = crear_usuario(self.area, self.roles[4], self.contrato, 31)
+
+    def test_aprobacion_registra_movimiento_y_descuenta(self):
+        solicitud = crear_solicitud(self.funcionario, cantidad_dias=5)
+        solicitud.aprobar(self.director)
+
+        self.funcionario.refresh_from_db()
+        self.assertEqual(self.funcionario.dias_vacaciones_disponibles, 10)
+        movimiento = MovimientoSaldo.objects.get(usuario=self.funcionario)
+        self.assertEqual(movimiento.bolsa, 'vacaciones')
+        self.assertEqual(movimiento.delta, Decimal('-5'))
+        self.assertEqual(movimiento.saldo_resultante, Decimal('10'))
+        self.assertEqual(movimiento.solicitud, solicitud)
+
+    def test_instancias_desactualizadas_no_pierden_cambios(self):
+        copia_a = Usuario.objects.get(pk=self.funcionario.pk)
+        copia_b = Usuario.objects.get(pk=self.funcionario.pk)
+
+        copia_a.actualizar_dias_disponibles('dia_administrativo', Decimal('0.5'))
+        copia_b.actualizar_dias_disponibles('dia_administrativo', 2)
+
+        self.funcionario.refresh_from_db()
+        self.assertEqual(self.funcionario.dias_administrativos_disponibles, Decimal('3.5'))
+        self.assertEqual(
+            list(MovimientoSaldo.objects.order_by('creado_en').values_list('saldo_resultante', flat=True)),
+            [Decimal('5.5'), Decimal('3.5')]
+        )
+
+    def test_ajuste_manual_queda_en_el_libro(self):
+        self.funcionario.ajustar_saldos({'dias_vacaciones_disponibles': 20})
+        self.funcionario.refresh_from_db()
+        self.assertEqual(self.funcionario.dias_vacaciones_disponibles, 20)
+        self.assertEqual(MovimientoSaldo.objects.get().delta, Decimal('5'))
+
+    def test_saldo_al_con_y_sin_foto_anual(self):
+        hoy = timezone.now()
+        ayer = (hoy - timedelta(days=1)).date()
+        anio = hoy.year
+
+        self.funcionario.actualizar_dias_disponibles('vacaciones', 3)
+        MovimientoSaldo.objects.update(creado_en=hoy - timedelta(days=1))
+        self.funcionario.actualizar_dias_disponibles('vacaciones', 2)
+
+        # Sin foto: se retrocede desde el saldo actual (15 - 3 - 2 = 10)
+        self.assertEqual(self.funcionario.saldo_al('vacaciones', ayer), Decimal('12'))
+        self.assertEqual(self.funcionario.saldo_al('vacaciones', hoy.date()), Decimal('10'))
+
+        call_command('cerrar_saldos_anuales', anio=anio, stdout=StringIO())
+        foto = SaldoAnual.objects.get(usuario=self.funcionario, bolsa='vacaciones', anio=anio)
+        inicio = timezone.make_aware(datetime(anio, 1, 1))
+        if ayer >= inicio.date():
+            self.assertEqual(foto.saldo_inicial, Decimal('15'))
+            self.assertEqual(self.funcionario.saldo_al('vacaciones', ayer), Decimal('12'))
+        self.assertEqual(self.funcionario.saldo_al('vacaciones', hoy.date()), Decimal('10'))
+
+    def test_saldo_a_una_fecha_por_la_api(self):
+        client = APIClient()
+        client.force_authenticate(self.director)
+        url = f'/api/usuarios/{self.funcionario.pk}/dias_disponibles/'
+        self.assertEqual(client.get(url, {'fecha': '2025-06-01'}).status_code, 200)
+        for fecha in ('2025-13-01', '2025-02-30', 'ayer'):
+            with self.subTest(fecha=fecha):
+                response = client.get(url, {'fecha': fecha})
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', response.data)
+
+    def test_movimientos_son_inmutables(self):
+        movimiento = self.funcionario.actualizar_dias_disponibles('vacaciones', 1)
+        with self.assertRaises(Exception):
+            movimiento.save()
+
+
+# ======================================================
+# RESOLUCIÓN MASIVA DE SOLICITUDES
+# ======================================================
+
+class SolicitudBulkResolverTests(TestCase):
+    URL = '/api/solicitudes/bulk_resolver/'
+
+    def setUp(self):
+        self.area, self.roles, self.contrato = crear_datos_base()
+        self.director = crear_usuario(self.area, self.roles[4], self.contrato, 40)
+        self.client = APIClient()
+        self.client.force_authenticate(self.director)
+        self.siguiente = 41
+
+    def crear_pendientes(self, cantidad):
+        solicitudes = []
+        for _ in range(cantidad):
+            usuario = crear_usuario(self.area, self.roles[1], self.contrato, self.siguiente)
+            self.siguiente += 1
+            solicitudes.append(crear_solicitud(usuario, cantidad_dias=2))
+        return solicitudes
+
+    def test_aprueba_en_lote_y_descuenta_saldos(self):
+        solicitudes = self.crear_pendientes(3)
+        ids = [str(s.id) for s in solicitudes]
+
+        response = self.client.post(self.URL, {'ids': ids, 'aprobar': True, 'comentarios': 'OK'}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['procesadas'], 3)
+        for solicitud in solicitudes:
+            solicitud.refresh_from_db()
+            self.assertEqual(solicitud.estado, 'aprobada')
+            self.assertEqual(solicitud.direccion_aprobador, self.director)
+            self.assertEqual(solicitud.usuario.dias_vacaciones_disponibles, 13)
+        self.assertEqual(MovimientoSaldo.objects.filter(solicitud__in=solicitudes).count(), 3)
+
+    def test_resultados_por_item(self):
+        pendiente, resuelta = self.crear_pendientes(2)
+        Solicitud.objects.filter(pk=resuelta.pk).update(estado='rechazada')
+        propia = crear_solicitud(self.director)
+        inexistente = '00000000-0000-0000-0000-000000000000'
+
+        response = self.client.post(self.URL, {
+            'ids': [str(pendiente.id), str(resuelta.id), str(propia.id), inexistente],
+            'aprobar': False,
+            'comentarios': 'Sin cupo',
+        }, format='json')
+
+        resultados = {str(item['id']): item for item in response.data['resultados']}
+        self.assertTrue(resultados[str(pendiente.id)]['ok'])
+        self.assertEqual(resultados[str(pendiente.id)]['estado'], 'rechazada')
+        self.assertFalse(resultados[str(resuelta.id)]['ok'])
+        self.assertFalse(resultados[str(propia.id)]['ok'])
+        self.assertFalse(resultados[inexistente]['ok'])
+        self.assertEqual(response.data['procesadas'], 1)
+
+    def test_cantidad_de_consultas_no_depende_del_lote(self):
+        def consultas_para(cantidad):
+            ids = [str(s.id) for s in self.crear_pendientes(cantidad)]
+            with CaptureQueriesContext(connection) as ctx:
+                self.client.post(self.URL, {'ids': ids, 'aprobar': True}, format='json')
+            return len(ctx.captured_queries)
+
+        self.assertEqual(consultas_para(2), consultas_para(8))
+
+    def test_funcionario_no_puede_resolver(self):
+        funcionario = crear_usuario(self.area, self.roles[1], self.contrato, 99)
+        self.client.force_authenticate(funcionario)
+        response = self.client.post(self.URL, {'ids': [], 'aprobar': True}, format='json')
+        self.assertEqual(response.status_code, 403)
+
+
+# ======================================================
+# BANDEJA DE PENDIENTES
+# ======================================================
+
+class SolicitudPendientesTests(TestCase):
+    URL = '/api/solicitudes/pendientes/'
+
+    def setUp(self):
+        self.area, self.roles, self.contrato = crear_datos_base()
+        self.otra_area = Area.objects.create(nombre='Otra Área', codigo='OTRA')
+        self.jefe = crear_usuario(self.area, self.roles[2], self.contrato, 50)
+        self.subdirector = crear_usuario(self.area, self.roles[3], self.contrato, 51)
+        self.funcionario = crear_usuario(self.area, self.roles[1], self.contrato, 52)
+        self.externo = crear_usuario(self.otra_area, self.roles[1], self.contrato, 53)
+        self.client = APIClient()
+
+    def test_estado_inicial_segun_nivel(self):
+        self.assertEqual(crear_solicitud(self.funcionario).estado, 'pendiente_jefatura')
+        self.assertEqual(crear_solicitud(self.jefe).estado, 'pendiente_direccion')
+
+    def test_jefatura_ve_solo_pendientes_de_su_area(self):
+        propia_area = crear_solicitud(self.funcionario)
+        crear_solicitud(self.externo)
+        crear_solicitud(self.jefe)
+
+        self.client.force_authenticate(self.jefe)
+        with self.assertNumQueries(2):
+            response = self.client.get(self.URL)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([r['id'] for r in response.data['resultados']], [str(propia_area.id)])
+        self.assertEqual(response.data['conteos'], {'pendiente_jefatura': 1, 'pendiente_direccion': 0})
+
+    def test_jefatura_ve_al_funcionario_trasladado_a_su_area(self):
+        # Mismo alcance que la resolución: el área actual del funcionario, no la de la solicitud
+        trasladada = crear_solicitud(self.externo)
+        Usuario.objects.filter(pk=self.externo.pk).update(area=self.area)
+        crear_solicitud(self.funcionario)
+        Usuario.objects.filter(pk=self.funcionario.pk).update(area=self.otra_area)
+
+        self.client.force_authenticate(self.jefe)
+        response = self.client.get(self.URL)
+
+        self.assertEqual([r['id'] for r in response.data['resultados']], [str(trasladada.id)])
+        self.assertEqual(response.data['conteos']['pendiente_jefatura'], 1)
+
+    def test_direccion_ve_pendiente_direccion_excepto_propias(self):
+        de_jefatura = crear_solicitud(self.jefe)
+        crear_solicitud(self.subdirector)
+        crear_solicitud(self.funcionario)
+
+        self.client.force_authenticate(self.subdirector)
+        response = self.client.get(self.URL)
+
+        self.assertEqual([r['id'] for r in response.data['resultados']], [str(de_jefatura.id)])
+        self.assertEqual(response.data['conteos'], {'pendiente_jefatura': 1, 'pendiente_direccion': 1})
+
+    def test_funcionario_no_tiene_bandeja(self):
+        self.client.force_authenticate(self.funcionario)
+        self.assertEqual(self.client.get(self.URL).status_code, 403)
+
+
+# ======================================================
+# TRASLAPES Y CONFLICTOS
+# ======================================================
+
+class ConflictosTests(TestCase):
+
+    def setUp(self):
+        self.area, self.roles, self.contrato = crear_datos_base()
+        self.funcionario = crear_usuario(self.area, self.roles[1], self.contrato, 60)
+        self.director = crear_usuario(self.area, self.roles[4], self.contrato, 61)
+        self.client = APIClient()
+        self.client.force_authenticate(self.funcionario)
+
+    def crear_licencia(self, inicio, termino, estado='aprobada'):
+        return LicenciaMedica.objects.create(
+            numero_licencia=f'LM-{inicio:%m%d}', usuario=self.funcionario,
+            fecha_inicio=inicio, fecha_termino=termino,
+            documento_licencia='licencias/test.pdf', estado=estado,
+        )
+
+    def post_solicitud(self, inicio, termino):
+        return self.client.post('/api/solicitudes/', {
+            'tipo': 'vacaciones', 'fecha_inicio': inicio, 'fecha_termino': termino,
+            'cantidad_dias': 1, 'motivo': 'Descanso', 'telefono_contacto': '+56900000000',
+        }, format='json')
+
+    def test_rechaza_traslape_con_solicitud_activa(self):
+        crear_solicitud(self.funcionario, fecha_inicio=date(2025, 2, 3), fecha_termino=date(2025, 2, 7))
+        response = self.post_solicitud('2025-02-07', '2025-02-07')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('fecha_inicio', response.data)
+
+    def test_ignora_solicitudes_anuladas(self):
+        anulada = crear_solicitud(self.funcionario)
+        Solicitud.objects.filter(pk=anulada.pk).update(estado='anulada_usuario')
+        self.assertEqual(self.post_solicitud('2025-02-04', '2025-02-04').status_code, 201)
+
+    def test_rechaza_traslape_con_licencia_aprobada(self):
+        self.crear_licencia(date(2025, 3, 10), date(2025, 3, 20))
+        self.crear_licencia(date(2025, 4, 10), date(2025, 4, 20), estado='rechazada')
+        self.assertEqual(self.post_solicitud('2025-03-20', '2025-03-20').status_code, 400)
+        self.assertEqual(self.post_solicitud('2025-04-14', '2025-04-14').status_code, 201)
+
+    def test_barrido_detecta_todos_los_pares(self):
+        def iv(usuario, inicio, fin, ref):
+            return Intervalo(usuario, date(2025, 1, inicio), date(2025, 1, fin), 'solicitud', ref, ref)
+
+        pares = detectar_conflictos([
+            iv(1, 1, 10, 'A'), iv(1, 5, 6, 'B'), iv(1, 8, 12, 'C'), iv(1, 13, 14, 'D'),
+            iv(2, 1, 3, 'E'), iv(2, 3, 4, 'F'),
+        ])
+        self.assertEqual(
+            sorted((a.referencia, b.referencia) for a, b in pares),
+            [('A', 'B'), ('A', 'C'), ('E', 'F')]
+        )
+
+    def test_reporte_de_conflictos(self):
+        solicitud = crear_solicitud(self.funcionario, fecha_inicio=date(2025, 3, 1), fecha_termino=date(2025, 3, 12))
+        licencia = self.crear_licencia(date(2025, 3, 10), date(2025, 3, 20))
+
+        self.client.force_authenticate(self.director)
+        response = self.client.get('/api/solicitudes/conflictos/', {'desde': '2025-01-01', 'hasta': '2025-12-31'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['total'], 1)
+        conflicto = response.data['conflictos'][0]
+        self.assertEqual({conflicto['a']['id'], conflicto['b']['id']}, {solicitud.id, licencia.id})
+        self.assertEqual(conflicto['traslape_desde'], date(2025, 3, 10))
+        self.assertEqual(conflicto['traslape_hasta'], date(2025, 3, 12))
+
+    def test_parametros_invalidos_del_reporte(self):
+        self.client.force_authenticate(self.director)
+        for params in ({'desde': '2025-02-30'}, {'hasta': 'mañana'}, {'area': 'no-es-uuid'}):
+            with self.subTest(**params):
+                response = self.client.get('/api/solicitudes/conflictos/', params)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', response.data)
+        response = self.client.get('/api/solicitudes/conflictos/', {'area': str(self.funcionario.area_id)})
+        self.assertEqual(response.status_code, 200)
+
+
+# ======================================================
+# DÍAS HÁBILES
+# ======================================================
+
+class DiasHabilesTests(TestCase):
+
+    def setUp(self):
+        invalidar_calendario()
+        self.addCleanup(invalidar_calendario)
+
+    def test_excluye_fines_de_semana_y_feriados(self):
+        # Lunes 15 a domingo 28 de septiembre de 2025: 10 días de semana
+        self.assertEqual(contar_dias_habiles(date(2025, 9, 15), date(2025, 9, 28)), 10)
+
+        Feriado.objects.create(fecha=date(2025, 9, 18), nombre='Independencia Nacional')
+        Feriado.objects.create(fecha=date(2025, 9, 19), nombre='Glorias del Ejército')
+
+        # Guardar un feriado invalida el calendario del año en este proceso
+        self.assertFalse(es_dia_habil(date(2025, 9, 18)))
+        self.assertEqual(contar_dias_habiles(date(2025, 9, 15), date(2025, 9, 28)), 8)
+
+    def test_rangos_que_cruzan_el_año(self):
+        Feriado.objects.create(fecha=date(2026, 1, 1), nombre='Año Nuevo')
+        # Lunes 29/12/2025 a viernes 02/01/2026, sin el 1 de enero
+        self.assertEqual(contar_dias_habiles(date(2025, 12, 29), date(2026, 1, 2)), 4)
+        self.assertEqual(contar_dias_habiles(date(2026, 1, 2), date(2025, 12, 29)), 0)
+
+    def test_coincide_con_conteo_dia_a_dia(self):
+        call_command('cargar_feriados', anio=2025, stdout=StringIO())
+        feriados = set(Feriado.objects.values_list('fecha', flat=True))
+        inicio = date(2025, 1, 1)
+        for desplazamiento in range(0, 365, 7):
+            desde = inicio + timedelta(days=desplazamiento)
+            hasta = desde + timedelta(days=40)
+            esperado = sum(
+                1 for i in range((hasta - desde).days + 1)
+                if (desde + timedelta(days=i)).weekday() < 5 and desde + timedelta(days=i) not in feriados
+            )
+            self.assertEqual(contar_dias_habiles(desde, hasta), esperado)
+
+    def test_cargar_feriados_es_idempotente(self):
+        call_command('cargar_feriados', anio=2025, stdout=StringIO())
+        call_command('cargar_feriados', anio=2025, stdout=StringIO())
+        self.assertEqual(Feriado.objects.filter(fecha__year=2025).count(), 16)
+        self.assertTrue(Feriado.objects.filter(fecha=date(2025, 6, 20)).exists())
+
+    def test_serializer_valida_cantidad_dias(self):
+        area, roles, contrato = crear_datos_base()
+        client = APIClient()
+        client.force_authenticate(crear_usuario(area, roles[1], contrato, 70))
+        Feriado.objects.create(fecha=date(2025, 5, 21), nombre='Glorias Navales')
+
+        def post(cantidad):
+            return client.post('/api/solicitudes/', {
+                'tipo': 'vacaciones', 'fecha_inicio': '2025-05-19', 'fecha_termino': '2025-05-23',
+                'cantidad_dias': cantidad, 'motivo': 'Descanso', 'telefono_contacto': '+56900000000',
+            }, format='json')
+
+        response = post(5)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('cantidad_dias', response.data)
+
+        # El formulario pide el conteo con feriados al servidor antes de enviar
+        response = client.get('/api/solicitudes/dias_habiles/', {'desde': '2025-05-19', 'hasta': '2025-05-23'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['dias_habiles'], 4)
+        self.assertEqual(post(response.data['dias_habiles']).status_code, 201)
+
+        for params in ({'desde': '2025-05-19'}, {'desde': '2025-05-23', 'hasta': '2025-05-19'},
+                       {'desde': '2025-01-01', 'hasta': '2026-06-01'}, {'desde': '2025-02-30', 'hasta': '2025-03-01'}):
+            with self.subTest(**params):
+                self.assertEqual(client.get('/api/solicitudes/dias_habiles/', params).status_code, 400)
+
+
+# ======================================================
+# COBERTURA POR ÁREA
+# ======================================================
+
+class CoberturaAreaTests(TestCase):
+
+    def setUp(self):
+        self.area, self.roles, self.contrato = crear_datos_base()
+        self.otra_area = Area.objects.create(nombre='Área Dental', codigo='DENT')
+        self.ana = crear_usuario(self.area, self.roles[1], self.contrato, 80)
+        self.beto = crear_usuario(self.area, self.roles[1], self.contrato, 81)
+        self.dental = crear_usuario(self.otra_area, self.roles[1], self.contrato, 82)
+        self.jefe = crear_usuario(self.area, self.roles[2], self.contrato, 83)
+        self.director = crear_usuario(self.area, self.roles[4], self.contrato, 84)
+        self.client = APIClient()
+
+    def aprobada(self, usuario, inicio, termino):
+        solicitud = crear_solicitud(usuario, fecha_inicio=inicio, fecha_termino=termino)
+        Solicitud.objects.filter(pk=solicitud.pk).update(estado='aprobada')
+        return solicitud
+
+    def test_cuenta_ausentes_por_dia_sin_duplicar_personas(self):
+        self.aprobada(self.ana, date(2025, 3, 3), date(2025, 3, 5))
+        # Licencia de Ana que se cruza con su solicitud: cuenta una sola vez
+        LicenciaMedica.objects.create(
+            numero_licencia='LM-1', usuario=self.ana, fecha_inicio=date(2025, 3, 4),
+            fecha_termino=date(2025, 3, 6), documento_licencia='licencias/test.pdf', estado='aprobada',
+        )
+        self.aprobada(self.beto, date(2025, 2, 20), date(2025, 3, 3))
+        # Pendiente: no cuenta
+        crear_solicitud(self.beto, fecha_inicio=date(2025, 3, 6), fecha_termino=date(2025, 3, 7))
+
+        self.client.force_authenticate(self.jefe)
+        response = self.client.get(f'/api/areas/{self.area.pk}/cobertura/', {'desde': '2025-03-01', 'hasta': '2025-03-08'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['dias'], 8)
+        self.assertEqual(response.data['dotacion'], 4)
+        self.assertEqual(response.data['ausentes'], [1, 1, 2, 1, 1, 1, 0, 0])
+
+    def test_todas_las_areas_en_dos_consultas_de_rango(self):
+        self.aprobada(self.ana, date(2025, 3, 3), date(2025, 3, 4))
+        self.aprobada(self.dental, date(2025, 3, 4), date(2025, 3, 5))
+
+        self.client.force_authenticate(self.director)
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get('/api/areas/cobertura/', {'desde': '2025-03-03', 'hasta': '2025-03-05'})
+
+        self.assertEqual(response.status_code, 200)
+        por_area = {fila['area']: fila['ausentes'] for fila in response.data['areas']}
+        self.assertEqual(por_area, {self.area.pk: [1, 1, 0], self.otra_area.pk: [0, 1, 1]})
+        ausencias = [q for q in consultas.captured_queries if 'fecha_termino' in q['sql']]
+        self.assertEqual(len(ausencias), 2)
+
+    def test_permisos(self):
+        self.client.force_authenticate(self.ana)
+        self.assertEqual(self.client.get(f'/api/areas/{self.area.pk}/cobertura/').status_code, 403)
+
+        self.client.force_authenticate(self.jefe)
+        self.assertEqual(self.client.get(f'/api/areas/{self.otra_area.pk}/cobertura/').status_code, 403)
+        response = self.client.get('/api/areas/cobertura/')
+        self.assertEqual([fila['area'] for fila in response.data['areas']], [self.area.pk])
+        self.assertEqual(len(response.data['areas'][0]['ausentes']), 90)
+
+        response = self.client.get('/api/areas/cobertura/', {'desde': '2025-01-01', 'hasta': '2026-06-01'})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get('/api/areas/cobertura/', {'desde': '2025-02-30'})
+        self.assertEqual(response.status_code, 400)
+
+
+# ======================================================
+# TRANSICIONES DE ESTADO
+# ======================================================
+
+class SolicitudTransicionesTests(TestCase):
+
+    def setUp(self):
+        self.area, self.roles, self.contrato = crear_datos_base()
+        self.funcionario = crear_usuario(self.area, self.roles[1], self.contrato, 90)
+        self.director = crear_usuario(self.area, self.roles[4], self.contrato, 91)
+        self.client = APIClient()
+
+    def test_segunda_aprobacion_recibe_409_y_no_descuenta(self):
+        solicitud = crear_solicitud(self.funcionario, cantidad_dias=5)
+        self.client.force_authenticate(self.director)
+        url = f'/api/solicitudes/{solicitud.pk}/aprobar_direccion/'
+
+        self.assertEqual(self.client.post(url, {'aprobar': True}, format='json').status_code, 200)
+        response = self.client.post(url, {'aprobar': True}, format='json')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['estado'], 'aprobada')
+
+        # Tampoco se puede rechazar una vez aprobada
+        self.assertEqual(self.client.post(url, {'aprobar': False}, format='json').status_code, 409)
+
+        self.funcionario.refresh_from_db()
+        self.assertEqual(self.funcionario.dias_vacaciones_disponibles, 10)
+        self.assertEqual(MovimientoSaldo.objects.filter(solicitud=solicitud).count(), 1)
+
+    def test_rechazo_individual_con_las_reglas_del_lote(self):
+        jefe = crear_usuario(self.area, self.roles[2], self.contrato, 92)
+        subdirector = crear_usuario(self.area, self.roles[3], self.contrato, 93)
+
+        # Jefatura solo actúa en la primera etapa
+        solicitud = crear_solicitud(self.funcionario)
+        self.assertTrue(solicitud.aprobar(jefe))
+        self.assertFalse(solicitud.rechazar(jefe))
+        self.client.force_authenticate(jefe)
+        response = self.client.post(
+            f'/api/solicitudes/{solicitud.pk}/aprobar_jefatura/', {'aprobar': False}, format='json'
+        )
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['estado'], 'pendiente_direccion')
+
+        # Nadie rechaza su propia solicitud
+        propia = crear_solicitud(subdirector)
+        self.client.force_authenticate(subdirector)
+        response = self.client.post(
+            f'/api/solicitudes/{propia.pk}/aprobar_direccion/', {'aprobar': False}, format='json'
+        )
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response.data['error'], 'No puede rechazar su propia solicitud.')
+        self.assertEqual(Solicitud.objects.get(pk=propia.pk).estado, 'pendiente_direccion')
+
+        self.assertTrue(propia.rechazar(self.director, 'Sin reemplazo'))
+        self.assertEqual(Solicitud.objects.get(pk=propia.pk).estado, 'rechazada')
+
+    def test_instancia_desactualizada_no_repite_la_transicion(self):
+        solicitud = crear_solicitud(self.funcionario)
+        copia = Solicitud.objects.get(pk=solicitud.pk)
+
+        self.assertTrue(solicitud.aprobar(self.director))
+        self.assertFalse(copia.aprobar(self.director))
+        self.assertFalse(copia.anular_por_usuario())
+        self.assertEqual(Solicitud.objects.get(pk=solicitud.pk).estado, 'aprobada')
+
+    def test_anulacion_por_licencia(self):
+        solicitud = crear_solicitud(self.funcionario)
+        self.client.force_authenticate(self.funcionario)
+        url = f'/api/solicitudes/{solicitud.pk}/solicitar_anulacion_licencia/'
+        self.assertEqual(self.client.post(url).status_code, 409)
+
+        solicitud.aprobar(self.director)
+        self.assertEqual(self.client.post(url).status_code, 200)
+
+        self.client.force_authenticate(self.director)
+        url = f'/api/solicitudes/{solicitud.pk}/finalizar_anulacion_licencia/'
+        self.assertEqual(self.client.post(url).status_code, 200)
+        self.assertEqual(self.client.post(url).status_code, 409)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Requiere bloqueos de fila reales (PostgreSQL)')
+class SolicitudTransicionesConcurrenciaTests(TransactionTestCase):
+    HILOS = 8
+    SOLICITUDES = 10
+
+    def test_aprobaciones_simultaneas_descuentan_una_sola_vez(self):
+        area, roles, contrato = crear_datos_base()
+        funcionario = crear_usuario(area, roles[1], contrato, 92)
+        directores = [crear_usuario(area, roles[4], contrato, 93 + i) for i in range(self.HILOS)]
+        solicitudes = [crear_solicitud(funcionario, cantidad_dias=1) for _ in range(self.SOLICITUDES)]
+
+        barrera = threading.Barrier(self.HILOS)
+        codigos, errores = [], []
+
+        def trabajador(indice, director):
+            client = APIClient()
+            client.force_authenticate(director)
+            # La mitad aprueba y la otra mitad rechaza, todos sobre las mismas solicitudes
+            datos = {'aprobar': indice % 2 == 0}
+            try:
+                for solicitud in solicitudes:
+                    barrera.wait()
+                    response = client.post(
+                        f'/api/solicitudes/{solicitud.pk}/aprobar_direccion/', datos, format='json'
+                    )
+                    codigos.append(response.status_code)
+            except Exception as exc:  # pragma: no cover - se reporta abajo
+                errores.append(exc)
+            finally:
+                connection.close()
+
+        hilos = [threading.Thread(target=trabajador, args=(i, d)) for i, d in enumerate(directores)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+
+        self.assertEqual(errores, [])
+        self.assertEqual(codigos.count(200), self.SOLICITUDES)
+        self.assertEqual(codigos.count(409), self.SOLICITUDES * (self.HILOS - 1))
+
+        aprobadas = Solicitud.objects.filter(estado='aprobada').count()
+        self.assertEqual(aprobadas + Solicitud.objects.filter(estado='rechazada').count(), self.SOLICITUDES)
+        self.assertEqual(MovimientoSaldo.objects.filter(usuario=funcionario).count(), aprobadas)
+        funcionario.refresh_from_db()
+        self.assertEqual(funcionario.dias_vacaciones_disponibles, 15 - aprobadas)
+
+
+# ======================================================
+# PDF DE SOLICITUDES
+# ======================================================
+
+class PlantillaPDFTests(TestCase):
+
+    def test_plantilla_se_comparte_y_no_se_modifica(self):
+        primero, segundo = SolicitudPDFGenerator(), SolicitudPDFGenerator()
+        self.assertIs(primero.plantilla, plantilla_compartida())
+        self.assertIs(primero.styles['CustomBody'], segundo.styles['CustomBody'])
+        with self.assertRaises(TypeError):
+            primero.styles['CustomBody'] = None
+
+    def test_generacion_concurrente(self):
+        area, roles, contrato = crear_datos_base()
+        funcionario = crear_usuario(area, roles[1], contrato, 110)
+        solicitud = Solicitud.objects.select_related('usuario__area').get(pk=crear_solicitud(funcionario).pk)
+        resultados = []
+
+        def trabajador():
+            for _ in range(5):
+                resultados.append(generar_pdf_solicitud(solicitud).getvalue())
+
+        hilos = [threading.Thread(target=trabajador) for _ in range(4)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+
+        self.assertEqual(len(resultados), 20)
+        self.assertTrue(all(pdf.startswith(b'%PDF') for pdf in resultados))
+
+
+class SolicitudPDFTests(TestCase):
+
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        ajustes = override_settings(MEDIA_ROOT=media)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+        self.area, self.roles, self.contrato = crear_datos_base()
+        self.funcionario = crear_usuario(self.area, self.roles[1], self.contrato, 100)
+        self.director = crear_usuario(self.area, self.roles[4], self.contrato, 101)
+        self.client = APIClient()
+
+    def aprobar(self, solicitud):
+        self.client.force_authenticate(self.director)
+        response = self.client.post(
+            f'/api/solicitudes/{solicitud.pk}/aprobar_direccion/', {'aprobar': True}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        solicitud.refresh_from_db()
+
+    def procesar_cola(self):
+        call_command('render_worker', procesos=0, una_vez=True, stdout=StringIO())
+
+    def test_aprobar_solo_encola(self):
+        solicitud = crear_solicitud(self.funcionario)
+        with mock.patch('api_intranet.pdf_generator.generar_pdf_solicitud') as generar:
+            self.aprobar(solicitud)
+        generar.assert_not_called()
+        self.assertFalse(solicitud.pdf_generado)
+
+        trabajo = TrabajoPDF.objects.get(solicitud=solicitud)
+        self.assertEqual(trabajo.estado, 'pendiente')
+
+        self.procesar_cola()
+        trabajo.refresh_from_db()
+        solicitud.refresh_from_db()
+        self.assertEqual(trabajo.estado, 'completado')
+        self.assertEqual(trabajo.intentos, 1)
+        self.assertTrue(solicitud.pdf_generado)
+        self.assertIn(solicitud.huella_pdf(), solicitud.url_pdf)
+        self.assertTrue(default_storage.exists(solicitud.url_pdf))
+
+    def test_descargas_no_vuelven_a_generar(self):
+        solicitud = crear_solicitud(self.funcionario)
+        self.aprobar(solicitud)
+        self.procesar_cola()
+        self.client.force_authenticate(self.funcionario)
+        url = f'/api/solicitudes/{solicitud.pk}/descargar_pdf/'
+
+        with mock.patch('api_intranet.pdf_generator.generar_pdf_solicitud') as generar:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(b''.join(response.streaming_content).startswith(b'%PDF'))
+            etag = response['ETag']
+
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response['ETag'], etag)
+        generar.assert_not_called()
+
+    def test_cambio_en_la_resolucion_encola_y_regenera(self):
+        solicitud = crear_solicitud(self.funcionario)
+        self.aprobar(solicitud)
+        self.procesar_cola()
+        solicitud.refresh_from_db()
+        anterior = solicitud.url_pdf
+
+        Solicitud.objects.filter(pk=solicitud.pk).update(comentarios_administracion='Corrige fechas')
+        self.client.force_authenticate(self.funcionario)
+        response = self.client.get(f'/api/solicitudes/{solicitud.pk}/descargar_pdf/', HTTP_IF_NONE_MATCH='"viejo"')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data['estado'], 'pendiente')
+
+        estado = self.client.get(response['Location'])
+        self.assertEqual(estado.status_code, 200)
+        self.assertEqual(estado.data['id'], response.data['id'])
+
+        self.procesar_cola()
+        solicitud.refresh_from_db()
+        self.assertNotEqual(solicitud.url_pdf, anterior)
+        self.assertTrue(default_storage.exists(solicitud.url_pdf))
+        self.assertFalse(default_storage.exists(anterior))
+        self.assertEqual(self.client.get(response['Location']).data['estado'], 'completado')
+
+    def test_no_duplica_trabajos_activos(self):
+        solicitud = crear_solicitud(self.funcionario)
+        self.aprobar(solicitud)
+        Solicitud.programar_pdfs([solicitud.pk])
+        self.assertEqual(TrabajoPDF.objects.filter(solicitud=solicitud).count(), 1)
+
+    def test_reintenta_y_luego_marca_error(self):
+        solicitud = crear_solicitud(self.funcionario)
+        self.aprobar(solicitud)
+        with mock.patch('api_intranet.pdf_generator.generar_pdf_solicitud', side_effect=RuntimeError('sin fuente')):
+            self.procesar_cola()
+
+        trabajo = TrabajoPDF.objects.get(solicitud=solicitud)
+        self.assertEqual(trabajo.estado, 'error')
+        self.assertEqual(trabajo.intentos, TrabajoPDF.MAXIMO_INTENTOS)
+        self.assertEqual(trabajo.error, 'sin fuente')
+
+    def test_estado_solo_visible_para_su_alcance(self):
+        solicitud = crear_solicitud(self.funcionario)
+        self.aprobar(solicitud)
+        trabajo = TrabajoPDF.objects.get(solicitud=solicitud)
+        otro = crear_usuario(self.area, self.roles[1], self.contrato, 102)
+
+        self.client.force_authenticate(otro)
+        self.assertEqual(self.client.get(f'/api/trabajos-pdf/{trabajo.pk}/').status_code, 404)
+        self.client.force_authenticate(self.funcionario)
+        self.assertEqual(self.client.get(f'/api/trabajos-pdf/{trabajo.pk}/').status_code, 200)
+
+
+@override_settings(PDF_EXPORTACION_PROCESOS=0)
+class ExportarPDFTests(TestCase):
+
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        ajustes = override_settings(MEDIA_ROOT=media)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+        self.area, self.roles, self.contrato = crear_datos_base()
+        self.otra_area = Area.objects.create(nombre='Otra Área', codigo='OTRA')
+        self.funcionario = crear_usuario(self.area, self.roles[1], self.contrato, 120)
+        self.externo = crear_usuario(self.otra_area, self.roles[1], self.contrato, 121)
+        self.director = crear_usuario(self.area, self.roles[4], self.contrato, 122)
+        self.client = APIClient()
+
+        self.aprobadas = []
+        for i, usuario in enumerate([self.funcionario, self.funcionario, self.externo]):
+            solicitud = crear_solicitud(
+                usuario, fecha_inicio=date(2025, 3, 3 + i), fecha_termino=date(2025, 3, 3 + i), cantidad_dias=1
+            )
+            solicitud.aprobar(self.director)
+            self.aprobadas.append(solicitud)
+        self.pendiente = crear_solicitud(self.funcionario, fecha_inicio=date(2025, 4, 1), fecha_termino=date(2025, 4, 1), cantidad_dias=1)
+        # Solo una tiene su PDF generado: las demás se generan durante la exportación
+        self.aprobadas[0].asegurar_pdf()
+
+    def exportar(self, usuario, **params):
+        self.client.force_authenticate(usuario)
+        return self.client.get('/api/solicitudes/exportar_pdfs/', params)
+
+    def test_zip_con_las_aprobadas_del_rango(self):
+        response = self.exportar(self.director)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/zip')
+
+        archivo_zip = zipfile.ZipFile(BytesIO(b''.join(response.streaming_content)))
+        self.assertEqual(
+            sorted(archivo_zip.namelist()),
+            sorted(f'Solicitud_{s.numero_solicitud}.pdf' for s in self.aprobadas)
+        )
+        self.assertTrue(all(archivo_zip.read(nombre).startswith(b'%PDF') for nombre in archivo_zip.namelist()))
+        self.assertEqual(Solicitud.objects.filter(pdf_generado=True).count(), 3)
+
+    def test_filtra_por_alcance_y_area(self):
+        response = self.exportar(self.funcionario)
+        nombres = zipfile.ZipFile(BytesIO(b''.join(response.streaming_content))).namelist()
+        self.assertEqual(len(nombres), 2)
+
+        response = self.exportar(self.director, area=self.otra_area.pk)
+        nombres = zipfile.ZipFile(BytesIO(b''.join(response.streaming_content))).namelist()
+        self.assertEqual(nombres, [f'Solicitud_{self.aprobadas[2].numero_solicitud}.pdf'])
+
+        # El área es la actual del funcionario, como en el resto de la API
+        Usuario.objects.filter(pk=self.externo.pk).update(area=self.area)
+        self.assertEqual(self.exportar(self.director, area=self.otra_area.pk).status_code, 404)
+
+    def test_pdf_unido(self):
+        response = self.exportar(self.director, formato='pdf')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data['total'], 3)
+        # La petición solo encola: ningún PDF se genera ni se une aquí
+        self.assertEqual(Solicitud.objects.filter(pdf_generado=True).count(), 1)
+        # Un reintento del cliente reutiliza la exportación en curso
+        self.assertEqual(self.exportar(self.director, formato='pdf').data['id'], response.data['id'])
+        descarga = f"{response['Location']}descargar/"
+        self.assertEqual(self.client.get(descarga).status_code, 202)
+
+        call_command('render_worker', procesos=0, una_vez=True, stdout=StringIO())
+        self.assertEqual(self.client.get(response['Location']).data['estado'], 'completado')
+        respuesta_pdf = self.client.get(descarga)
+        self.assertEqual(respuesta_pdf.status_code, 200)
+        self.assertEqual(respuesta_pdf['Content-Type'], 'application/pdf')
+        contenido = b''.join(respuesta_pdf.streaming_content)
+        self.assertTrue(contenido.startswith(b'%PDF'))
+        paginas = [len(PdfReader(generar_pdf_solicitud(s)).pages) for s in self.aprobadas]
+        unido = PdfReader(BytesIO(contenido))
+        self.assertEqual(len(unido.pages), sum(paginas))
+        # Una solicitud tras otra, en orden de número
+        inicio = 0
+        for solicitud, cantidad in zip(sorted(self.aprobadas, key=lambda s: s.numero_solicitud), paginas):
+            self.assertIn(solicitud.numero_solicitud, unido.pages[inicio].extract_text())
+            inicio += cantidad
+
+    def test_pdf_unido_con_limite_y_solo_para_quien_lo_pidio(self):
+        with mock.patch.object(ExportacionPDF, 'MAXIMO_SOLICITUDES', 2):
+            response = self.exportar(self.director, formato='pdf')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(ExportacionPDF.objects.exists())
+
+        url = self.exportar(self.director, formato='pdf')['Location']
+        self.client.force_authenticate(self.funcionario)
+        self.assertEqual(self.client.get(f'{url}descargar/').status_code, 404)
+
+    def test_pdf_unido_reintenta_y_vence(self):
+        self.exportar(self.director, formato='pdf')
+        exportacion = ExportacionPDF.objects.get()
+        with mock.patch('api_intranet.exportacion_pdf.PdfWriter', side_effect=RuntimeError('sin memoria')):
+            call_command('render_worker', procesos=0, una_vez=True, stdout=StringIO())
+        exportacion.refresh_from_db()
+        self.assertEqual(exportacion.estado, 'error')
+        self.assertEqual(exportacion.intentos, ExportacionPDF.MAXIMO_INTENTOS)
+        self.assertEqual(self.client.get(f'/api/exportaciones-pdf/{exportacion.pk}/descargar/').status_code, 409)
+
+        ExportacionPDF.objects.all().delete()
+        self.exportar(self.director, formato='pdf')
+        call_command('render_worker', procesos=0, una_vez=True, stdout=StringIO())
+        exportacion = ExportacionPDF.objects.get()
+        self.assertTrue(default_storage.exists(exportacion.archivo))
+        ExportacionPDF.objects.update(terminado_en=timezone.now() - timedelta(hours=ExportacionPDF.HORAS_VIGENCIA + 1))
+        call_command('render_worker', procesos=0, una_vez=True, stdout=StringIO())
+        self.assertFalse(ExportacionPDF.objects.exists())
+        self.assertFalse(default_storage.exists(exportacion.archivo))
+
+    def test_rango_sin_aprobadas(self):
+        response = self.exportar(self.director, desde='2020-01-01', hasta='2020-01-31')
+        self.assertEqual(response.status_code, 404)
+
+    def test_parametros_invalidos(self):
+        for params in ({'desde': '2025-02-30'}, {'hasta': '2025-13-01'}, {'area': 'no-es-uuid'}):
+            with self.subTest(**params):
+                self.assertEqual(self.exportar(self.director, **params).status_code, 400)
+
+
+@override_settings(PDF_EXPORTACION_PROCESOS=2)
+class ExportarPDFParaleloTests(TransactionTestCase):
+    """
+    Los procesos reales del pool arrancan Django desde cero (spawn) con los ajustes por
+    defecto y no verían la base de pruebas: se reemplazan por hilos, que sí la ven
+    porque aquí las filas se confirman.
+    """
+
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        ajustes = override_settings(MEDIA_ROOT=media)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+        area, roles, contrato = crear_datos_base()
+        funcionario = crear_usuario(area, roles[1], contrato, 190)
+        self.director = crear_usuario(area, roles[4], contrato, 191)
+        self.solicitudes = []
+        for i in range(6):
+            solicitud = crear_solicitud(
+                funcionario, fecha_inicio=date(2025, 3, 3 + i), fecha_termino=date(2025, 3, 3 + i), cantidad_dias=1
+            )
+            solicitud.aprobar(self.director)
+            self.solicitudes.append(solicitud)
+        self.pools = []
+        self.client = APIClient()
+        self.client.force_authenticate(self.director)
+
+    def renderizar(self, solicitud_id):
+        # Cada hilo abre su propia conexión: se cierra para poder borrar la base al final
+        try:
+            return renderizar_solicitud(solicitud_id)
+        finally:
+            connection.close()
+
+    def crear_pool(self, procesos):
+        pool = ThreadPoolExecutor(max_workers=procesos)
+        self.pools.append((procesos, pool))
+        return pool
+
+    def exportar(self):
+        return self.client.get('/api/solicitudes/exportar_pdfs/')
+
+    def test_zip_con_pdf_generados_en_paralelo(self):
+        with mock.patch('api_intranet.exportacion_pdf.crear_pool', self.crear_pool), \
+                mock.patch('api_intranet.exportacion_pdf.renderizar_solicitud', self.renderizar):
+            response = self.exportar()
+            archivo_zip = zipfile.ZipFile(BytesIO(b''.join(response.streaming_content)))
+
+        self.assertEqual([procesos for procesos, _ in self.pools], [2])
+        self.assertEqual(
+            sorted(archivo_zip.namelist()),
+            sorted(f'Solicitud_{s.numero_solicitud}.pdf' for s in self.solicitudes)
+        )
+        self.assertTrue(all(archivo_zip.read(nombre).startswith(b'%PDF') for nombre in archivo_zip.namelist()))
+        self.assertEqual(Solicitud.objects.filter(pdf_generado=True).count(), 6)
+
+    def test_cortar_la_descarga_cancela_los_pendientes(self):
+        primera = min(self.solicitudes, key=lambda s: s.numero_solicitud).pk
+        liberar = threading.Event()
+
+        def renderizar(solicitud_id):
+            # Solo la primera termina; las demás esperan a que se cierre la descarga
+            if solicitud_id != primera:
+                liberar.wait(timeout=30)
+            return self.renderizar(solicitud_id)
+
+        class PoolDeHilos(ThreadPoolExecutor):
+            def shutdown(self, wait=True, *, cancel_futures=False):
+                super().shutdown(wait=False, cancel_futures=cancel_futures)
+                liberar.set()
+                super().shutdown(wait=wait)
+
+        with mock.patch('api_intranet.exportacion_pdf.crear_pool', lambda procesos: PoolDeHilos(procesos)), \
+                mock.patch('api_intranet.exportacion_pdf.renderizar_solicitud', renderizar):
+            response = self.exportar()
+            self.assertTrue(next(iter(response.streaming_content)))
+            response.close()
+
+        self.assertTrue(liberar.is_set())
+        # La primera más las que alcanzaron a empezar en los dos hilos; el resto se canceló
+        generadas = Solicitud.objects.filter(pdf_generado=True).count()
+        self.assertGreaterEqual(generadas, 1)
+        self.assertLessEqual(generadas, 3)
+
+    def test_pdf_unido_en_el_pool_del_worker(self):
+        exportacion = ExportacionPDF.encolar(
+            self.director, date(2025, 1, 1), date(2025, 12, 31), None, Solicitud.objects.filter(estado='aprobada')
+        )
+        ExportacionPDF.tomar(1)
+        exportacion.refresh_from_db()
+        pool = ThreadPoolExecutor(max_workers=2)
+        self.addCleanup(pool.shutdown)
+
+        with mock.patch('api_intranet.exportacion_pdf.renderizar_solicitud', self.renderizar):
+            self.assertEqual(exportacion.ejecutar(2, pool), 'completado')
+
+        with default_storage.open(exportacion.archivo, 'rb') as archivo:
+            unido = PdfReader(archivo)
+            paginas = len(unido.pages)
+            primera_pagina = unido.pages[0].extract_text()
+        self.assertEqual(paginas, sum(len(PdfReader(generar_pdf_solicitud(s)).pages) for s in self.solicitudes))
+        self.assertIn(min(s.numero_solicitud for s in self.solicitudes), primera_pagina)
+        # El pool es del worker: sigue disponible para los siguientes trabajos
+        self.assertEqual(pool.submit(lambda: 'libre').result(), 'libre')
+
+
+# ======================================================
+# DOCUMENTOS: ALMACÉN DE BLOBS
+# ======================================================
+
+class DocumentoBlobTests(TestCase):
+
+    def setUp(self):
+        raiz = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, raiz, ignore_errors=True)
+        ajustes = override_settings(DOCUMENTOS_BLOB_ROOT=raiz)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        # Los incrementos de descargas se escriben mientras exista la base de pruebas
+        self.addCleanup(contadores.vaciar)
+
+        self.area, self.roles, self.contrato = crear_datos_base()
+        self.director = crear_usuario(self.area, self.roles[4], self.contrato, 130)
+        self.categoria = CategoriaDocumento.objects.create(nombre='Protocolos')
+        self.client = APIClient()
+        self.client.force_authenticate(self.director)
+
+    def subir(self, titulo, contenido):
+        return self.client.post('/api/documentos/', {
+            'titulo': titulo, 'descripcion': 'Prueba', 'tipo': 'protocolo',
+            'categoria': self.categoria.pk, 'fecha_vigencia': '2025-01-01',
+            'archivo': SimpleUploadedFile('protocolo.pdf', contenido, content_type='application/pdf'),
+        }, format='multipart')
+
+    def documento_en_bd(self, contenido):
+        return Documento.objects.create(
+            titulo='Antiguo', descripcion='Guardado en BD', tipo='circular', categoria=self.categoria,
+            nombre_archivo='antiguo.pdf', extension='pdf', tamano=len(contenido),
+            archivo_contenido=contenido, fecha_vigencia=date(2025, 1, 1),
+        )
+
+    def test_subidas_iguales_comparten_blob(self):
+        contenido = b'%PDF-1.4 protocolo' * 1000
+        self.assertEqual(self.subir('Uno', contenido).status_code, 201)
+        self.assertEqual(self.subir('Dos', contenido).status_code, 201)
+
+        documentos = Documento.objects.all()
+        self.assertEqual({d.storage_type for d in documentos}, {'filesystem'})
+        self.assertEqual({d.archivo_hash for d in documentos}, {hashlib.sha256(contenido).hexdigest()})
+        self.assertTrue(all(d.archivo_contenido is None and d.tamano == len(contenido) for d in documentos))
+        guardados = [p for p in blobs.raiz().rglob('*') if p.is_file()]
+        self.assertEqual(guardados, [blobs.ruta(documentos[0].archivo_hash)])
+
+    def test_descarga_desde_blob(self):
+        contenido = b'%PDF-1.4 circular'
+        self.subir('Circular', contenido)
+        documento = Documento.objects.get()
+
+        response = self.client.get(f'/api/documentos/{documento.pk}/download/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), contenido)
+        self.assertIn('protocolo.pdf', response['Content-Disposition'])
+
+    def test_migrar_documentos_blob(self):
+        contenidos = [b'antiguo-0', b'antiguo-1', b'antiguo-2', b'antiguo-0']
+        documentos = [self.documento_en_bd(contenido) for contenido in contenidos]
+
+        call_command('migrar_documentos_blob', lote=2, stdout=StringIO())
+        for documento, contenido in zip(documentos, contenidos):
+            documento.refresh_from_db()
+            self.assertEqual(documento.storage_type, 'filesystem')
+            self.assertIsNone(documento.archivo_contenido)
+            with documento.abrir_archivo() as archivo:
+                self.assertEqual(archivo.read(), contenido)
+        self.assertEqual(documentos[0].archivo_hash, documentos[3].archivo_hash)
+
+        # Volver a correrlo no encuentra nada pendiente
+        salida = StringIO()
+        call_command('migrar_documentos_blob', stdout=salida)
+        self.assertIn('0 documentos', salida.getvalue())
+
+
+class SubidaDocumentoTests(TestCase):
+
+    def setUp(self):
+        raiz = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, raiz, ignore_errors=True)
+        ajustes = override_settings(DOCUMENTOS_BLOB_ROOT=raiz)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        # La miniatura del documento finalizado se genera en otro hilo, dentro de esta raíz
+        self.addCleanup(segundo_plano.esperar)
+
+        self.area, self.roles, self.contrato = crear_datos_base()
+        self.director = crear_usuario(self.area, self.roles[4], self.contrato, 135)
+        self.categoria = CategoriaDocumento.objects.create(nombre='Manuales')
+        self.contenido = bytes(range(256)) * 40
+        self.client = APIClient()
+        self.client.force_authenticate(self.director)
+
+    def iniciar(self):
+        response = self.client.post('/api/subidas-documentos/', {
+            'nombre_archivo': 'manual.pdf', 'mime_type': 'application/pdf', 'tamano_total': len(self.contenido),
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        return f"/api/subidas-documentos/{response.data['id']}/"
+
+    def enviar(self, url, posicion, datos):
+        return self.client.put(f'{url}trozo/?posicion={posicion}', datos, content_type='application/octet-stream')
+
+    def finalizar(self, url):
+        return self.client.post(f'{url}finalizar/', {
+            'titulo': 'Manual', 'descripcion': 'Por trozos', 'tipo': 'manual',
+            'categoria': self.categoria.pk, 'fecha_vigencia': '2025-01-01',
+        }, format='json')
+
+    def test_subida_por_trozos_y_reintentos(self):
+        url = self.iniciar()
+        self.assertEqual(self.enviar(url, 0, self.contenido[:4000]).data['recibido'], 4000)
+
+        # Un trozo reenviado tras un corte no se escribe dos veces
+        response = self.enviar(url, 0, self.contenido[:4000])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['recibido'], 4000)
+        self.assertEqual(self.finalizar(url).status_code, 409)
+
+        self.assertEqual(self.client.get(url).data['recibido'], 4000)
+        self.enviar(url, 4000, self.contenido[4000:8000])
+        self.enviar(url, 8000, self.contenido[8000:])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.finalizar(url)
+        self.assertEqual(response.status_code, 201)
+        documento = Documento.objects.get()
+        self.assertEqual(documento.archivo_hash, hashlib.sha256(self.contenido).hexdigest())
+        self.assertEqual(documento.tamano, len(self.contenido))
+        self.assertEqual(documento.subido_por, self.director)
+        with documento.abrir_archivo() as archivo:
+            self.assertEqual(archivo.read(), self.contenido)
+        self.assertFalse(SubidaDocumento.objects.get().ruta_temporal().exists())
+
+        # Reintentar el finalizar no crea otro documento
+        self.assertEqual(self.finalizar(url).status_code, 200)
+        self.assertEqual(Documento.objects.count(), 1)
+
+    def test_finalizar_tras_un_rollback(self):
+        url = self.iniciar()
+        self.enviar(url, 0, self.contenido)
+        with mock.patch.object(EnvioNotificacion, 'encolar', side_effect=RuntimeError('caída')):
+            with self.assertRaises(RuntimeError):
+                self.finalizar(url)
+        # El temporal sigue ahí: el reintento no falla por el archivo
+        self.assertFalse(Documento.objects.exists())
+        self.assertTrue(SubidaDocumento.objects.get().ruta_temporal().exists())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.finalizar(url).status_code, 201)
+        with Documento.objects.get().abrir_archivo() as archivo:
+            self.assertEqual(archivo.read(), self.contenido)
+        self.assertFalse(SubidaDocumento.objects.get().ruta_temporal().exists())
+
+    def test_trozo_fuera_del_tamano_declarado(self):
+        url = self.iniciar()
+        response = self.enviar(url, 0, self.contenido + b'extra')
+        self.assertEqual(response.status_code, 400)
+
+    def test_cancelar_y_permisos(self):
+        url = self.iniciar()
+        subida = SubidaDocumento.objects.get()
+        self.assertTrue(subida.ruta_temporal().exists())
+        self.assertEqual(self.client.delete(url).status_code, 204)
+        self.assertFalse(subida.ruta_temporal().exists())
+
+        self.client.force_authenticate(crear_usuario(self.area, self.roles[1], self.contrato, 136))
+        response = self.client.post('/api/subidas-documentos/', {
+            'nombre_archivo': 'manual.pdf', 'tamano_total': 10,
+        }, format='json')
+        self.assertEqual(response.status_code, 403)
+
+
+def pdf_con_texto(*lineas):
+    salida = BytesIO()
+    lienzo = canvas.Canvas(salida)
+    for i, linea in enumerate(lineas):
+        lienzo.drawString(72, 760 - 20 * i, linea)
+    lienzo.save()
+    return salida.getvalue()
+
+
+class BusquedaDocumentoTests(TestCase):
+
+    def setUp(self):
+        raiz = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, raiz, ignore_errors=True)
+        ajustes = override_settings(DOCUMENTOS_BLOB_ROOT=raiz)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+        area, roles, contrato = crear_datos_base()
+        self.client = APIClient()
+        self.client.force_authenticate(crear_usuario(area, roles[4], contrato, 150))
+        self.categoria = CategoriaDocumento.objects.create(nombre='Protocolos')
+
+    def subir(self, titulo, contenido, nombre='archivo.pdf'):
+        # Las tareas de segundo plano corren aquí mismo: su hilo no vería la transacción del test
+        with mock.patch.object(segundo_plano, 'ejecutar', side_effect=lambda funcion, *args: funcion(*args)), \
+                self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/documentos/', {
+                'titulo': titulo, 'descripcion': 'Documento institucional', 'tipo': 'protocolo',
+                'categoria': self.categoria.pk, 'fecha_vigencia': '2025-01-01',
+                'archivo': SimpleUploadedFile(nombre, contenido, content_type='application/pdf'),
+            }, format='multipart')
+        self.assertEqual(response.status_code, 201)
+        return Documento.objects.get(titulo=titulo)
+
+    def buscar(self, termino):
+        return self.client.get('/api/documentos/', {'search': termino}).data
+
+    def test_extrae_el_texto_del_pdf_al_subir(self):
+        documento = self.subir('IAAS-01', pdf_con_texto('Protocolo de lavado de manos', 'Cinco momentos'))
+        self.assertIn('lavado de manos', documento.texto_contenido)
+        self.assertIn('Cinco momentos', documento.texto_contenido)
+
+    def test_el_texto_se_extrae_despues_de_confirmar(self):
+        with mock.patch.object(busqueda, 'extraer_texto', wraps=busqueda.extraer_texto) as extraer, \
+                self.captureOnCommitCallbacks() as callbacks:
+            self.client.post('/api/documentos/', {
+                'titulo': 'IAAS-01', 'descripcion': '-', 'tipo': 'protocolo',
+                'categoria': self.categoria.pk, 'fecha_vigencia': '2025-01-01',
+                'archivo': SimpleUploadedFile('iaas.pdf', pdf_con_texto('Lavado de manos'), content_type='application/pdf'),
+            }, format='multipart')
+            # La petición no lee el PDF: solo deja la tarea para después del commit
+            extraer.assert_not_called()
+        documento = Documento.objects.get()
+        self.assertEqual(documento.texto_contenido, '')
+        self.assertEqual(len(callbacks), 2)
+
+        busqueda.indexar(documento.pk)
+        documento.refresh_from_db()
+        self.assertIn('Lavado de manos', documento.texto_contenido)
+        self.assertEqual([d['titulo'] for d in self.buscar('lavado')], ['IAAS-01'])
+
+    def test_pdf_ilegible_se_sube_sin_texto(self):
+        documento = self.subir('Dañado', b'%PDF-1.4 sin estructura')
+        self.assertEqual(documento.texto_contenido, '')
+
+    def test_busqueda_por_titulo(self):
+        self.subir('Manual de farmacia', pdf_con_texto('Despacho de recetas'))
+        self.subir('Calendario de vacunas', pdf_con_texto('Campaña de invierno'))
+        self.assertEqual([d['titulo'] for d in self.buscar('farmacia')], ['Manual de farmacia'])
+
+    @skipUnless(connection.vendor == 'postgresql', 'Búsqueda de texto completo de PostgreSQL')
+    def test_busqueda_por_contenido_ordenada_por_relevancia(self):
+        self.subir('IAAS-01', pdf_con_texto('Protocolo de lavado de manos', 'El lavado de manos es obligatorio'))
+        self.subir('IAAS-02', pdf_con_texto('Uso de guantes', 'Retirar guantes antes del lavado'))
+        self.subir('Calendario', pdf_con_texto('Campaña de invierno'))
+
+        resultados = self.buscar('protocolo de lavado de manos')
+        self.assertEqual([d['titulo'] for d in resultados], ['IAAS-01'])
+        self.assertIn('<mark>', resultados[0]['fragmento'])
+
+        resultados = self.buscar('lavado')
+        self.assertEqual([d['titulo'] for d in resultados], ['IAAS-01', 'IAAS-02'])
+        self.assertGreater(resultados[0]['relevancia'], resultados[1]['relevancia'])
+
+        # Solo los más relevantes, y el fragmento se calcula solo para ellos
+        with mock.patch('api_intranet.busqueda.MAXIMO_RESULTADOS', 1), \
+                CaptureQueriesContext(connection) as consultas:
+            resultados = self.buscar('lavado')
+        self.assertEqual([d['titulo'] for d in resultados], ['IAAS-01'])
+        self.assertEqual(sum('ts_headline' in consulta['sql'] for consulta in consultas), 1)
+
+
+class AudienciaAnuncioTests(TestCase):
+
+    def setUp(self):
+        self.area, self.roles, contrato = crear_datos_base()
+        self.otra_area = Area.objects.create(nombre='Área Dental', codigo='DENT')
+        self.usuarios = {
+            (nivel, area.codigo): crear_usuario(area, self.roles[nivel], contrato, 170 + 10 * nivel + i)
+            for nivel in self.roles for i, area in enumerate((self.area, self.otra_area))
+        }
+        self.anuncios = {}
+        for visibilidad, _ in Anuncio.VISIBILIDAD_ROLES_CHOICES:
+            self.anuncios[visibilidad, 'todas'] = Anuncio.objects.create(
+                titulo=f'{visibilidad} todas', contenido='-', visibilidad_roles=visibilidad
+            )
+            dental = Anuncio.objects.create(
+                titulo=f'{visibilidad} dental', contenido='-', visibilidad_roles=visibilidad, para_todas_areas=False
+            )
+            dental.areas_destinatarias.set([self.otra_area])
+            self.anuncios[visibilidad, 'dental'] = dental
+
+    def visibles(self, usuario):
+        client = APIClient()
+        client.force_authenticate(usuario)
+        return {anuncio['id'] for anuncio in client.get('/api/anuncios/').data}
+
+    def test_misma_regla_en_sql_y_python(self):
+        for (nivel, area), usuario in self.usuarios.items():
+            esperados = {
+                str(anuncio.pk) for (visibilidad, destino), anuncio in self.anuncios.items()
+                if nivel >= 3 or (
+                    nivel in Anuncio.NIVELES_POR_VISIBILIDAD[visibilidad]
+                    and (destino == 'todas' or area == 'DENT')
+                )
+            }
+            with self.subTest(nivel=nivel, area=area):
+                self.assertEqual(self.visibles(usuario), esperados)
+                self.assertEqual(
+                    {str(anuncio.pk) for anuncio in self.anuncios.values() if anuncio.puede_ver(usuario)}, esperados
+                )
+
+    def test_consulta_sin_distinct(self):
+        with CaptureQueriesContext(connection) as consultas:
+            list(Anuncio.visibles_para(self.usuarios[1, 'TEST']))
+        self.assertEqual(len(consultas), 1)
+        self.assertNotIn('DISTINCT', consultas[0]['sql'])
+        self.assertNotIn('areas_destinatarias', consultas[0]['sql'])
+
+    def test_cambios_de_areas_y_visibilidad(self):
+        anuncio = self.anuncios['funcionarios_y_jefatura', 'dental']
+        funcionario = self.usuarios[1, 'TEST']
+        self.assertNotIn(str(anuncio.pk), self.visibles(funcionario))
+
+        anuncio.areas_destinatarias.add(self.area)
+        self.assertIn(str(anuncio.pk), self.visibles(funcionario))
+
+        # Desde el lado del área
+        self.area.anuncio_set.clear()
+        self.assertNotIn(str(anuncio.pk), self.visibles(funcionario))
+
+        anuncio.para_todas_areas = True
+        anuncio.visibilidad_roles = 'solo_jefatura'
+        anuncio.save()
+        self.assertNotIn(str(anuncio.pk), self.visibles(funcionario))
+        self.assertIn(str(anuncio.pk), self.visibles(self.usuarios[2, 'TEST']))
+
+
+class EnvioNotificacionTests(TestCase):
+
+    def setUp(self):
+        self.area, self.roles, self.contrato = crear_datos_base()
+        self.otra_area = Area.objects.create(nombre='Área Dental', codigo='DENT')
+        self.usuarios = {
+            (nivel, area.codigo): crear_usuario(area, self.roles[nivel], self.contrato, 300 + 10 * nivel + i)
+            for nivel in self.roles for i, area in enumerate((self.area, self.otra_area))
+        }
+        self.director = self.usuarios[4, 'TEST']
+        self.client = APIClient()
+        self.client.force_authenticate(self.director)
+
+    def notificados(self, tipo):
+        return set(Notificacion.objects.filter(tipo=tipo).values_list('usuario_id', flat=True))
+
+    def test_destinatarios_del_anuncio_son_los_que_lo_ven(self):
+        inactivo = crear_usuario(self.otra_area, self.roles[1], self.contrato, 399, is_active=False)
+        for visibilidad, _ in Anuncio.VISIBILIDAD_ROLES_CHOICES:
+            for todas in (True, False):
+                Notificacion.objects.all().delete()
+                anuncio = Anuncio.objects.create(
+                    titulo=visibilidad, contenido='-', visibilidad_roles=visibilidad,
+                    para_todas_areas=todas, creado_por=self.director,
+                )
+                anuncio.areas_destinatarias.set([self.otra_area])
+                envio = EnvioNotificacion.encolar(anuncio)
+                with CaptureQueriesContext(connection) as consultas:
+                    total = envio.enviar()
+
+                esperados = {
+                    usuario.pk for usuario in self.usuarios.values()
+                    if usuario != self.director and anuncio.puede_ver(usuario)
+                }
+                with self.subTest(visibilidad=visibilidad, todas=todas):
+                    self.assertEqual(self.notificados('nuevo_anuncio'), esperados)
+                    self.assertEqual(total, len(esperados))
+                    self.assertNotIn(inactivo.pk, self.notificados('nuevo_anuncio'))
+                    if connection.vendor == 'postgresql':
+                        # Un INSERT ... SELECT y la marca del envío (otros motores insertan por lotes)
+                        self.assertEqual(len(consultas), 2)
+                        self.assertIn('INSERT INTO', consultas[0]['sql'])
+                        self.assertIn('SELECT', consultas[0]['sql'])
+
+    def test_api_solo_encola_y_el_comando_envia(self):
+        response = self.client.post('/api/anuncios/', {
+            'titulo': 'Campaña de invierno', 'contenido': 'Vacunación contra la influenza',
+            'tipo': 'informativo', 'prioridad': 1,
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertFalse(Notificacion.objects.exists())
+        self.assertEqual(EnvioNotificacion.objects.filter(enviado_en__isnull=True).count(), 1)
+
+        call_command('enviar_notificaciones', '--una-vez', stdout=StringIO())
+        # Visibilidad por defecto: funcionarios y jefatura, más Subdirección y Dirección
+        self.assertEqual(Notificacion.objects.filter(tipo='nuevo_anuncio').count(), len(self.usuarios) - 1)
+        notificacion = Notificacion.objects.filter(usuario=self.usuarios[1, 'DENT']).get()
+        self.assertEqual(notificacion.titulo, 'Nuevo anuncio: Campaña de invierno')
+        self.assertEqual(notificacion.url, '/anuncios')
+        self.assertFalse(notificacion.leida)
+
+        # Cada aviso se envía una sola vez
+        call_command('enviar_notificaciones', '--una-vez', stdout=StringIO())
+        self.assertEqual(Notificacion.objects.count(), len(self.usuarios) - 1)
+
+    def test_anuncio_programado_y_actividad_de_un_area(self):
+        anuncio = Anuncio.objects.create(
+            titulo='Próxima semana', contenido='-', creado_por=self.director,
+            fecha_publicacion=timezone.now() + timedelta(days=7),
+        )
+        EnvioNotificacion.encolar(anuncio)
+        actividad = Actividad.objects.create(
+            titulo='Taller dental', descripcion='Técnicas de cepillado', para_todas_areas=False,
+            fecha_inicio=timezone.now(), fecha_termino=timezone.now() + timedelta(hours=1),
+            creado_por=self.director,
+        )
+        actividad.areas_participantes.set([self.otra_area])
+        EnvioNotificacion.encolar(actividad)
+
+        enviados = EnvioNotificacion.enviar_pendientes()
+        self.assertEqual([envio.actividad for envio in enviados], [actividad])
+        esperados = {
+            usuario.pk for (nivel, area), usuario in self.usuarios.items()
+            if (area == 'DENT' or nivel >= 3) and usuario != self.director
+        }
+        self.assertEqual(self.notificados('nueva_actividad'), esperados)
+        self.assertFalse(self.notificados('nuevo_anuncio'))
+
+        # Adelantar la publicación adelanta el aviso
+        anuncio.fecha_publicacion = timezone.now()
+        anuncio.save()
+        self.assertEqual(len(EnvioNotificacion.enviar_pendientes()), 1)
+        self.assertEqual(len(self.notificados('nuevo_anuncio')), len(self.usuarios) - 1)
+
+    def test_un_envio_que_falla_no_detiene_los_demas(self):
+        primero = Anuncio.objects.create(titulo='Primero', contenido='-', creado_por=self.director)
+        segundo = Anuncio.objects.create(titulo='Segundo', contenido='-', creado_por=self.director)
+        fallido = EnvioNotificacion.encolar(primero)
+        EnvioNotificacion.objects.filter(pk=fallido.pk).update(programado_para=timezone.now() - timedelta(minutes=1))
+        EnvioNotificacion.encolar(segundo)
+
+        original = notificaciones.crear_para
+
+        def crear_para(usuarios, tipo, titulo, *args, **kwargs):
+            if titulo.endswith('Primero'):
+                raise RuntimeError('Destinatarios inválidos')
+            return original(usuarios, tipo, titulo, *args, **kwargs)
+
+        with mock.patch.object(notificaciones, 'crear_para', crear_para), self.assertLogs('api_intranet.models'):
+            enviados = EnvioNotificacion.enviar_pendientes()
+        self.assertEqual([envio.anuncio for envio in enviados], [segundo])
+
+        fallido.refresh_from_db()
+        self.assertIsNone(fallido.enviado_en)
+        self.assertEqual((fallido.intentos, fallido.error), (1, 'Destinatarios inválidos'))
+        self.assertGreater(fallido.programado_para, timezone.now())
+
+        # Se reintenta más tarde, hasta MAXIMO_INTENTOS veces
+        EnvioNotificacion.objects.filter(pk=fallido.pk).update(
+            programado_para=timezone.now(), intentos=EnvioNotificacion.MAXIMO_INTENTOS
+        )
+        self.assertEqual(EnvioNotificacion.enviar_pendientes(), [])
+        EnvioNotificacion.objects.filter(pk=fallido.pk).update(intentos=1)
+        self.assertEqual(len(EnvioNotificacion.enviar_pendientes()), 1)
+        self.assertEqual(len(self.notificados('nuevo_anuncio')), len(self.usuarios) - 1)
+
+    def test_documento_restringido_y_lotes_sin_postgresql(self):
+        categoria = CategoriaDocumento.objects.create(nombre='Protocolos')
+        documento = Documento.objects.create(
+            titulo='Protocolo dental', descripcion='Esterilización', tipo='protocolo', categoria=categoria,
+            fecha_vigencia=date(2025, 1, 1), publico=False, subido_por=self.director, tamano=0,
+        )
+        documento.areas_con_acceso.set([self.otra_area])
+        envio = EnvioNotificacion.encolar(documento)
+
+        # Otros motores: bulk_create en lotes de TAMANO_LOTE
+        with mock.patch.object(notificaciones, 'connection', mock.Mock(vendor='sqlite')), \
+                mock.patch.object(notificaciones, 'TAMANO_LOTE', 2), \
+                CaptureQueriesContext(connection) as consultas:
+            total = envio.enviar()
+
+        esperados = {
+            usuario.pk for (nivel, area), usuario in self.usuarios.items()
+            if (area == 'DENT' or nivel >= 3) and usuario != self.director
+        }
+        self.assertEqual(self.notificados('documento_nuevo'), esperados)
+        self.assertEqual(total, len(esperados))
+        inserciones = [c for c in consultas if c['sql'].startswith('INSERT')]
+        self.assertEqual(len(inserciones), -(-len(esperados) // 2))
+
+
+class FeedAnunciosTests(TestCase):
+
+    def setUp(self):
+        area, roles, contrato = crear_datos_base()
+        self.client = APIClient()
+        self.client.force_authenticate(crear_usuario(area, roles[1], contrato, 200))
+        ahora = timezone.now()
+        self.esperados = []
+        for i in range(7):
+            self.esperados.append(Anuncio.objects.create(
+                titulo=f'Normal {i}', contenido='-', prioridad=1 + i % 2,
+                fecha_publicacion=ahora - timedelta(hours=i),
+            ))
+        destacado = Anuncio.objects.create(
+            titulo='Destacado', contenido='-', es_destacado=True, fecha_publicacion=ahora - timedelta(days=30)
+        )
+        self.esperados = [destacado] + sorted(
+            self.esperados, key=lambda a: (a.prioridad, a.fecha_publicacion), reverse=True
+        )
+        # Fuera del feed: expirado, programado, inactivo y no visible para funcionarios
+        Anuncio.objects.create(titulo='Expirado', contenido='-', fecha_expiracion=ahora - timedelta(minutes=1))
+        Anuncio.objects.create(titulo='Programado', contenido='-', fecha_publicacion=ahora + timedelta(days=1))
+        Anuncio.objects.create(titulo='Inactivo', contenido='-', activo=False)
+        Anuncio.objects.create(titulo='Jefaturas', contenido='-', visibilidad_roles='solo_jefatura')
+
+    def test_recorre_todas_las_paginas(self):
+        titulos, url, paginas = [], '/api/anuncios/feed/?limite=3', 0
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            titulos += [anuncio['titulo'] for anuncio in response.data['results']]
+            url, paginas = response.data['next'], paginas + 1
+        self.assertEqual(titulos, [anuncio.titulo for anuncio in self.esperados])
+        self.assertEqual(paginas, 3)
+
+    def test_anuncio_nuevo_no_desplaza_la_pagina_siguiente(self):
+        primera = self.client.get('/api/anuncios/feed/', {'limite': 4}).data
+        Anuncio.objects.create(titulo='Nuevo', contenido='-', prioridad=5)
+        segunda = self.client.get(primera['next']).data
+        self.assertEqual(
+            [anuncio['titulo'] for anuncio in segunda['results']], [a.titulo for a in self.esperados[4:]]
+        )
+        self.assertIsNone(segunda['next'])
+
+    def test_cursor_invalido(self):
+        self.assertEqual(self.client.get('/api/anuncios/feed/', {'cursor': 'no-es-un-cursor'}).status_code, 400)
+        cursor = paginacion.codificar([True, 1, 'ayer', 'x'])
+        self.assertEqual(self.client.get('/api/anuncios/feed/', {'cursor': cursor}).status_code, 400)
+        # Valores manipulados: no escalares o de otro tipo que el campo (un número como fecha)
+        fecha, id_ = '2025-01-01T00:00:00+00:00', str(uuid.uuid4())
+        for valores in ([True, [1], fecha, id_], [True, 1, None, {}], [True, 1, 5, 1], [1, 1, fecha, id_],
+                        [True, True, fecha, id_], [True, 1, fecha, 'x']):
+            cursor = paginacion.codificar(valores)
+            with self.subTest(valores=valores):
+                self.assertEqual(self.client.get('/api/anuncios/feed/', {'cursor': cursor}).status_code, 400)
+
+    def test_vigentes_filtra_en_la_base(self):
+        titulos = {anuncio['titulo'] for anuncio in self.client.get('/api/anuncios/vigentes/').data}
+        self.assertEqual(titulos, {anuncio.titulo for anuncio in self.esperados} | {'Programado'})
+
+
+def imagen_de_prueba(formato='PNG', tamano=(1200, 800)):
+    salida = BytesIO()
+    Image.new('RGB', tamano, (30, 120, 200)).save(salida, formato)
+    return salida.getvalue()
+
+
+def pdf_escaneado():
+    """PDF cuya primera página es una imagen, como un documento escaneado"""
+    salida = BytesIO()
+    lienzo = canvas.Canvas(salida)
+    lienzo.drawImage(ImageReader(BytesIO(imagen_de_prueba(tamano=(600, 800)))), 0, 0, 595, 842)
+    lienzo.save()
+    return salida.getvalue()
+
+
+class PrevisualizacionTests(TestCase):
+
+    def setUp(self):
+        raiz = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, raiz, ignore_errors=True)
+        ajustes = override_settings(DOCUMENTOS_BLOB_ROOT=f'{raiz}/blobs', MEDIA_ROOT=f'{raiz}/media')
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        # Sin poppler: los PDF usan la imagen incrustada de la primera página
+        sin_pdftoppm = mock.patch('api_intranet.previsualizaciones.shutil.which', return_value=None)
+        sin_pdftoppm.start()
+        self.addCleanup(sin_pdftoppm.stop)
+
+        area, roles, contrato = crear_datos_base()
+        self.usuario = crear_usuario(area, roles[4], contrato, 155)
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+        self.categoria = CategoriaDocumento.objects.create(nombre='Afiches')
+
+    def subir(self, titulo, contenido, nombre, content_type):
+        # La miniatura se genera en segundo plano al confirmar la subida
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/documentos/', {
+                'titulo': titulo, 'descripcion': 'Con vista previa', 'tipo': 'otro',
+                'categoria': self.categoria.pk, 'fecha_vigencia': '2025-01-01',
+                'archivo': SimpleUploadedFile(nombre, contenido, content_type=content_type),
+            }, format='multipart')
+        self.assertEqual(response.status_code, 201)
+        segundo_plano.esperar()
+        documento = Documento.objects.get(titulo=titulo)
+        listado = self.client.get('/api/documentos/').data
+        return documento, next(d for d in listado if d['id'] == str(documento.pk))['preview_url']
+
+    def test_imagen_reducida(self):
+        documento, preview_url = self.subir('Afiche', imagen_de_prueba('JPEG'), 'afiche.jpg', 'image/jpeg')
+        self.assertEqual(preview_url, f'/api/documentos/{documento.pk}/preview/')
+
+        response = self.client.get(preview_url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        with Image.open(BytesIO(b''.join(response.streaming_content))) as miniatura:
+            self.assertEqual(miniatura.size, (320, 213))
+
+        # Se revalida con el hash del contenido
+        response = self.client.get(preview_url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_primera_pagina_de_pdf_escaneado(self):
+        documento, preview_url = self.subir('Escaneado', pdf_escaneado(), 'escaneado.pdf', 'application/pdf')
+        self.assertIsNotNone(preview_url)
+        self.assertTrue(previsualizaciones.existe(documento.archivo_hash))
+
+    def test_sin_vista_previa(self):
+        _, preview_url = self.subir('Planilla', b'a;b;c', 'planilla.csv', 'text/csv')
+        self.assertIsNone(preview_url)
+
+        # Un PDF de solo texto necesita pdftoppm
+        documento, preview_url = self.subir('Circular', pdf_con_texto('Solo texto'), 'circular.pdf', 'application/pdf')
+        self.assertIsNone(preview_url)
+        self.assertEqual(self.client.get(f'/api/documentos/{documento.pk}/preview/').status_code, 404)
+
+        # El intento queda anotado: no se vuelve a leer el PDF
+        self.assertTrue(previsualizaciones.sin_vista_previa(documento.archivo_hash))
+        abrir = mock.Mock()
+        self.assertIsNone(previsualizaciones.generar(documento.archivo_hash, abrir, 'circular.pdf', 'application/pdf'))
+        abrir.assert_not_called()
+
+    def test_adjunto_de_anuncio(self):
+        anuncio = Anuncio.objects.create(titulo='Campaña', contenido='Vacunación', creado_por=self.usuario)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(f'/api/anuncios/{anuncio.pk}/subir_adjunto/', {
+                'archivo': SimpleUploadedFile('afiche.png', imagen_de_prueba(), content_type='image/png'),
+            }, format='multipart')
+        self.assertEqual(response.status_code, 201)
+        segundo_plano.esperar()
+        adjunto = AdjuntoAnuncio.objects.get()
+        self.assertEqual(adjunto.archivo_hash, hashlib.sha256(imagen_de_prueba()).hexdigest())
+        url = f'/api/anuncios/{anuncio.pk}/adjuntos/{adjunto.pk}/preview/'
+        self.assertEqual(adjunto.get_url_preview(), url)
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+        # Los adjuntos anteriores a las miniaturas no se generan al pedirlas, sino con el comando
+        huella = adjunto.archivo_hash
+        AdjuntoAnuncio.objects.update(archivo_hash='')
+        shutil.rmtree(previsualizaciones.ruta(huella).parent)
+        self.assertEqual(self.client.get(url).status_code, 404)
+        call_command('generar_previsualizaciones', stdout=StringIO())
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+        # Sin el archivo original la vista previa es 404, no un error del servidor
+        shutil.rmtree(previsualizaciones.ruta(huella).parent)
+        default_storage.delete(adjunto.archivo.name)
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+
+def foto_con_exif(tamano=(1600, 900)):
+    """JPEG como los de un celular: girado 90° por EXIF y con ubicación GPS"""
+    imagen = Image.new('RGB', tamano, (200, 80, 40))
+    exif = imagen.getexif()
+    exif[0x0112] = 6  # Orientation: girar 90°
+    exif[0x8825] = {1: 'S', 2: (33.0, 26.0, 0.0)}  # GPSInfo
+    salida = BytesIO()
+    imagen.save(salida, 'JPEG', exif=exif)
+    return salida.getvalue()
+
+
+class VariantesImagenTests(TestCase):
+
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        ajustes = override_settings(MEDIA_ROOT=media)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+        self.area, roles, contrato = crear_datos_base()
+        self.usuario = crear_usuario(self.area, roles[4], contrato, 156)
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+
+    def abrir_variante(self, url):
+        return Image.open(default_storage.open(url.removeprefix(default_storage.base_url)))
+
+    def test_actividad_subida_con_variantes(self):
+        response = self.client.post('/api/actividades/', {
+            'titulo': 'Corrida familiar', 'descripcion': 'Domingo en el parque',
+            'fecha_inicio': '2025-03-02T09:00:00Z', 'fecha_termino': '2025-03-02T12:00:00Z',
+            'imagen': SimpleUploadedFile('corrida.png', imagen_de_prueba(tamano=(1600, 900)), content_type='image/png'),
+        }, format='multipart')
+        self.assertEqual(response.status_code, 201)
+
+        tarjeta = self.client.get('/api/actividades/').data[0]
+        self.assertEqual((tarjeta['imagen_ancho'], tarjeta['imagen_alto']), (1600, 900))
+        self.assertEqual(list(tarjeta['imagen_srcset']), ['320', '640', '1280'])
+        for ancho, url in tarjeta['imagen_srcset'].items():
+            self.assertTrue(url.endswith(f'_{ancho}w.webp'))
+            with self.abrir_variante(url) as variante:
+                self.assertEqual(variante.format, 'WEBP')
+                self.assertEqual(variante.width, int(ancho))
+
+    def test_foto_girada_sin_exif(self):
+        anuncio = Anuncio.objects.create(
+            titulo='Operativo', contenido='Vacunación en terreno', creado_por=self.usuario,
+            imagen=SimpleUploadedFile('operativo.jpg', foto_con_exif(), content_type='image/jpeg'),
+        )
+        # Dimensiones tal como se ve la foto (vertical), sin ampliar sobre su ancho
+        self.assertEqual((anuncio.imagen_ancho, anuncio.imagen_alto), (900, 1600))
+        srcset = self.client.get('/api/anuncios/').data[0]['imagen_srcset']
+        self.assertEqual(list(srcset), ['320', '640', '900'])
+        with self.abrir_variante(srcset['900']) as variante:
+            self.assertEqual(variante.size, (900, 1600))
+            self.assertEqual(len(variante.getexif()), 0)
+
+        # El original, que también se publica, queda sin EXIF y ya girado
+        self.assertEqual(anuncio.imagen_variantes['origen'], anuncio.imagen.name)
+        with Image.open(default_storage.open(anuncio.imagen.name)) as original:
+            self.assertEqual(original.size, (900, 1600))
+            self.assertEqual(len(original.getexif()), 0)
+        anuncio.refresh_from_db()
+        self.assertEqual(anuncio.imagen_variantes['origen'], anuncio.imagen.name)
+        self.assertEqual(len(default_storage.listdir(posixpath.dirname(anuncio.imagen.name))[1]), 1)
+
+    def test_cambio_de_imagen_reemplaza_variantes(self):
+        actividad = Actividad.objects.create(
+            titulo='Aniversario', descripcion='Celebración', creado_por=self.usuario,
+            fecha_inicio=timezone.now(), fecha_termino=timezone.now() + timedelta(hours=2),
+            imagen=SimpleUploadedFile('aniversario.png', imagen_de_prueba(), content_type='image/png'),
+        )
+        anteriores = list(actividad.imagen_variantes['anchos'].values())
+        self.assertTrue(all(default_storage.exists(nombre) for nombre in anteriores))
+
+        # Guardar otros campos no vuelve a procesar la imagen
+        with mock.patch('api_intranet.imagenes.generar') as generar:
+            actividad.titulo = 'Aniversario CESFAM'
+            actividad.save()
+        generar.assert_not_called()
+
+        actividad.imagen = SimpleUploadedFile('nueva.png', imagen_de_prueba(tamano=(400, 300)), content_type='image/png')
+        actividad.save()
+        self.assertFalse(any(default_storage.exists(nombre) for nombre in anteriores))
+        actividad.refresh_from_db()
+        self.assertEqual(list(actividad.get_srcset_imagen()), ['320', '400'])
+
+        actividad.imagen = None
+        actividad.save()
+        actividad.refresh_from_db()
+        self.assertEqual(actividad.get_srcset_imagen(), {})
+        self.assertIsNone(actividad.imagen_ancho)
+
+    def test_avatar_y_comando_para_imagenes_anteriores(self):
+        self.usuario.avatar = SimpleUploadedFile('yo.png', imagen_de_prueba(tamano=(600, 600)), content_type='image/png')
+        self.usuario.save()
+        fila = next(u for u in self.client.get('/api/usuarios/').data if str(u['id']) == str(self.usuario.pk))
+        self.assertEqual(list(fila['avatar_srcset']), ['96', '192'])
+
+        # Imágenes subidas antes de las variantes
+        Usuario.objects.update(avatar_variantes={}, avatar_ancho=None, avatar_alto=None)
+        call_command('generar_variantes_imagenes', stdout=StringIO())
+        self.usuario.refresh_from_db()
+        self.assertEqual((self.usuario.avatar_ancho, self.usuario.avatar_alto), (600, 600))
+        self.assertEqual(list(self.usuario.get_srcset_avatar()), ['96', '192'])
+
+
+class DescargaDocumentoTests(TestCase):
+
+    def setUp(self):
+        raiz = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, raiz, ignore_errors=True)
+        ajustes = override_settings(DOCUMENTOS_BLOB_ROOT=raiz)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        # Los incrementos de descargas se escriben mientras exista la base de pruebas
+        self.addCleanup(contadores.vaciar)
+
+        area, roles, contrato = crear_datos_base()
+        self.usuario = crear_usuario(area, roles[1], contrato, 140)
+        self.contenido = bytes(range(256)) * 1024
+        archivo_hash, tamano = blobs.guardar(self.contenido)
+        self.documento = Documento.objects.create(
+            titulo='Manual', descripcion='Manual grande', tipo='manual',
+            categoria=CategoriaDocumento.objects.create(nombre='Manuales'),
+            storage_type='filesystem', archivo_hash=archivo_hash, nombre_archivo='manual.pdf',
+            extension='pdf', tamano=tamano, mime_type='application/pdf', fecha_vigencia=date(2025, 1, 1),
+        )
+        self.url = f'/api/documentos/{self.documento.pk}/download/'
+        self.etag = f'"{archivo_hash}"'
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+
+    def test_parsear_rangos(self):
+        self.assertIsNone(parsear_rangos(None, 100))
+        self.assertIsNone(parsear_rangos('items=0-1', 100))
+        self.assertIsNone(parsear_rangos('bytes=5-1', 100))
+        self.assertEqual(parsear_rangos('bytes=0-9', 100), [(0, 9)])
+        self.assertEqual(parsear_rangos('bytes=90-', 100), [(90, 99)])
+        self.assertEqual(parsear_rangos('bytes=-10', 100), [(90, 99)])
+        self.assertEqual(parsear_rangos('bytes=0-9,5-19,20-29', 100), [(0, 29)])
+        self.assertEqual(parsear_rangos('bytes=50-60,0-4', 100), [(0, 4), (50, 60)])
+        self.assertEqual(parsear_rangos('bytes=200-300', 100), [])
+
+    def test_descarga_completa_con_etag(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['ETag'], self.etag)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(int(response['Content-Length']), len(self.contenido))
+        self.assertEqual(b''.join(response.streaming_content), self.contenido)
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=self.etag)
+        self.assertEqual(response.status_code, 304)
+        contadores.vaciar()
+        self.documento.refresh_from_db()
+        self.assertEqual(self.documento.descargas, 1)
+
+    def test_un_rango(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=1000-1999')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 1000-1999/{len(self.contenido)}')
+        self.assertEqual(response['Content-Length'], '1000')
+        self.assertEqual(b''.join(response.streaming_content), self.contenido[1000:2000])
+
+    def test_varios_rangos(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-9,-5')
+        self.assertEqual(response.status_code, 206)
+        self.assertTrue(response['Content-Type'].startswith('multipart/byteranges; boundary='))
+        cuerpo = b''.join(response.streaming_content)
+        self.assertEqual(int(response['Content-Length']), len(cuerpo))
+
+        total = len(self.contenido)
+        self.assertIn(f'Content-Range: bytes 0-9/{total}\r\n\r\n'.encode() + self.contenido[:10], cuerpo)
+        self.assertIn(f'Content-Range: bytes {total - 5}-{total - 1}/{total}\r\n\r\n'.encode() + self.contenido[-5:], cuerpo)
+
+    def test_rango_fuera_del_archivo(self):
+        response = self.client.get(self.url, HTTP_RANGE=f'bytes={len(self.contenido)}-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(self.contenido)}')
+
+    def test_if_range(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE=self.etag)
+        self.assertEqual(response.status_code, 206)
+
+        # Con un ETag antiguo se envía el archivo completo
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"otro"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.contenido)
+
+    @override_settings(DOCUMENTOS_CONTADORES_INTERVALO=3600)
+    def test_descargar_lote(self):
+        contadores.vaciar()
+        en_base = Documento.objects.create(
+            titulo='Formulario', descripcion='Guardado en la base', tipo='formulario',
+            categoria=self.documento.categoria, storage_type='database', archivo_contenido=b'formulario',
+            nombre_archivo='formulario.docx', extension='docx', tamano=10, fecha_vigencia=date(2025, 1, 1),
+        )
+        response = self.client.post(
+            '/api/documentos/descargar_lote/', {'ids': [str(en_base.pk), str(self.documento.pk)]}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/zip')
+
+        with zipfile.ZipFile(BytesIO(b''.join(response.streaming_content))) as archivo_zip:
+            nombres = archivo_zip.namelist()
+            self.assertEqual(nombres, [
+                f'{en_base.codigo_documento}_formulario.docx', f'{self.documento.codigo_documento}_manual.pdf'
+            ])
+            self.assertEqual(archivo_zip.read(nombres[0]), b'formulario')
+            self.assertEqual(archivo_zip.read(nombres[1]), self.contenido)
+
+        # Ambos documentos suman su descarga en un solo UPDATE
+        with CaptureQueriesContext(connection) as consultas:
+            contadores.vaciar()
+        tabla = Documento._meta.db_table
+        self.assertEqual(sum(f'UPDATE "{tabla}"' in consulta['sql'] for consulta in consultas), 1)
+        self.assertEqual(
+            sorted(Documento.objects.values_list('descargas', flat=True)), [1, 1]
+        )
+
+    def test_descargar_lote_sin_permisos(self):
+        privado = Documento.objects.create(
+            titulo='Reservado', descripcion='Solo Dirección', tipo='otro', publico=False,
+            categoria=self.documento.categoria, storage_type='filesystem',
+            archivo_hash=self.documento.archivo_hash, nombre_archivo='reservado.pdf',
+            extension='pdf', tamano=len(self.contenido), fecha_vigencia=date(2025, 1, 1),
+        )
+        response = self.client.post(
+            '/api/documentos/descargar_lote/', {'ids': [str(self.documento.pk), str(privado.pk)]}, format='json'
+        )
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.data['ids'], [privado.pk])
+        self.assertEqual(contadores.pendientes(), 0)
+
+
+@override_settings(DOCUMENTOS_CONTADORES_INTERVALO=3600)
+class ContadoresDocumentoTests(TestCase):
+
+    def setUp(self):
+        contadores.vaciar()
+        self.addCleanup(contadores.vaciar)
+        area, roles, contrato = crear_datos_base()
+        self.client = APIClient()
+        self.client.force_authenticate(crear_usuario(area, roles[1], contrato, 160))
+        self.documento = Documento.objects.create(
+            titulo='Circular', descripcion='Muy consultada', tipo='circular',
+            categoria=CategoriaDocumento.objects.create(nombre='Circulares'),
+            storage_type='s3', archivo_url='https://example.com/circular.pdf',
+            nombre_archivo='circular.pdf', extension='pdf', tamano=10, fecha_vigencia=date(2025, 1, 1),
+        )
+        self.url = f'/api/documentos/{self.documento.pk}/'
+
+    def test_incrementos_se_escriben_al_vaciar(self):
+        for _ in range(3):
+            self.client.post(f'{self.url}visualizar/')
+        self.client.post(f'{self.url}descargar/')
+        self.client.get(f'{self.url}download/')
+
+        self.documento.refresh_from_db()
+        self.assertEqual((self.documento.descargas, self.documento.visualizaciones), (0, 0))
+        self.assertEqual(contadores.pendientes(), 5)
+
+        # Cinco incrementos, un solo UPDATE sobre la fila del documento
+        with CaptureQueriesContext(connection) as consultas:
+            contadores.vaciar()
+        tabla = Documento._meta.db_table
+        self.assertEqual(sum(f'UPDATE "{tabla}"' in consulta['sql'] for consulta in consultas), 1)
+
+        self.documento.refresh_from_db()
+        self.assertEqual((self.documento.descargas, self.documento.visualizaciones), (2, 3))
+        fila = ContadorDocumentoHora.objects.get(documento=self.documento)
+        self.assertEqual((fila.descargas, fila.visualizaciones), (2, 3))
+        self.assertEqual(fila.hora, timezone.now().replace(minute=0, second=0, microsecond=0))
+
+        # El siguiente vaciado suma sobre la misma fila horaria
+        self.client.post(f'{self.url}visualizar/')
+        contadores.vaciar()
+        fila.refresh_from_db()
+        self.assertEqual(fila.visualizaciones, 4)
+
+    def test_documento_borrado_antes_de_vaciar(self):
+        self.client.post(f'{self.url}visualizar/')
+        self.documento.delete()
+        contadores.vaciar()
+        self.assertFalse(ContadorDocumentoHora.objects.exists())
+
+    def test_estadisticas_por_dia(self):
+        hora = timezone.now().replace(minute=0, second=0, microsecond=0)
+        for horas_atras, descargas in ((0, 2), (1, 3), (48, 5)):
+            ContadorDocumentoHora.objects.create(
+                documento=self.documento, hora=hora - timedelta(hours=horas_atras), descargas=descargas
+            )
+        response = self.client.get(f'{self.url}estadisticas/', {'agrupar': 'dia'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sum(fila['descargas'] for fila in response.data['serie']), 10)
+        self.assertEqual(response.data['serie'][0]['descargas'], 5)
+
+        response = self.client.get(f'{self.url}estadisticas/')
+        self.assertEqual([fila['descargas'] for fila in response.data['serie']], [5, 3, 2])
+
+        response = self.client.get(f'{self.url}estadisticas/', {'desde': '2025-02-30'})
+        self.assertEqual(response.status_code, 400)
+
+
+class VaciadoPeriodicoContadoresTests(TransactionTestCase):
+    """El hilo del buffer escribe aunque no lleguen más peticiones al proceso"""
+
+    def test_hilo_vacia_sin_nuevas_peticiones(self):
+        contadores.vaciar()
+        documento = Documento.objects.create(
+            titulo='Circular', descripcion='Consultada una vez', tipo='circular',
+            categoria=CategoriaDocumento.objects.create(nombre='Circulares'),
+            storage_type='s3', archivo_url='https://example.com/circular.pdf',
+            nombre_archivo='circular.pdf', extension='pdf', tamano=10, fecha_vigencia=date(2025, 1, 1),
+        )
+        with override_settings(DOCUMENTOS_CONTADORES_INTERVALO=0.5):
+            registrar_visualizacion(documento.pk)
+            limite = time.monotonic() + 10
+            while time.monotonic() < limite:
+                if Documento.objects.filter(pk=documento.pk, visualizaciones=1).exists():
+                    break
+                time.sleep(0.1)
+        documento.refresh_from_db()
+        self.assertEqual(documento.visualizaciones, 1)
+        self.assertEqual(contadores.pendientes(), 0)
+
+
+# ======================================================
+# BENCHMARKS
+# ======================================================
+
+class BenchmarkTests(TestCase):
+
+    def test_todos_los_casos_reportan_metricas(self):
+        resultados = ejecutar(repeticiones=2, tamanos=(5, 20))
+        self.assertEqual(set(resultados), set(CASOS))
+        for medicion in resultados.values():
+            self.assertLessEqual(medicion['p50_ms'], medicion['p99_ms'])
+            self.assertGreater(medicion['pico_kib'], 0)
+        self.assertEqual(resultados['pdf_motivo_corto']['consultas'], 0)
+        self.assertGreater(resultados['aprobar']['consultas'], 0)
+
+    def test_comparar_detecta_regresiones(self):
+        base = {'aprobar': {'p50_ms': 10.0, 'pico_kib': 100.0, 'consultas': 8}}
+        self.assertEqual(comparar({'aprobar': {'p50_ms': 12.0, 'pico_kib': 110.0, 'consultas': 8}}, base, 0.25), [])
+
+        regresiones = comparar({'aprobar': {'p50_ms': 13.0, 'pico_kib': 100.0, 'consultas': 9}}, base, 0.25)
+        self.assertEqual(len(regresiones), 2)
+        self.assertTrue(any('p50_ms' in r for r in regresiones))
+        self.assertTrue(any('consultas' in r for r in regresiones))
@@ -11,7 +11,7 @@ from .views import (
     ActividadViewSet, AnuncioViewSet,
     DocumentoViewSet, CategoriaDocumentoViewSet,
     NotificacionViewSet, LogAuditoriaViewSet,
-    TipoContratoViewSet
+    TipoContratoViewSet, TrabajoPDFViewSet, ExportacionPDFViewSet, SubidaDocumentoViewSet
 )
 
 # ======================================================
@@ -26,10 +26,13 @@ router.register(r'roles', RolViewSet, basename='rol')
 router.register(r'areas', AreaViewSet, basename='area')
 router.register(r'tipos-contrato', TipoContratoViewSet, basename='tipo-contrato')
 router.register(r'solicitudes', SolicitudViewSet, basename='solicitud')
+router.register(r'trabajos-pdf', TrabajoPDFViewSet, basename='trabajo-pdf')
+router.register(r'exportaciones-pdf', ExportacionPDFViewSet, basename='exportacion-pdf')
 router.register(r'licencias', LicenciaMedicaViewSet, basename='licencia')
 router.register(r'actividades', ActividadViewSet, basename='actividad')
 router.register(r'anuncios', AnuncioViewSet, basename='anuncio')
 router.register(r'documentos', DocumentoViewSet, basename='documento')
+router.register(r'subidas-documentos', SubidaDocumentoViewSet, basename='subida-documento')
 router.register(r'categorias-documento', CategoriaDocumentoViewSet, basename='categoria-documento')
 router.register(r'notificaciones', NotificacionViewSet, basename='notificacion')
 router.register(r'logs', LogAuditoriaViewSet, basename='log')
@@ -56,7 +59,8 @@ USUARIOS:
   PATCH  /api/usuarios/{id}/                  - Actualizar parcial
   DELETE /api/usuarios/{id}/                  - Eliminar usuario
   GET    /api/usuarios/me/                    - Usuario actual
-  GET    /api/usuarios/{id}/dias_disponibles/ - Días disponibles
+  GET    /api/usuarios/{id}/dias_disponibles/ - Días disponibles (?fecha=YYYY-MM-DD para saldo histórico)
+  GET    /api/usuarios/{id}/movimientos_saldo/ - Libro de saldos del usuario
   POST   /api/usuarios/{id}/actualizar_dias/  - Recalcular días
 
 ROLES:
@@ -73,6 +77,8 @@ ROLES:
   PUT    /api/areas/{id}/                     - Actualizar área
   DELETE /api/areas/{id}/                     - Eliminar área
   GET    /api/areas/{id}/funcionarios/        - Funcionarios del área
+  GET    /api/areas/{id}/cobertura/           - Ausentes por día del área (?desde=&hasta=)
+  GET    /api/areas/cobertura/                - Ausentes por día de todas las áreas (?desde=&hasta=)
 
 SOLICITUDES:
   GET    /api/solicitudes/                    - Listar solicitudes
@@ -82,8 +88,22 @@ SOLICITUDES:
   DELETE /api/solicitudes/{id}/               - Eliminar solicitud
   POST   /api/solicitudes/{id}/aprobar_jefatura/    - Aprobar como jefatura
   POST   /api/solicitudes/{id}/aprobar_direccion/   - Aprobar como dirección
-  GET    /api/solicitudes/pendientes/         - Solicitudes pendientes
+  POST   /api/solicitudes/bulk_resolver/      - Aprobar/rechazar varias solicitudes
+  GET    /api/solicitudes/pendientes/         - Bandeja del aprobador (+ conteos por estado)
   GET    /api/solicitudes/mis_solicitudes/    - Mis solicitudes
+  GET    /api/solicitudes/conflictos/         - Traslapes de ausencias (?desde=&hasta=&area=)
+  GET    /api/solicitudes/{id}/descargar_pdf/ - PDF de la resolución (202 + trabajo si aún se está generando)
+  GET    /api/solicitudes/exportar_pdfs/      - PDF de aprobadas en ZIP o unidos (?desde=&hasta=&area=&formato=zip|pdf)
+                                                (unidos: 202 + exportación, se genera en render_worker)
+
+TRABAJOS PDF:
+  GET    /api/trabajos-pdf/                   - Generaciones de PDF en cola o terminadas
+  GET    /api/trabajos-pdf/{id}/              - Estado de una generación
+
+EXPORTACIONES PDF:
+  GET    /api/exportaciones-pdf/              - PDF unidos pedidos por el usuario
+  GET    /api/exportaciones-pdf/{id}/         - Estado de una exportación
+  GET    /api/exportaciones-pdf/{id}/descargar/ - PDF unido (202 mientras se genera)
 
 LICENCIAS:
   GET    /api/licencias/                      - Listar licencias
@@ -109,6 +129,8 @@ ANUNCIOS:
   PUT    /api/anuncios/{id}/                  - Actualizar anuncio
   DELETE /api/anuncios/{id}/                  - Eliminar anuncio
   GET    /api/anuncios/vigentes/              - Anuncios vigentes
+  GET    /api/anuncios/feed/?cursor=          - Portada: vigentes por destacado/prioridad/fecha
+  GET    /api/anuncios/{id}/adjuntos/{adjunto_id}/preview/ - Miniatura de un adjunto
 
 DOCUMENTOS:
   GET    /api/documentos/                     - Listar documentos
@@ -116,8 +138,19 @@ DOCUMENTOS:
   GET    /api/documentos/{id}/                - Detalle de documento
   PUT    /api/documentos/{id}/                - Actualizar documento
   DELETE /api/documentos/{id}/                - Eliminar documento
+  POST   /api/documentos/descargar_lote/      - ZIP de varios documentos ({ids: [...]})
   POST   /api/documentos/{id}/descargar/      - Registrar descarga
   POST   /api/documentos/{id}/visualizar/     - Registrar visualización
+  GET    /api/documentos/{id}/download/       - Descargar archivo (admite Range)
+  GET    /api/documentos/{id}/preview/        - Miniatura de la primera página
+  GET    /api/documentos/{id}/estadisticas/   - Descargas/visualizaciones por hora o día
+
+SUBIDAS DE DOCUMENTOS (archivos grandes, por trozos):
+  POST   /api/subidas-documentos/                       - Iniciar (nombre_archivo, tamano_total)
+  PUT    /api/subidas-documentos/{id}/trozo/?posicion=N - Enviar un trozo (cuerpo binario)
+  GET    /api/subidas-documentos/{id}/                  - Bytes recibidos, para retomar
+  POST   /api/subidas-documentos/{id}/finalizar/        - Crear el documento con sus datos
+  DELETE /api/subidas-documentos/{id}/                  - Cancelar la subida
 
 CATEGORÍAS DOCUMENTO:
   GET    /api/categorias-documento/           - Listar categorías
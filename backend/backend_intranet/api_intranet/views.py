@@ -3,33 +3,57 @@
 # Ubicación: api_intranet/views.py
 # ======================================================
 
-from rest_framework import viewsets, status, filters
+from datetime import timedelta
+from functools import partial
+
+from rest_framework import mixins, viewsets, status, filters
 from rest_framework.decorators import action
+from rest_framework.reverse import reverse
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
+from rest_framework.utils.urls import replace_query_param
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Q, Count
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.http import FileResponse, StreamingHttpResponse
+from django.db.models import Q, Count, F, Prefetch, Sum
+from django.db.models.functions import TruncDate
 from django.utils import timezone
+from django.utils.cache import get_conditional_response
 
 from .models import (
     Usuario, Rol, Area, Solicitud,TipoContrato,
     LicenciaMedica, Actividad, InscripcionActividad,
     Anuncio, AdjuntoAnuncio, Documento, CategoriaDocumento,
-    Notificacion, LogAuditoria
+    Notificacion, EnvioNotificacion, LogAuditoria, MovimientoSaldo, TrabajoPDF, ExportacionPDF,
+    SubidaDocumento
 )
 
+from . import blobs, paginacion, parametros, previsualizaciones
+from .contadores import registrar_descarga, registrar_descargas, registrar_visualizacion
+from .conflictos import intervalos_en_rango, detectar_conflictos
+from .cobertura import MAXIMO_DIAS, calcular_cobertura, dotacion_por_area
+from .busqueda import BusquedaDocumentoFilter
+from .cola_pdf import RELACIONES_PDF
+from .dias_habiles import contar_dias_habiles
+from .descargas import respuesta_archivo, zip_en_trozos as zip_documentos_en_trozos
+from .exportacion_pdf import zip_en_trozos
+
 from .serializers import (
     UsuarioListSerializer, UsuarioDetailSerializer, UsuarioCreateSerializer,
     RolSerializer, AreaSerializer, TipoContratoSerializer,
     SolicitudListSerializer, SolicitudDetailSerializer, SolicitudCreateSerializer,
-    SolicitudAprobacionSerializer,
+    SolicitudAprobacionSerializer, SolicitudResolucionMasivaSerializer,
     LicenciaMedicaSerializer,
     ActividadListSerializer, ActividadDetailSerializer, InscripcionActividadSerializer,
     AnuncioListSerializer, AnuncioDetailSerializer, AdjuntoAnuncioSerializer,
     DocumentoListSerializer, DocumentoDetailSerializer, DocumentoCreateSerializer,
+    DocumentoFinalizarSerializer, DocumentoDescargaLoteSerializer, SubidaDocumentoSerializer,
     CategoriaDocumentoSerializer,
-    NotificacionSerializer, LogAuditoriaSerializer
+    NotificacionSerializer, LogAuditoriaSerializer, MovimientoSaldoSerializer,
+    TrabajoPDFSerializer, ExportacionPDFSerializer
 )
 
 
@@ -71,14 +95,34 @@ class UsuarioViewSet(viewsets.ModelViewSet):
     
     @action(detail=True, methods=['get'])
     def dias_disponibles(self, request, pk=None):
-        """Resumen de bolsas de tiempo"""
+        """Resumen de bolsas de tiempo. Con ?fecha=YYYY-MM-DD entrega el saldo a esa fecha"""
         usuario = self.get_object()
+        fecha = parametros.fecha(request, 'fecha')
+        if fecha:
+            saldos = {bolsa: usuario.saldo_al(bolsa, fecha) for bolsa in Usuario.CAMPOS_SALDO}
+            saldos['fecha'] = fecha
+            return Response(saldos)
         return Response({
             'vacaciones': usuario.dias_vacaciones_disponibles,
             'administrativos': usuario.dias_administrativos_disponibles,
             'sin_goce': usuario.dias_sin_goce_acumulados,
             'devolucion': usuario.horas_devolucion_disponibles
         })
+
+    @action(detail=True, methods=['get'])
+    def movimientos_saldo(self, request, pk=None):
+        """Libro de saldos del usuario (?bolsa= para filtrar)"""
+        usuario = self.get_object()
+        if usuario != request.user and request.user.rol.nivel < 3:
+            return Response({'error': 'No tiene permisos'}, status=status.HTTP_403_FORBIDDEN)
+
+        movimientos = MovimientoSaldo.objects.filter(usuario=usuario)\
+            .select_related('solicitud', 'licencia')
+        bolsa = request.query_params.get('bolsa')
+        if bolsa:
+            movimientos = movimientos.filter(bolsa=bolsa)
+        serializer = MovimientoSaldoSerializer(movimientos, many=True)
+        return Response(serializer.data)
     
     @action(detail=False, methods=['get'])
     def me(self, request):
@@ -103,13 +147,71 @@ class RolViewSet(viewsets.ModelViewSet):
 # ======================================================
 
 class AreaViewSet(viewsets.ModelViewSet):
-    queryset = Area.objects.select_related('jefe').all()
+    queryset = Area.objects.select_related('jefe').annotate(num_funcionarios=Count('funcionarios'))
     serializer_class = AreaSerializer
     permission_classes = [IsAuthenticated]
     filter_backends = [filters.SearchFilter]
     search_fields = ['nombre', 'codigo']
     ordering = ['nombre']
 
+    def _rango_cobertura(self, request):
+        """?desde=&hasta= (por defecto, los próximos 90 días desde hoy)"""
+        hoy = timezone.now().date()
+        desde = parametros.fecha(request, 'desde', hoy)
+        hasta = parametros.fecha(request, 'hasta', desde + timedelta(days=89))
+        if desde > hasta or (hasta - desde).days >= MAXIMO_DIAS:
+            return None
+        return desde, hasta
+
+    def _respuesta_cobertura(self, desde, hasta, areas):
+        ausentes = calcular_cobertura(desde, hasta, areas)
+        dotacion = dotacion_por_area(areas)
+        return {
+            'desde': desde,
+            'hasta': hasta,
+            'dias': (hasta - desde).days + 1,
+            'areas': [{
+                'area': area_id,
+                'dotacion': dotacion.get(area_id, 0),
+                'ausentes': ausentes[area_id],
+            } for area_id in areas],
+        }
+
+    @action(detail=True, methods=['get'])
+    def cobertura(self, request, pk=None):
+        """
+        Ausentes por día del área (solicitudes y licencias aprobadas).
+        'ausentes[i]' corresponde al día desde + i.
+        """
+        area = self.get_object()
+        user = request.user
+        if user.rol.nivel < 2 or (user.rol.nivel == 2 and user.area_id != area.pk):
+            return Response(status=403)
+
+        rango = self._rango_cobertura(request)
+        if rango is None:
+            return Response({'error': f'El rango de fechas es inválido (máximo {MAXIMO_DIAS} días)'}, status=400)
+
+        datos = self._respuesta_cobertura(*rango, [area.pk])
+        datos.update(datos.pop('areas')[0])
+        return Response(datos)
+
+    @action(detail=False, methods=['get'], url_path='cobertura')
+    def cobertura_general(self, request):
+        """Misma información para todas las áreas activas (Jefatura solo recibe la suya)"""
+        user = request.user
+        if user.rol.nivel < 2: return Response(status=403)
+
+        rango = self._rango_cobertura(request)
+        if rango is None:
+            return Response({'error': f'El rango de fechas es inválido (máximo {MAXIMO_DIAS} días)'}, status=400)
+
+        if user.rol.nivel == 2:
+            areas = [user.area_id] if user.area_id else []
+        else:
+            areas = list(Area.objects.filter(activa=True).values_list('id', flat=True))
+        return Response(self._respuesta_cobertura(*rango, areas))
+
 
 # ======================================================
 # SOLICITUD VIEWSET - CORREGIDO
@@ -124,9 +226,11 @@ class SolicitudViewSet(viewsets.ModelViewSet):
     
     def get_queryset(self):
         user = self.request.user
-        if user.rol.nivel >= 3: return Solicitud.objects.all()
-        if user.rol.nivel == 2: return Solicitud.objects.filter(usuario__area=user.area)
-        return Solicitud.objects.filter(usuario=user)
+        # Nombres de funcionario, área y aprobadores de los serializers, en la misma consulta
+        solicitudes = Solicitud.objects.select_related('usuario__area', 'jefatura_aprobador', 'direccion_aprobador')
+        if user.rol.nivel >= 3: return solicitudes
+        if user.rol.nivel == 2: return solicitudes.filter(usuario__area=user.area)
+        return solicitudes.filter(usuario=user)
 
     def get_serializer_class(self):
         # ✅ FIX: 'mis_solicitudes' ahora usa ListSerializer para enviar nombres de jefes en vez de IDs
@@ -150,6 +254,131 @@ class SolicitudViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(usuario=self.request.user)
 
+    @action(detail=False, methods=['get'])
+    def dias_habiles(self, request):
+        """
+        Días hábiles (sin fines de semana ni feriados) entre ?desde= y ?hasta=, ambas
+        inclusive: es la cantidad_dias que exige la creación de vacaciones y administrativos.
+        """
+        desde = parametros.fecha(request, 'desde')
+        hasta = parametros.fecha(request, 'hasta')
+        if desde is None or hasta is None:
+            return Response({'error': 'Debe indicar desde y hasta'}, status=400)
+        if desde > hasta or (hasta - desde).days >= 366:
+            return Response({'error': 'El rango de fechas es inválido (máximo un año)'}, status=400)
+        return Response({'desde': desde, 'hasta': hasta, 'dias_habiles': contar_dias_habiles(desde, hasta)})
+
+    @action(detail=False, methods=['get'])
+    def pendientes(self, request):
+        """
+        Bandeja del aprobador: solo lo que puede resolver.
+        Jefatura: pendiente_jefatura de su área. Subdirección/Dirección: pendiente_direccion.
+        Incluye el conteo por estado de su alcance en la misma respuesta.
+        """
+        user = request.user
+        nivel = user.rol.nivel
+        if nivel < 2: return Response(status=403)
+
+        if nivel == 2:
+            # Mismo alcance que get_queryset y bulk_resolver: el área actual del funcionario
+            alcance = Solicitud.objects.filter(usuario__area_id=user.area_id)
+            estado = 'pendiente_jefatura'
+        else:
+            alcance = Solicitud.objects.all()
+            estado = 'pendiente_direccion'
+        alcance = alcance.exclude(usuario=user)
+        if nivel == 4:
+            # Las solicitudes de Dirección las resuelve Subdirección
+            alcance = alcance.exclude(usuario__rol__nivel=4)
+
+        conteos = dict.fromkeys(Solicitud.ESTADOS_PENDIENTES, 0)
+        conteos.update(
+            alcance.filter(estado__in=Solicitud.ESTADOS_PENDIENTES)
+            .order_by().values_list('estado').annotate(total=Count('id'))
+        )
+
+        solicitudes = alcance.filter(estado=estado)\
+            .select_related('usuario__area', 'jefatura_aprobador', 'direccion_aprobador')\
+            .order_by('creada_en')
+        serializer = SolicitudListSerializer(solicitudes, many=True)
+        return Response({
+            'estado': estado,
+            'conteos': conteos,
+            'resultados': serializer.data,
+        })
+
+    @action(detail=False, methods=['get'])
+    def conflictos(self, request):
+        """
+        Reporte de traslapes (solicitudes activas y licencias aprobadas de un mismo
+        funcionario) en ?desde=&hasta=. Jefatura ve su área; Dirección, todo el CESFAM.
+        """
+        user = request.user
+        if user.rol.nivel < 2: return Response(status=403)
+
+        hoy = timezone.now().date()
+        desde = parametros.fecha(request, 'desde', hoy.replace(month=1, day=1))
+        hasta = parametros.fecha(request, 'hasta', hoy.replace(month=12, day=31))
+        if desde > hasta:
+            return Response({'error': 'El rango de fechas es inválido'}, status=400)
+
+        area = user.area_id if user.rol.nivel == 2 else parametros.identificador(request, 'area')
+        pares = detectar_conflictos(intervalos_en_rango(desde, hasta, area=area))
+
+        nombres = {
+            u.pk: u.get_nombre_completo()
+            for u in Usuario.objects.filter(pk__in={a.usuario_id for a, _ in pares})
+            .only('nombre', 'apellido_paterno', 'apellido_materno')
+        }
+
+        def resumen(intervalo):
+            return {
+                'origen': intervalo.origen,
+                'id': intervalo.id,
+                'referencia': intervalo.referencia,
+                'fecha_inicio': intervalo.inicio,
+                'fecha_termino': intervalo.fin,
+            }
+
+        return Response({
+            'desde': desde,
+            'hasta': hasta,
+            'total': len(pares),
+            'conflictos': [{
+                'usuario': a.usuario_id,
+                'usuario_nombre': nombres.get(a.usuario_id),
+                'traslape_desde': max(a.inicio, b.inicio),
+                'traslape_hasta': min(a.fin, b.fin),
+                'a': resumen(a),
+                'b': resumen(b),
+            } for a, b in pares],
+        })
+
+    def _respuesta_conflicto(self, solicitud):
+        """409 cuando otra petición cambió el estado antes que esta"""
+        solicitud.refresh_from_db(fields=['estado'])
+        return Response({
+            'error': 'La solicitud ya no está en un estado que permita esta acción.',
+            'estado': solicitud.estado,
+        }, status=409)
+
+    def _resolver(self, solicitud, datos):
+        user = self.request.user
+        comentarios = datos.get('comentarios', '')
+        error = solicitud.impedimento_resolucion(user, datos['aprobar'])
+        if error:
+            # Fuera de la etapa del aprobador es un conflicto de estado; lo demás, falta de permiso
+            if solicitud.estado not in Solicitud.estados_que_resuelve(user):
+                return self._respuesta_conflicto(solicitud)
+            return Response({'error': error}, status=403)
+        if datos['aprobar']:
+            aplicada = solicitud.aprobar(aprobador=user, comentarios=comentarios)
+        else:
+            aplicada = solicitud.rechazar(aprobador=user, comentarios=comentarios)
+        if not aplicada:
+            return self._respuesta_conflicto(solicitud)
+        return Response({'status': 'procesado', 'estado': solicitud.estado})
+
     @action(detail=True, methods=['post'])
     def aprobar_jefatura(self, request, pk=None):
         solicitud = self.get_object()
@@ -157,13 +386,7 @@ class SolicitudViewSet(viewsets.ModelViewSet):
         
         serializer = SolicitudAprobacionSerializer(data=request.data)
         if serializer.is_valid():
-            if serializer.validated_data['aprobar']:
-                solicitud.aprobar(aprobador=request.user, comentarios=serializer.validated_data.get('comentarios', ''))
-            else:
-                solicitud.estado = 'rechazada'
-                solicitud.comentarios_administracion = serializer.validated_data.get('comentarios', '')
-                solicitud.save()
-            return Response({'status': 'procesado'})
+            return self._resolver(solicitud, serializer.validated_data)
         return Response(serializer.errors, status=400)
 
     @action(detail=True, methods=['post'])
@@ -173,27 +396,65 @@ class SolicitudViewSet(viewsets.ModelViewSet):
 
         serializer = SolicitudAprobacionSerializer(data=request.data)
         if serializer.is_valid():
-            if serializer.validated_data['aprobar']:
-                solicitud.aprobar(aprobador=request.user, comentarios=serializer.validated_data.get('comentarios', ''))
-            else:
-                solicitud.estado = 'rechazada'
-                solicitud.comentarios_administracion = serializer.validated_data.get('comentarios', '')
-                solicitud.save()
-            return Response({'status': 'procesado'})
+            return self._resolver(solicitud, serializer.validated_data)
         return Response(serializer.errors, status=400)
 
+    @action(detail=False, methods=['post'])
+    def bulk_resolver(self, request):
+        """Aprobar o rechazar varias solicitudes: {ids: [...], aprobar: bool, comentarios}"""
+        if request.user.rol.nivel < 2: return Response(status=403)
+
+        serializer = SolicitudResolucionMasivaSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=400)
+        ids = list(dict.fromkeys(serializer.validated_data['ids']))
+
+        with transaction.atomic():
+            solicitudes = list(
+                self.get_queryset().filter(id__in=ids)
+                .select_related('usuario__rol')
+                .select_for_update(of=('self',))
+            )
+            resultados = Solicitud.resolver_lote(
+                solicitudes,
+                aprobador=request.user,
+                aprobar=serializer.validated_data['aprobar'],
+                comentarios=serializer.validated_data.get('comentarios', ''),
+            )
+
+        numeros = {s.id: s.numero_solicitud for s in solicitudes}
+        items = []
+        for solicitud_id in ids:
+            if solicitud_id not in resultados:
+                items.append({'id': solicitud_id, 'ok': False, 'error': 'Solicitud no encontrada o sin permisos.'})
+                continue
+            estado, error = resultados[solicitud_id]
+            items.append({
+                'id': solicitud_id,
+                'numero_solicitud': numeros[solicitud_id],
+                'ok': error is None,
+                'estado': estado,
+                'error': error,
+            })
+        return Response({
+            'procesadas': sum(1 for item in items if item['ok']),
+            'resultados': items,
+        })
+
     @action(detail=True, methods=['post'])
     def anular_usuario(self, request, pk=None):
         solicitud = self.get_object()
         if solicitud.usuario != request.user: return Response(status=403)
-        solicitud.anular_por_usuario()
+        if not solicitud.anular_por_usuario():
+            return self._respuesta_conflicto(solicitud)
         return Response({'status': 'anulada'})
 
     @action(detail=True, methods=['post'])
     def solicitar_anulacion_licencia(self, request, pk=None):
         solicitud = self.get_object()
         if solicitud.usuario != request.user: return Response(status=403)
-        solicitud.solicitar_anulacion_licencia()
+        if not solicitud.solicitar_anulacion_licencia():
+            return self._respuesta_conflicto(solicitud)
         return Response({'status': 'solicitada'})
 
     @action(detail=True, methods=['post'])
@@ -201,12 +462,18 @@ class SolicitudViewSet(viewsets.ModelViewSet):
         """Dirección confirma anulación. Restitución de días es manual en Perfil Usuario."""
         solicitud = self.get_object()
         if request.user.rol.nivel < 3: return Response(status=403)
-        solicitud.estado = 'anulada_por_licencia'
-        solicitud.save()
+        if not solicitud.finalizar_anulacion_licencia():
+            return self._respuesta_conflicto(solicitud)
         return Response({'message': 'Solicitud anulada por licencia. Ajuste los días manualmente.'})
 
     @action(detail=True, methods=['get'])
     def descargar_pdf(self, request, pk=None):
+        """
+        PDF de la resolución, generado una sola vez y servido desde MEDIA.
+        Responde 304 si el cliente envía el ETag vigente en If-None-Match.
+        Si el PDF aún no existe (o quedó desactualizado) encola su generación y
+        responde 202 con el trabajo; su estado se consulta en /api/trabajos-pdf/{id}/.
+        """
         solicitud = self.get_object()
         
         # Solo permitimos descargar si está aprobada
@@ -215,17 +482,126 @@ class SolicitudViewSet(viewsets.ModelViewSet):
                 {'error': 'La solicitud aún no ha sido aprobada completamente.'}, 
                 status=400
             )
-        
-        try:
-            buffer = generar_pdf_solicitud(solicitud)
-            return FileResponse(
-                buffer, 
-                as_attachment=True, 
-                filename=f'Solicitud_{solicitud.numero_solicitud}.pdf',
-                content_type='application/pdf'
+
+        huella = solicitud.huella_pdf()
+        etag = f'"{huella}"'
+        no_modificado = get_conditional_response(request, etag=etag)
+        if no_modificado is not None:
+            no_modificado['ETag'] = etag
+            return no_modificado
+
+        nombre = solicitud.pdf_vigente(huella)
+        if not nombre:
+            trabajo = Solicitud.programar_pdfs([solicitud.pk])[solicitud.pk]
+            url_estado = reverse('trabajo-pdf-detail', args=[trabajo.pk], request=request)
+            return Response(
+                dict(TrabajoPDFSerializer(trabajo).data, url_estado=url_estado),
+                status=status.HTTP_202_ACCEPTED,
+                headers={'Location': url_estado},
+            )
+
+        response = FileResponse(
+            default_storage.open(nombre, 'rb'),
+            as_attachment=True, 
+            filename=f'Solicitud_{solicitud.numero_solicitud}.pdf',
+            content_type='application/pdf'
+        )
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
+    @action(detail=False, methods=['get'])
+    def exportar_pdfs(self, request):
+        """
+        PDF de las solicitudes aprobadas por Dirección entre ?desde= y ?hasta= (por defecto,
+        el mes en curso), opcionalmente de un ?area=.
+        ?formato=zip (un PDF por solicitud) se envía por trozos, sin límite de solicitudes.
+        ?formato=pdf (un solo documento) no se puede armar de a trozos: se encola, hasta
+        ExportacionPDF.MAXIMO_SOLICITUDES, y responde 202 con la exportación; el archivo
+        se descarga en /api/exportaciones-pdf/{id}/descargar/ cuando render_worker lo termina.
+        """
+        hoy = timezone.now().date()
+        desde = parametros.fecha(request, 'desde', hoy.replace(day=1))
+        hasta = parametros.fecha(request, 'hasta', hoy)
+        if desde > hasta:
+            return Response({'error': 'El rango de fechas es inválido'}, status=400)
+
+        formato = request.query_params.get('formato', 'zip')
+        if formato not in ('zip', 'pdf'):
+            return Response({'error': "El formato debe ser 'zip' o 'pdf'"}, status=400)
+
+        solicitudes = self.get_queryset().filter(
+            estado='aprobada',
+            fecha_aprobacion_direccion__date__gte=desde,
+            fecha_aprobacion_direccion__date__lte=hasta,
+        )
+        area = parametros.identificador(request, 'area')
+        if area:
+            solicitudes = solicitudes.filter(usuario__area_id=area)
+        solicitudes = solicitudes.select_related(*RELACIONES_PDF).order_by('numero_solicitud')
+
+        total = solicitudes.count()
+        if not total:
+            return Response({'error': 'No hay solicitudes aprobadas en el rango indicado.'}, status=404)
+
+        if formato == 'pdf':
+            if total > ExportacionPDF.MAXIMO_SOLICITUDES:
+                return Response({
+                    'error': f'El PDF unido admite hasta {ExportacionPDF.MAXIMO_SOLICITUDES} solicitudes '
+                             f'({total} en el rango). Use formato=zip o un rango menor.'
+                }, status=400)
+            exportacion = ExportacionPDF.encolar(request.user, desde, hasta, area, solicitudes)
+            url_estado = reverse('exportacion-pdf-detail', args=[exportacion.pk], request=request)
+            return Response(
+                dict(ExportacionPDFSerializer(exportacion).data, url_estado=url_estado),
+                status=status.HTTP_202_ACCEPTED,
+                headers={'Location': url_estado},
             )
-        except Exception as e:
-            return Response({'error': str(e)}, status=500)
+
+        trozos = zip_en_trozos(solicitudes.iterator(), settings.PDF_EXPORTACION_PROCESOS)
+        response = StreamingHttpResponse(trozos, content_type='application/zip')
+        response['Content-Disposition'] = f'attachment; filename="Solicitudes_{desde}_{hasta}.zip"'
+        response['X-Total-Solicitudes'] = str(total)
+        return response
+
+
+class TrabajoPDFViewSet(viewsets.ReadOnlyModelViewSet):
+    """Estado de la generación de PDF de las solicitudes que el usuario puede ver"""
+    serializer_class = TrabajoPDFSerializer
+    permission_classes = [IsAuthenticated]
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['estado', 'solicitud']
+
+    def get_queryset(self):
+        user = self.request.user
+        trabajos = TrabajoPDF.objects.select_related('solicitud')
+        if user.rol.nivel >= 3: return trabajos
+        if user.rol.nivel == 2: return trabajos.filter(solicitud__usuario__area=user.area)
+        return trabajos.filter(solicitud__usuario=user)
+
+
+class ExportacionPDFViewSet(viewsets.ReadOnlyModelViewSet):
+    """PDF unidos pedidos en exportar_pdfs?formato=pdf: cada usuario ve los suyos"""
+    serializer_class = ExportacionPDFSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return ExportacionPDF.objects.filter(usuario=self.request.user)
+
+    @action(detail=True, methods=['get'])
+    def descargar(self, request, pk=None):
+        """El PDF unido ya generado. Mientras se genera responde 202 con su estado"""
+        exportacion = self.get_object()
+        if exportacion.estado == 'error':
+            return Response({'error': exportacion.error, 'estado': exportacion.estado}, status=409)
+        if exportacion.estado != 'completado':
+            return Response(self.get_serializer(exportacion).data, status=status.HTTP_202_ACCEPTED)
+        return FileResponse(
+            default_storage.open(exportacion.archivo, 'rb'),
+            as_attachment=True,
+            filename=f'Solicitudes_{exportacion.desde}_{exportacion.hasta}.pdf',
+            content_type='application/pdf'
+        )
 
 # ======================================================
 # LICENCIA MÉDICA VIEWSET
@@ -235,18 +611,20 @@ class SolicitudViewSet(viewsets.ModelViewSet):
 
 
 class LicenciaMedicaViewSet(viewsets.ModelViewSet):
-    queryset = LicenciaMedica.objects.select_related('usuario', 'revisada_por').all()
+    queryset = LicenciaMedica.objects.select_related('usuario__area', 'revisada_por').all()
     serializer_class = LicenciaMedicaSerializer
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
         user = self.request.user
+        # Una copia por petición: self.queryset es de la clase y guardaría el resultado entre peticiones
+        licencias = super().get_queryset()
         # Dirección/Subdir ven todo
-        if user.rol.nivel >= 3: return self.queryset
+        if user.rol.nivel >= 3: return licencias
         # Jefatura ve su área
-        if user.rol.nivel == 2: return self.queryset.filter(usuario__area=user.area)
+        if user.rol.nivel == 2: return licencias.filter(usuario__area=user.area)
         # Funcionario solo lo suyo
-        return self.queryset.filter(usuario=user)
+        return licencias.filter(usuario=user)
 
     def perform_create(self, serializer):
         serializer.save(usuario=self.request.user)
@@ -278,7 +656,15 @@ class ActividadViewSet(viewsets.ModelViewSet):
     
     def get_queryset(self):
         user = self.request.user
-        queryset = Actividad.objects.all()
+        # distinct=True: el JOIN con las áreas repetiría las inscripciones
+        queryset = Actividad.objects.select_related('creado_por').annotate(
+            num_inscritos=Count('inscritos', distinct=True)
+        )
+        if self.action != 'list':
+            queryset = queryset.prefetch_related(
+                'areas_participantes',
+                Prefetch('inscripcionactividad_set', InscripcionActividad.objects.select_related('usuario')),
+            )
         
         # Filtrar por áreas si no son para todas
         if not user.rol.nivel >= 3:  # Si no es dirección/subdirección
@@ -294,8 +680,9 @@ class ActividadViewSet(viewsets.ModelViewSet):
         return ActividadDetailSerializer
     
     def perform_create(self, serializer):
-        """Registrar quién creó la actividad"""
-        serializer.save(creado_por=self.request.user)
+        """Registrar quién creó la actividad y avisar a sus participantes"""
+        actividad = serializer.save(creado_por=self.request.user)
+        EnvioNotificacion.encolar(actividad)
     
     @action(detail=True, methods=['post'])
     def inscribirse(self, request, pk=None):
@@ -345,6 +732,23 @@ class ActividadViewSet(viewsets.ModelViewSet):
             )
 
 
+# ======================================================
+# VISTA PREVIA (documentos y adjuntos)
+# ======================================================
+
+def _respuesta_preview(request, huella, nombre_archivo):
+    """
+    Miniatura JPEG ya generada del contenido `huella`; los permisos ya los validó la
+    vista. Aquí no se genera: la petición no lee ni rasteriza el archivo original.
+    """
+    if not previsualizaciones.existe(huella):
+        return Response({'error': 'El archivo no tiene vista previa'}, status=status.HTTP_404_NOT_FOUND)
+    return respuesta_archivo(
+        request, partial(open, previsualizaciones.ruta(huella), 'rb'), 'image/jpeg',
+        f'{nombre_archivo}.jpg', etag=f'"{huella}-preview"'
+    )
+
+
 # ======================================================
 # ANUNCIO VIEWSET
 # ======================================================
@@ -357,33 +761,14 @@ class AnuncioViewSet(viewsets.ModelViewSet):
     search_fields = ['titulo', 'contenido']
     ordering_fields = ['fecha_publicacion', 'prioridad']
     ordering = ['-fecha_publicacion', '-prioridad']
+    # Orden descendente del feed; termina en id para que el cursor sea único
+    ORDEN_FEED = ('es_destacado', 'prioridad', 'fecha_publicacion', 'id')
+    MAXIMO_FEED = 50
     
     def get_queryset(self):
-        user = self.request.user
-        nivel_usuario = user.rol.nivel
-        queryset = Anuncio.objects.all()
-        
-        # Filtrar por áreas si no son para todas
-        if nivel_usuario < 3:
-            queryset = queryset.filter(
-                Q(para_todas_areas=True) | Q(areas_destinatarias=user.area)
-            )
-        
-        # Filtrar por visibilidad de roles
-        if nivel_usuario < 3:  # Si no es Dirección/Subdirección
-            if nivel_usuario == 1:  # Funcionario
-                queryset = queryset.filter(
-                    Q(visibilidad_roles='solo_funcionarios') |
-                    Q(visibilidad_roles='funcionarios_y_jefatura')
-                )
-            elif nivel_usuario == 2:  # Jefatura
-                queryset = queryset.filter(
-                    Q(visibilidad_roles='solo_jefatura') |
-                    Q(visibilidad_roles='funcionarios_y_jefatura')
-                )
-        # Si es nivel 3 o 4 (Dirección/Subdirección), ve todos los anuncios
-        
-        return queryset.distinct()
+        # Visibilidad por área y rol precalculada en AudienciaAnuncio (ver Anuncio.compilar_audiencia)
+        return Anuncio.visibles_para(self.request.user).select_related('creado_por')\
+            .prefetch_related('areas_destinatarias', 'adjuntos')
     
     def get_serializer_class(self):
         if self.action == 'list':
@@ -391,8 +776,9 @@ class AnuncioViewSet(viewsets.ModelViewSet):
         return AnuncioDetailSerializer
     
     def perform_create(self, serializer):
-        """Registrar quién creó el anuncio"""
-        serializer.save(creado_por=self.request.user)
+        """Registrar quién creó el anuncio y avisar a su audiencia"""
+        anuncio = serializer.save(creado_por=self.request.user)
+        EnvioNotificacion.encolar(anuncio)
     
     def create(self, request, *args, **kwargs):
         """Sobrescribir create para manejar adjuntos"""
@@ -420,19 +806,73 @@ class AnuncioViewSet(viewsets.ModelViewSet):
             nombre_archivo=archivo.name,
             archivo=archivo,
             tipo_archivo=archivo.content_type,
-            tamano=archivo.size
+            tamano=archivo.size,
+            archivo_hash=blobs.calcular_huella(archivo)
+        )
+        previsualizaciones.programar(
+            adjunto.archivo_hash, partial(default_storage.open, adjunto.archivo.name, 'rb'),
+            adjunto.nombre_archivo, adjunto.tipo_archivo
         )
         
         serializer = AdjuntoAnuncioSerializer(adjunto)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
     
+    @action(detail=True, methods=['get'], url_path=r'adjuntos/(?P<adjunto_id>[^/.]+)/preview')
+    def preview_adjunto(self, request, pk=None, adjunto_id=None):
+        """Miniatura de un adjunto (las de adjuntos anteriores las genera generar_previsualizaciones)"""
+        anuncio = self.get_object()
+        adjunto = anuncio.adjuntos.filter(pk=adjunto_id).first()
+        if adjunto is None:
+            return Response({'error': 'Adjunto no encontrado'}, status=status.HTTP_404_NOT_FOUND)
+        return _respuesta_preview(request, adjunto.archivo_hash, adjunto.nombre_archivo)
+    
     @action(detail=False, methods=['get'])
     def vigentes(self, request):
         """Listar anuncios vigentes"""
-        anuncios = self.get_queryset().filter(activo=True)
-        anuncios = [a for a in anuncios if a.esta_vigente()]
+        anuncios = self.get_queryset().filter(Anuncio.filtro_vigente(timezone.now()))
         serializer = self.get_serializer(anuncios, many=True)
         return Response(serializer.data)
+    
+    @action(detail=False, methods=['get'])
+    def feed(self, request):
+        """
+        Anuncios vigentes y ya publicados para la portada: destacados primero, luego
+        por prioridad y fecha. Páginas de ?limite= (por defecto 20); la respuesta trae
+        `next` con el ?cursor= de la página siguiente, o null si no hay más.
+        """
+        ahora = timezone.now()
+        anuncios = self.get_queryset().filter(
+            Anuncio.filtro_vigente(ahora), fecha_publicacion__lte=ahora
+        ).order_by(*(f'-{campo}' for campo in self.ORDEN_FEED))
+        
+        cursor = request.query_params.get('cursor')
+        if cursor:
+            try:
+                valores = paginacion.decodificar(cursor, Anuncio, self.ORDEN_FEED)
+            except ValueError:
+                return Response({'error': 'El cursor es inválido'}, status=400)
+            anuncios = anuncios.filter(paginacion.despues_de(self.ORDEN_FEED, valores))
+        
+        try:
+            limite = min(int(request.query_params.get('limite', 20)), self.MAXIMO_FEED)
+        except ValueError:
+            return Response({'error': 'limite debe ser un número'}, status=400)
+        if limite < 1:
+            return Response({'error': 'limite debe ser mayor que 0'}, status=400)
+        
+        # Una fila extra indica si hay página siguiente sin contar el total
+        pagina = list(anuncios[:limite + 1])
+        siguiente = None
+        if len(pagina) > limite:
+            pagina = pagina[:limite]
+            ultimo = pagina[-1]
+            siguiente = replace_query_param(
+                request.build_absolute_uri(), 'cursor',
+                paginacion.codificar(getattr(ultimo, campo) for campo in self.ORDEN_FEED)
+            )
+        
+        serializer = AnuncioListSerializer(pagina, many=True, context=self.get_serializer_context())
+        return Response({'results': serializer.data, 'next': siguiente})
 
 
 
@@ -444,7 +884,8 @@ class DocumentoViewSet(viewsets.ModelViewSet):
     """ViewSet para gestión de documentos"""
     permission_classes = [IsAuthenticated]
     parser_classes = [MultiPartParser, FormParser, JSONParser]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    # La búsqueda va al final para ordenar por relevancia (salvo ?ordering=)
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, BusquedaDocumentoFilter]
     filterset_fields = ['tipo', 'categoria', 'publico', 'activo']
     search_fields = ['titulo', 'codigo_documento', 'descripcion']
     ordering_fields = ['subido_en', 'fecha_vigencia']
@@ -452,7 +893,12 @@ class DocumentoViewSet(viewsets.ModelViewSet):
     
     def get_queryset(self):
         user = self.request.user
-        queryset = Documento.objects.select_related('categoria', 'subido_por').all()
+        # El texto extraído y el tsvector no se serializan; el contenido solo se lee al descargar
+        queryset = Documento.objects.select_related('categoria', 'subido_por').defer('texto_contenido', 'busqueda')
+        if self.action != 'download':
+            queryset = queryset.defer('archivo_contenido')
+        if self.action == 'retrieve':
+            queryset = queryset.prefetch_related('areas_con_acceso')
         
         # Filtrar por permisos
         if not user.rol.nivel >= 3:
@@ -493,37 +939,35 @@ class DocumentoViewSet(viewsets.ModelViewSet):
     
     @action(detail=True, methods=['get'])
     def download(self, request, pk=None):
-        """Descargar archivo desde base de datos"""
-        from django.http import HttpResponse
-        import io
-        
+        """
+        Descargar el archivo (almacén de blobs o base de datos) por trozos.
+        Soporta Range (uno o varios rangos), If-Range e If-None-Match con el
+        hash del contenido como ETag.
+        """
         documento = self.get_object()
         
-        # Registrar descarga
-        documento.descargas += 1
-        documento.save(update_fields=['descargas'])
-        
-        if documento.storage_type == 'database':
-            # Verificar que hay contenido
-            if not documento.archivo_contenido:
+        if documento.storage_type in ('filesystem', 'database'):
+            if documento.storage_type == 'filesystem':
+                disponible = blobs.existe(documento.archivo_hash)
+            else:
+                disponible = bool(documento.archivo_contenido)
+            if not disponible:
                 return Response(
                     {'error': 'El archivo no tiene contenido'},
                     status=status.HTTP_404_NOT_FOUND
                 )
             
-            # Servir archivo desde BD
-            # Convertir memoryview a bytes si es necesario
-            contenido = bytes(documento.archivo_contenido) if isinstance(documento.archivo_contenido, memoryview) else documento.archivo_contenido
-            
-            response = HttpResponse(
-                contenido,
-                content_type=documento.mime_type
+            response = respuesta_archivo(
+                request, documento.abrir_archivo, documento.mime_type, documento.nombre_archivo,
+                etag=f'"{documento.archivo_hash}"' if documento.archivo_hash else None,
             )
-            response['Content-Disposition'] = f'inline; filename="{documento.nombre_archivo}"'
-            response['Content-Length'] = len(contenido)
-            response['Accept-Ranges'] = 'bytes'
+            # Los visores piden el archivo por partes: se cuenta solo la que parte del inicio
+            if response.status_code == 200 or response.get('Content-Range', '').startswith('bytes 0-'):
+                registrar_descarga(documento.pk)
             return response
         elif documento.storage_type == 's3':
+            registrar_descarga(documento.pk)
+            
             # Redirigir a S3
             from django.shortcuts import redirect
             return redirect(documento.archivo_url)
@@ -533,21 +977,210 @@ class DocumentoViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
     
+    @action(detail=False, methods=['post'])
+    def descargar_lote(self, request):
+        """
+        ZIP con varios documentos: {ids: [...]}. Se arma mientras se envía, un trozo
+        a la vez, con los mismos permisos que el listado. Si algún id no existe o no
+        es visible para el usuario no se entrega nada.
+        """
+        serializer = DocumentoDescargaLoteSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=400)
+        ids = list(dict.fromkeys(serializer.validated_data['ids']))
+
+        documentos = {d.pk: d for d in self.get_queryset().filter(pk__in=ids)}
+        faltantes = [documento_id for documento_id in ids if documento_id not in documentos]
+        if faltantes:
+            return Response(
+                {'error': 'Documentos no encontrados o sin permisos', 'ids': faltantes},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        # El contenido guardado en la base se carga recién al escribir cada entrada
+        vacios = set(
+            Documento.objects.filter(pk__in=ids, storage_type='database')
+            .filter(Q(archivo_contenido__isnull=True) | Q(archivo_contenido=b''))
+            .values_list('pk', flat=True)
+        )
+        sin_archivo = [
+            documento.pk for documento in documentos.values()
+            if documento.storage_type == 's3' or documento.pk in vacios
+            or (documento.storage_type == 'filesystem' and not blobs.existe(documento.archivo_hash))
+        ]
+        if sin_archivo:
+            return Response(
+                {'error': 'Estos documentos no tienen el archivo en el servidor', 'ids': sin_archivo},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        entradas = [
+            (f'{documentos[documento_id].codigo_documento}_{documentos[documento_id].nombre_archivo}',
+             documentos[documento_id].abrir_archivo)
+            for documento_id in ids
+        ]
+        registrar_descargas(ids)
+
+        response = StreamingHttpResponse(zip_documentos_en_trozos(entradas), content_type='application/zip')
+        response['Content-Disposition'] = 'attachment; filename="documentos.zip"'
+        response['X-Total-Documentos'] = str(len(entradas))
+        return response
+    
+    @action(detail=True, methods=['get'])
+    def preview(self, request, pk=None):
+        """Miniatura de la primera página (las de documentos anteriores las genera generar_previsualizaciones)"""
+        documento = self.get_object()
+        return _respuesta_preview(request, documento.archivo_hash, documento.nombre_archivo)
+    
     @action(detail=True, methods=['post'])
     def descargar(self, request, pk=None):
         """Registrar descarga de documento (deprecated - usar download)"""
         documento = self.get_object()
-        documento.descargas += 1
-        documento.save()
+        registrar_descarga(documento.pk)
         return Response({'message': 'Descarga registrada'})
     
     @action(detail=True, methods=['post'])
     def visualizar(self, request, pk=None):
         """Registrar visualización de documento"""
         documento = self.get_object()
-        documento.visualizaciones += 1
-        documento.save()
+        registrar_visualizacion(documento.pk)
         return Response({'message': 'Visualización registrada'})
+    
+    @action(detail=True, methods=['get'])
+    def estadisticas(self, request, pk=None):
+        """
+        Descargas y visualizaciones por ?agrupar=hora (por defecto) o dia entre ?desde=
+        y ?hasta= (por defecto, los últimos 7 días). No incluye lo que aún está en el
+        buffer de contadores (a lo más DOCUMENTOS_CONTADORES_INTERVALO segundos).
+        """
+        documento = self.get_object()
+        hoy = timezone.now().date()
+        desde = parametros.fecha(request, 'desde', hoy - timedelta(days=6))
+        hasta = parametros.fecha(request, 'hasta', hoy)
+        if desde > hasta:
+            return Response({'error': 'El rango de fechas es inválido'}, status=400)
+        
+        agrupar = request.query_params.get('agrupar', 'hora')
+        if agrupar not in ('hora', 'dia'):
+            return Response({'error': "agrupar debe ser 'hora' o 'dia'"}, status=400)
+        
+        contadores = documento.contadores_por_hora.filter(hora__date__gte=desde, hora__date__lte=hasta)
+        if agrupar == 'dia':
+            contadores = contadores.annotate(periodo=TruncDate('hora'))
+        else:
+            contadores = contadores.annotate(periodo=F('hora'))
+        serie = contadores.values('periodo').annotate(
+            total_descargas=Sum('descargas'), total_visualizaciones=Sum('visualizaciones')
+        ).order_by('periodo')
+        
+        return Response({
+            'documento': documento.pk,
+            'desde': desde,
+            'hasta': hasta,
+            'agrupar': agrupar,
+            'serie': [
+                {
+                    'periodo': fila['periodo'],
+                    'descargas': fila['total_descargas'],
+                    'visualizaciones': fila['total_visualizaciones'],
+                }
+                for fila in serie
+            ],
+        })
+
+
+class SubidaDocumentoViewSet(mixins.CreateModelMixin, mixins.RetrieveModelMixin,
+                             mixins.DestroyModelMixin, viewsets.GenericViewSet):
+    """
+    Subida de documentos grandes por trozos, para conexiones inestables:
+    se inicia con el tamaño total, se envía cada trozo con PUT ?posicion=N y,
+    completo el archivo, se finaliza con los datos del documento.
+    Si se corta, GET indica `recibido` y se retoma desde ahí.
+    """
+    serializer_class = SubidaDocumentoSerializer
+    permission_classes = [IsAuthenticated]
+    
+    def get_queryset(self):
+        return SubidaDocumento.objects.filter(usuario=self.request.user)
+    
+    def create(self, request, *args, **kwargs):
+        """Solo Dirección y Subdirección pueden subir documentos"""
+        if request.user.rol.nivel < 3:
+            return Response(
+                {'error': 'No tienes permisos para subir documentos'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        return super().create(request, *args, **kwargs)
+    
+    def perform_create(self, serializer):
+        subida = serializer.save(usuario=self.request.user)
+        subida.crear_temporal()
+    
+    def perform_destroy(self, instance):
+        instance.descartar_temporal()
+        instance.delete()
+    
+    @action(detail=True, methods=['put'])
+    def trozo(self, request, pk=None):
+        """Escribe el cuerpo de la petición (binario) a partir de ?posicion="""
+        subida = self.get_object()
+        try:
+            posicion = int(request.query_params['posicion'])
+            largo = int(request.META.get('CONTENT_LENGTH') or 0)
+        except (KeyError, ValueError):
+            return Response(
+                {'error': 'Debe indicar ?posicion= y Content-Length'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if not 0 < largo <= SubidaDocumento.TAMANO_MAXIMO_TROZO:
+            return Response(
+                {'error': f'Cada trozo debe tener entre 1 y {SubidaDocumento.TAMANO_MAXIMO_TROZO} bytes'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if posicion + largo > subida.tamano_total:
+            return Response(
+                {'error': 'El trozo excede el tamaño declarado del archivo'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if not subida.escribir_trozo(posicion, request.stream, largo):
+            return Response(
+                {'error': 'La posición no coincide con lo recibido', 'recibido': subida.recibido, 'estado': subida.estado},
+                status=status.HTTP_409_CONFLICT
+            )
+        return Response(self.get_serializer(subida).data)
+    
+    @action(detail=True, methods=['post'])
+    def finalizar(self, request, pk=None):
+        """Crea el Documento con el archivo recibido y los datos enviados"""
+        self.get_object()
+        contexto = self.get_serializer_context()
+        
+        with transaction.atomic():
+            subida = SubidaDocumento.objects.select_for_update().get(pk=pk)
+            
+            # Reintento de un finalizar que ya se aplicó
+            if subida.estado == 'completada':
+                return Response(DocumentoDetailSerializer(subida.documento, context=contexto).data)
+            
+            if subida.recibido != subida.tamano_total:
+                return Response(
+                    {'error': 'La subida está incompleta', 'recibido': subida.recibido, 'tamano_total': subida.tamano_total},
+                    status=status.HTTP_409_CONFLICT
+                )
+            
+            serializer = DocumentoFinalizarSerializer(data=request.data, context={**contexto, 'subida': subida})
+            serializer.is_valid(raise_exception=True)
+            documento = serializer.save(subido_por=request.user)
+            
+            subida.estado = 'completada'
+            subida.documento = documento
+            subida.save(update_fields=['estado', 'documento', 'actualizada_en'])
+            # El temporal se borra solo si el documento queda guardado
+            transaction.on_commit(subida.descartar_temporal)
+        
+        return Response(DocumentoDetailSerializer(documento, context=contexto).data, status=status.HTTP_201_CREATED)
 
 
 # ======================================================
@@ -588,11 +1221,10 @@ class NotificacionViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['post'])
     def marcar_todas_leidas(self, request):
         """Marcar todas las notificaciones como leídas"""
-        notificaciones = self.get_queryset().filter(leida=False)
-        for notif in notificaciones:
-            notif.marcar_como_leida()
+        # Un solo UPDATE en vez de un save() por notificación
+        total = self.get_queryset().filter(leida=False).update(leida=True, fecha_leida=timezone.now())
         return Response({
-            'message': f'{notificaciones.count()} notificaciones marcadas como leídas'
+            'message': f'{total} notificaciones marcadas como leídas'
         })
     
     @action(detail=False, methods=['get'])
@@ -624,4 +1256,4 @@ class LogAuditoriaViewSet(viewsets.ReadOnlyModelViewSet):
             return LogAuditoria.objects.select_related('usuario').all()
         
         # Otros usuarios solo ven sus propios logs
-        return LogAuditoria.objects.filter(usuario=user)
\ No newline at end of file
+        return LogAuditoria.objects.select_related('usuario').filter(usuario=user)
\ No newline at end of file
@@ -127,6 +127,15 @@ AUTH_USER_MODEL = 'api_intranet.Usuario'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Almacén de archivos de Documento por SHA-256 (fuera de MEDIA: se sirven solo por la API)
+DOCUMENTOS_BLOB_ROOT = Path(os.getenv('DOCUMENTOS_BLOB_ROOT', BASE_DIR / 'blobs'))
+
+# Segundos entre escrituras de los contadores de descargas/visualizaciones (0 = en cada petición)
+DOCUMENTOS_CONTADORES_INTERVALO = float(os.getenv('DOCUMENTOS_CONTADORES_INTERVALO', 30))
+
+# Procesos para generar PDF faltantes en /api/solicitudes/exportar_pdfs/ (0 = en el mismo proceso)
+PDF_EXPORTACION_PROCESOS = int(os.getenv('PDF_EXPORTACION_PROCESOS', os.cpu_count() or 1))
+
 # REST Framework config
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
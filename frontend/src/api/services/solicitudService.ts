@@ -46,6 +46,18 @@ export interface CrearSolicitudDTO {
   telefono_contacto: string;
 }
 
+export interface BandejaPendientes {
+  estado: EstadoSolicitud;
+  conteos: Record<'pendiente_jefatura' | 'pendiente_direccion', number>;
+  resultados: Solicitud[];
+}
+
+export interface DiasHabiles {
+  desde: string;
+  hasta: string;
+  dias_habiles: number;
+}
+
 export interface AprobarRechazarDTO {
   aprobar: boolean;
   comentarios?: string;
@@ -64,8 +76,12 @@ class SolicitudService {
     return response.data;
   }
 
+  /**
+   * Bandeja del aprobador: solo las solicitudes que puede resolver en su etapa.
+   */
   async getPendientes(): Promise<Solicitud[]> {
-    return this.getAll();
+    const response = await axios.get<BandejaPendientes>(`${this.baseURL}/pendientes/`);
+    return response.data.resultados;
   }
 
   async getMisAprobaciones(): Promise<Solicitud[]> {
@@ -110,30 +126,15 @@ class SolicitudService {
   }
 
   /**
-   * ✅ MÉTODO PARA CALCULAR DÍAS HÁBILES (Lunes a Viernes)
+   * Días hábiles del rango según el servidor (sin fines de semana ni feriados).
+   * Es el valor que el backend exige en cantidad_dias.
    */
-  calcularDiasHabiles(fechaInicio: string, fechaFin: string): number {
-    if (!fechaInicio || !fechaFin) return 0;
-    
-    // Usamos el formato ISO con T00:00:00 para evitar problemas de zona horaria
-    const inicio = new Date(fechaInicio + 'T00:00:00');
-    const fin = new Date(fechaFin + 'T00:00:00');
-    
-    if (inicio > fin) return 0;
-    
-    let contador = 0;
-    const actual = new Date(inicio);
-    
-    while (actual <= fin) {
-      const diaSemana = actual.getDay();
-      // 0 = Domingo, 6 = Sábado. Solo sumamos si es 1, 2, 3, 4 o 5.
-      if (diaSemana !== 0 && diaSemana !== 6) {
-        contador++;
-      }
-      actual.setDate(actual.getDate() + 1);
-    }
-    
-    return contador;
+  async getDiasHabiles(fechaInicio: string, fechaFin: string): Promise<number> {
+    if (!fechaInicio || !fechaFin || fechaInicio > fechaFin) return 0;
+    const response = await axios.get<DiasHabiles>(`${this.baseURL}/dias_habiles/`, {
+      params: { desde: fechaInicio, hasta: fechaFin },
+    });
+    return response.data.dias_habiles;
   }
 }
 
@@ -117,8 +117,11 @@ export const AprobacionesAdminPage: React.FC = () => {
       setLoading(true);
       setError('');
       
-      // Obtenemos todo el universo de lo que el usuario puede ver según backend
-      const data = await solicitudService.getAll();
+      // Pendientes: la bandeja del backend ya trae solo lo que este usuario puede resolver.
+      // Otras vistas: todo el universo de lo que el usuario puede ver.
+      const data = vistaActual === 'pendientes'
+        ? await solicitudService.getPendientes()
+        : await solicitudService.getAll();
       setSolicitudes(data);
 
     } catch (err) {
@@ -132,15 +135,8 @@ export const AprobacionesAdminPage: React.FC = () => {
   const solicitudesFiltradas = useMemo(() => {
     let result = [...solicitudes];
 
-    // 1. Filtrado por Pestaña/Vista
-    if (vistaActual === 'pendientes') {
-      if (nivelUsuario >= 3) {
-        result = result.filter(s => s.estado === 'pendiente_direccion');
-      } else if (nivelUsuario === 2) {
-        result = result.filter(s => s.estado === 'pendiente_jefatura' && s.usuario_area === user?.area_nombre);
-      }
-    } 
-    else if (vistaActual === 'mis_acciones') {
+    // 1. Filtrado por Pestaña/Vista ('pendientes' ya viene filtrada por el backend)
+    if (vistaActual === 'mis_acciones') {
       // Filtra donde el usuario actual fue el que aprobó/rechazó
       // Usamos el nombre completo para comparar si no tenemos el ID directo en el objeto
       result = result.filter(s => 
@@ -77,15 +77,19 @@ export const SolicitarDiasPage: React.FC = () => {
   useEffect(() => {
     if (formData.esMedioDia) {
       setFormData(prev => ({ ...prev, cantidadDias: 0.5, fechaTermino: prev.fechaInicio }));
-    } else if (formData.fechaInicio && formData.fechaTermino) {
-      if (formData.tipoSolicitud !== 'devolucion_tiempo') {
-        const dias = solicitudService.calcularDiasHabiles(formData.fechaInicio, formData.fechaTermino);
-        if (formData.cantidadDias !== dias) {
-          setFormData(prev => ({ ...prev, cantidadDias: dias }));
-        }
-      }
+      return;
     }
-  }, [formData.fechaInicio, formData.fechaTermino, formData.esMedioDia, formData.tipoSolicitud, formData.cantidadDias]);
+    if (!formData.fechaInicio || !formData.fechaTermino || formData.tipoSolicitud === 'devolucion_tiempo') return;
+
+    // El servidor descuenta los feriados: es el mismo conteo con que valida cantidad_dias
+    let vigente = true;
+    solicitudService.getDiasHabiles(formData.fechaInicio, formData.fechaTermino)
+      .then(dias => {
+        if (vigente) setFormData(prev => (prev.cantidadDias === dias ? prev : { ...prev, cantidadDias: dias }));
+      })
+      .catch(error => console.error("Error calculando días hábiles:", error));
+    return () => { vigente = false; };
+  }, [formData.fechaInicio, formData.fechaTermino, formData.esMedioDia, formData.tipoSolicitud]);
 
   const handleChange = (field: keyof SolicitudFormData, value: any) => {
     setFormData(prev => {